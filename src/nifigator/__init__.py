@@ -29,3 +29,6 @@ from .lemongraph import *
 from .lemonobjects import *
 from .multisets import *
 from .search import *
+from .serializer import *
+from .snapshot import *
+from .sqlitestore import *
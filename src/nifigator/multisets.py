@@ -4,36 +4,318 @@
 """
 
 from fractions import Fraction
-from collections import Counter
+from collections import Counter, namedtuple
 
+import numpy as np
 
-def jaccard_index(c1: set = None, c2: set = None):
+EncodedMultisets = namedtuple(
+    "EncodedMultisets", ["indptr", "indices", "data", "vocabulary"]
+)
+EncodedMultisets.__doc__ = """Multisets encoded as sparse arrays of element ids"""
+EncodedMultisets.indptr.__doc__ = (
+    "The start (and end) of the elements of each multiset in indices and data"
+)
+EncodedMultisets.indices.__doc__ = "The element ids of the multisets"
+EncodedMultisets.data.__doc__ = "The counts of the elements of the multisets"
+EncodedMultisets.vocabulary.__doc__ = "The dict of elements and their ids"
+
+
+def _keys(c: set = None):
+    """
+    Function that returns the elements of a set or the (positive) elements of a multiset
+    """
+    if isinstance(c, dict):
+        return c.keys()
+    return c
+
+
+def jaccard_index(c1: set = None, c2: set = None, as_float: bool = False):
     """
     Function to calculate the Jaccard index of two sets
+
+    :param c1: the first set (or multiset of which the elements are used)
+
+    :param c2: the second set (or multiset of which the elements are used)
+
+    :param as_float: return a float instead of a Fraction (faster)
+
     """
-    denom = len(c1 | c2)
+    c1, c2 = _keys(c1), _keys(c2)
+    intersection = len(c1 & c2)
+    denom = len(c1) + len(c2) - intersection
     if denom != 0:
-        return Fraction(len(c1 & c2), denom)
+        if as_float:
+            return intersection / denom
+        return Fraction(intersection, denom)
     else:
         return 0
 
 
-def containment_index(c1: set = None, c2: set = None):
+def containment_index(c1: set = None, c2: set = None, as_float: bool = False):
     """
     Function to calculate the containment of set B in set A
+
+    :param c1: the first set (or multiset of which the elements are used)
+
+    :param c2: the second set (or multiset of which the elements are used)
+
+    :param as_float: return a float instead of a Fraction (faster)
+
     """
+    c1, c2 = _keys(c1), _keys(c2)
     denom = len(c1)
     if denom != 0:
+        if as_float:
+            return len(c1 & c2) / denom
         return Fraction(len(c1 & c2), denom)
     else:
         return 0
 
 
+def weighted_jaccard_index(
+    c1: Counter = None, c2: Counter = None, as_float: bool = False
+):
+    """
+    Function to calculate the weighted Jaccard index of two multisets
+
+    The weighted Jaccard index is the sum of the minimum counts divided by the sum of the
+    maximum counts of the elements in the multisets.
+
+    :param c1: the first multiset
+
+    :param c2: the second multiset
+
+    :param as_float: return a float instead of a Fraction (faster)
+
+    """
+    if len(c1) > len(c2):
+        c1, c2 = c2, c1
+    intersection = sum(min(count, c2[key]) for key, count in c1.items() if key in c2)
+    denom = sum(c1.values()) + sum(c2.values()) - intersection
+    if denom != 0:
+        if as_float:
+            return intersection / denom
+        return Fraction(intersection, denom)
+    else:
+        return 0
+
+
+def weighted_containment_index(
+    c1: Counter = None, c2: Counter = None, as_float: bool = False
+):
+    """
+    Function to calculate the weighted containment of multiset B in multiset A
+
+    :param c1: the first multiset
+
+    :param c2: the second multiset
+
+    :param as_float: return a float instead of a Fraction (faster)
+
+    """
+    intersection = sum(min(count, c2[key]) for key, count in c1.items() if key in c2)
+    denom = sum(c1.values())
+    if denom != 0:
+        if as_float:
+            return intersection / denom
+        return Fraction(intersection, denom)
+    else:
+        return 0
+
+
 def merge_multiset(d: dict = None):
     """
     Function to calculate the multiset from a dict of phrases
     """
     x = Counter()
     for item in d.values():
-        x += item
+        x.update(item)
+    # only keep positive counts (like the sum of Counters)
+    if any(count <= 0 for count in x.values()):
+        x = +x
     return x
+
+
+def encode_multisets(multisets: list = None, vocabulary: dict = None):
+    """
+    Function to encode a list of multisets (or sets) as sparse arrays of element ids
+
+    :param multisets: the list of multisets (Counters) or sets to be encoded
+
+    :param vocabulary: dict of elements and their ids, new elements are added to this dict (optional)
+
+    Returns:
+        EncodedMultisets: the encoded multisets in compressed sparse row format
+
+    """
+    if vocabulary is None:
+        vocabulary = dict()
+    indptr = [0]
+    indices = []
+    data = []
+    for multiset in multisets:
+        if isinstance(multiset, dict):
+            items = multiset.items()
+        else:
+            items = ((element, 1) for element in multiset)
+        for element, count in items:
+            element_id = vocabulary.get(element, None)
+            if element_id is None:
+                element_id = len(vocabulary)
+                vocabulary[element] = element_id
+            indices.append(element_id)
+            data.append(count)
+        indptr.append(len(indices))
+    return EncodedMultisets(
+        np.array(indptr, dtype=np.int64),
+        np.array(indices, dtype=np.int64),
+        np.array(data),
+        vocabulary,
+    )
+
+
+def intersection_sizes(
+    A: EncodedMultisets = None, B: EncodedMultisets = None, weighted: bool = False
+):
+    """
+    Function to calculate the sizes of the intersections of all pairs of encoded multisets
+
+    The candidate pairs are generated with an inverted map from the elements of B
+    to the multisets in B, so only pairs with a nonempty intersection are returned.
+
+    :param A: the first encoded multisets
+
+    :param B: the second encoded multisets (encoded with the same vocabulary)
+
+    :param weighted: if True then the size is the sum of the minimum counts of the common elements
+
+    Returns:
+        tuple: arrays with the row in A, the row in B and the size of the intersection
+
+    """
+    a_rows = np.repeat(np.arange(len(A.indptr) - 1), np.diff(A.indptr))
+    b_rows = np.repeat(np.arange(len(B.indptr) - 1), np.diff(B.indptr))
+    # inverted map from elements to rows in B
+    order = np.argsort(B.indices, kind="stable")
+    b_elements = B.indices[order]
+    b_rows = b_rows[order]
+    starts = np.searchsorted(b_elements, A.indices, side="left")
+    counts = np.searchsorted(b_elements, A.indices, side="right") - starts
+    total = counts.sum()
+    if total == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    offsets = np.cumsum(counts) - counts
+    positions = np.arange(total) - np.repeat(offsets - starts, counts)
+    num_b = len(B.indptr) - 1
+    pairs = np.repeat(a_rows, counts) * num_b + b_rows[positions]
+    if weighted:
+        b_data = B.data[order]
+        weights = np.minimum(np.repeat(A.data, counts), b_data[positions])
+        pairs, inverse = np.unique(pairs, return_inverse=True)
+        sizes = np.bincount(inverse, weights=weights, minlength=len(pairs))
+    else:
+        pairs, sizes = np.unique(pairs, return_counts=True)
+    return pairs // num_b, pairs % num_b, sizes
+
+
+def _select_rows(E: EncodedMultisets = None, start: int = 0, stop: int = None):
+    """
+    Function that returns the rows start to stop of encoded multisets
+    """
+    begin, end = E.indptr[start], E.indptr[stop]
+    return EncodedMultisets(
+        E.indptr[start : stop + 1] - begin,
+        E.indices[begin:end],
+        E.data[begin:end],
+        E.vocabulary,
+    )
+
+
+def similarity_matrix(
+    A: list = None,
+    B: list = None,
+    metric: str = "jaccard",
+    chunk_size: int = 2**12,
+    sparse: bool = False,
+):
+    """
+    Function to calculate the similarities of all pairs of (multi)sets in A and B at once
+
+    The result is a dense matrix of len(A) x len(B) floats (8 bytes each). For large
+    inputs use sparse=True, then only the pairs with a nonzero similarity are returned.
+
+    :param A: list of sets or multisets (Counters) or encoded multisets
+
+    :param B: list of sets or multisets (Counters) or encoded multisets (encoded with the
+        same vocabulary as A). If B is None then the similarities within A are calculated.
+
+    :param metric: "jaccard", "containment", "weighted_jaccard" or "weighted_containment".
+        The containment is the containment of the sets of B in the sets of A (as in containment_index).
+
+    :param chunk_size: the number of rows of A that are processed at once
+
+    :param sparse: if True then arrays of the rows, the columns and the similarities of
+        the pairs with a nonzero similarity are returned instead of a matrix
+
+    Returns:
+        np.ndarray: array of floats with the similarity of A[i] and B[j] in row i and column j
+            (or a tuple of arrays of rows, columns and similarities if sparse is True)
+
+    """
+    if metric not in [
+        "jaccard",
+        "containment",
+        "weighted_jaccard",
+        "weighted_containment",
+    ]:
+        raise ValueError("Unknown metric: " + repr(metric))
+    weighted = metric.startswith("weighted")
+    if not isinstance(A, EncodedMultisets):
+        if isinstance(B, EncodedMultisets):
+            A = encode_multisets(A, dict(B.vocabulary))
+        else:
+            A = encode_multisets(A, dict())
+    if B is not None and not isinstance(B, EncodedMultisets):
+        # the vocabulary of A is copied, so the elements of B are not added to it
+        B = encode_multisets(B, dict(A.vocabulary))
+    if B is None:
+        B = A
+
+    num_a, num_b = len(A.indptr) - 1, len(B.indptr) - 1
+    if weighted:
+        sizes_a = np.bincount(
+            np.repeat(np.arange(num_a), np.diff(A.indptr)),
+            weights=A.data,
+            minlength=num_a,
+        )
+        sizes_b = np.bincount(
+            np.repeat(np.arange(num_b), np.diff(B.indptr)),
+            weights=B.data,
+            minlength=num_b,
+        )
+    else:
+        sizes_a = np.diff(A.indptr)
+        sizes_b = np.diff(B.indptr)
+
+    chunks = []
+    for start in range(0, num_a, chunk_size):
+        stop = min(start + chunk_size, num_a)
+        rows, cols, sizes = intersection_sizes(
+            _select_rows(A, start, stop), B, weighted=weighted
+        )
+        rows = rows + start
+        if metric in ["jaccard", "weighted_jaccard"]:
+            denom = sizes_a[rows] + sizes_b[cols] - sizes
+        else:
+            denom = sizes_a[rows]
+        chunks.append((rows, cols, sizes / denom))
+    if sparse:
+        if chunks == []:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0, dtype=np.float64)
+        return tuple(np.concatenate(arrays) for arrays in zip(*chunks))
+    result = np.zeros((num_a, num_b), dtype=np.float64)
+    for rows, cols, similarities in chunks:
+        result[rows, cols] = similarities
+    return result
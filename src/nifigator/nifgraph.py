@@ -1,18 +1,27 @@
 # -*- coding: utf-8 -*-
 
+import glob
+import json
 import logging
+import time
 import uuid
+from array import array
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import product
+from io import TextIOWrapper
 from typing import Optional, Union, List
 from zipfile import ZipFile
 import pandas as pd
 
-import rdflib
 from rdflib import Graph
-from rdflib.namespace import DC, RDF, DCTERMS, NamespaceManager
+from rdflib.namespace import DC, RDF, DCTERMS, XSD, NamespaceManager
 from rdflib.store import Store
-from rdflib.term import IdentifiedNode, URIRef, Literal
+from rdflib.term import IdentifiedNode, URIRef, Literal, BNode
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
 from rdflib.plugins.stores import sparqlstore
+from rdflib.util import guess_format
 from iribaker import to_iri
 
 from .converters import nafConverter
@@ -20,13 +29,335 @@ from .nafdocument import NafDocument
 from .nifobjects import (
     NifContext,
     NifContextCollection,
+    NifPage,
+    NifParagraph,
+    NifPhrase,
     NifSentence,
+    NifView,
+    NifWord,
 )
-from .utils import tokenize_text
+from .utils import tokenize_text, parallel_batches
 from .const import ITSRDF, NIF, OLIA, DEFAULT_URI, DEFAULT_PREFIX
 from .lemonobjects import Lexicon, LexicalEntry, Form
 
 
+class _TripleSink:
+    """
+    Sink of the N-Triples parser that collects the parsed triples
+    """
+
+    def __init__(self):
+        self.triples = []
+
+    def triple(self, s, p, o):
+        self.triples.append((s, p, o))
+
+
+def _is_line_based(filename: str = None) -> bool:
+    """
+    Function that returns whether a file is parsed line by line (N-Triples and hext)
+    """
+    return filename[-3:].lower() == ".nt" or filename[-4:].lower() == "hext"
+
+
+def _rdf_format(filename: str = None) -> str:
+    """
+    Function that returns the rdflib format of a file (turtle if it is unknown)
+    """
+    if filename[-4:].lower() == "hext":
+        return "hext"
+    return guess_format(filename) or "turtle"
+
+
+def _hext_triple(line: str = None) -> tuple:
+    """
+    Function to create a triple from a line in hext format (the graph is ignored)
+    """
+    tup = [x if x != "" else None for x in json.loads(line)]
+    s = BNode(tup[0][2:]) if tup[0].startswith("_:") else URIRef(tup[0])
+    if tup[3] == "globalId":
+        o = URIRef(tup[2])
+    elif tup[3] == "localId":
+        o = BNode(tup[2][2:])
+    elif tup[4] is not None:
+        o = Literal(tup[2] or "", lang=tup[4])
+    else:
+        o = Literal(tup[2] or "", datatype=URIRef(tup[3]))
+    return s, URIRef(tup[1]), o
+
+
+def _line_triple_batches(
+    filename: str = None, f: TextIOWrapper = None, batch_size: int = 2**14
+):
+    """
+    Generator of batches of triples of an N-Triples or hext file that is read line by line
+    """
+    if filename[-4:].lower() == "hext":
+        batch = []
+        for line in f:
+            if not line.isspace():
+                batch.append(_hext_triple(line))
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+    else:
+        sink = _TripleSink()
+        parser = W3CNTriplesParser(sink=sink)
+        bnode_context = dict()
+        lines = []
+        for line in f:
+            lines.append(line)
+            if len(lines) == batch_size:
+                parser.parsestring("".join(lines), bnode_context=bnode_context)
+                yield sink.triples
+                sink.triples, lines = [], []
+        if lines:
+            parser.parsestring("".join(lines), bnode_context=bnode_context)
+            yield sink.triples
+
+
+def _triple_batches(source=None, batch_size: int = 2**14):
+    """
+    Generator of batches of the triples in a file or in a file in a zip file
+
+    :param source: a filename or a tuple of the filename of the zip file and the
+        filename in the zip file
+
+    :param batch_size: the number of triples (or lines) in a batch
+
+    """
+    if isinstance(source, tuple):
+        zip_filename, filename = source
+        zipfile = ZipFile(zip_filename, mode="r")
+        f = TextIOWrapper(zipfile.open(filename), encoding="utf-8")
+        logging.info(".. Parsing file " + filename + " from zip file")
+    else:
+        filename, zipfile = source, None
+        f = open(filename, encoding="utf-8")
+        logging.info(".. Parsing file " + filename + "")
+    try:
+        if _is_line_based(filename):
+            for batch in _line_triple_batches(filename, f, batch_size):
+                yield batch
+        else:
+            g = Graph()
+            if filename[-3:].lower() == "ttl":
+                g.parse(source=f, format="turtle")
+            else:
+                g.parse(source=f, format=_rdf_format(filename))
+            for batch in _batched(g, batch_size):
+                yield batch
+    finally:
+        f.close()
+        if zipfile is not None:
+            zipfile.close()
+
+
+def _batched(triples=None, batch_size: int = 2**14):
+    """
+    Generator of batches of triples of an iterable of triples
+    """
+    batch = []
+    for triple in triples:
+        batch.append(triple)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _term_size(term=None) -> int:
+    """
+    Function that returns the estimated number of bytes of a term in an update
+    """
+    if isinstance(term, Literal) and term.datatype is not None:
+        return len(str(term).encode("utf-8")) + len(term.datatype) + 6
+    return len(str(term).encode("utf-8")) + 2
+
+
+def _sized_batches(
+    triples=None, batch_size: int = 2**14, max_bytes: Optional[int] = None
+):
+    """
+    Generator of batches of at most batch_size triples of an iterable of triples,
+    if max_bytes is not None then a batch is also ended before its estimated size
+    in an update exceeds max_bytes
+    """
+    if max_bytes is None:
+        for batch in _batched(triples, batch_size):
+            yield batch
+        return
+    batch, size = [], 0
+    for triple in triples:
+        triple_size = sum(_term_size(term) for term in triple) + 4
+        if batch and size + triple_size > max_bytes:
+            yield batch
+            batch, size = [], 0
+        batch.append(triple)
+        size += triple_size
+        if len(batch) == batch_size:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def _naf_collection(
+    nafdocument: NafDocument = None, URIScheme: str = None
+) -> NifContextCollection:
+    """
+    Function to convert a NafDocument to a NifContextCollection
+    """
+    doc_uri = nafdocument.header["public"]["{http://purl.org/dc/elements/1.1/}uri"]
+    doc_uuid = "nif-" + str(uuid.uuid3(uuid.NAMESPACE_DNS, doc_uri).hex)
+
+    return nafConverter(
+        collection_name="collection",
+        context_name=doc_uuid,
+        nafdocument=nafdocument,
+        base_uri=DEFAULT_URI,
+        base_prefix=DEFAULT_PREFIX,
+        URIScheme=URIScheme,
+    )
+
+
+def _compact_batch(batch: list = None, documents: int = 0) -> tuple:
+    """
+    Function to encode a batch of triples as the distinct terms in the batch, the
+    term ids of the triples and the number of documents that are completed
+    """
+    index = dict()
+    ids = array(
+        "l", (index.setdefault(t, len(index)) for triple in batch for t in triple)
+    )
+    return list(index.keys()), ids, documents
+
+
+def _expand_batch(terms: list = None, ids: array = None):
+    """
+    Generator of the triples of a batch that is encoded with _compact_batch
+    """
+    it = iter(ids)
+    for s, p, o in zip(it, it, it):
+        yield terms[s], terms[p], terms[o]
+
+
+def _document_batches(source=None, URIScheme: str = None, batch_size: int = 2**14):
+    """
+    Generator of the compact batches of triples of a document, the last batch of
+    the document marks the document as completed
+
+    :param source: a NAF file (ending with "naf.xml"), another file with triples or
+        a tuple of the filename of a zip file and the filename in the zip file
+
+    :param URIScheme: the URIScheme of the NIF data created from a NAF file
+
+    :param batch_size: the number of triples (or lines) in a batch
+
+    """
+    if isinstance(source, str) and source[-7:].lower() == "naf.xml":
+        logging.info(".. Parsing file " + source + "")
+        collection = _naf_collection(NafDocument().open(source), URIScheme)
+        batches = _batched(collection.triples(), batch_size)
+    else:
+        batches = _triple_batches(source, batch_size)
+    previous = []
+    for batch in batches:
+        if previous:
+            yield _compact_batch(previous, 0)
+        previous = batch
+    yield _compact_batch(previous, 1)
+
+
+def _split_context_graphs(uris: list = None, triples: list = None):
+    """
+    Generator of the (uri, graph) pairs of the contexts in uris with the triples
+    of which the subject has the context as nif:referenceContext
+    """
+    graphs = {uri: Graph(store="SimpleMemory") for uri in uris}
+    subject_context = dict()
+    subject_triples = defaultdict(list)
+    for s, p, o in triples:
+        if p == NIF.referenceContext:
+            subject_context[s] = o
+        # necessary if data is read from http protocol
+        if isinstance(o, Literal) and isinstance(o.value, str):
+            o = Literal(o.value.replace("\r\n", "\n"), datatype=XSD.string)
+        subject_triples[s].append((s, p, o))
+    for s, s_triples in subject_triples.items():
+        graph = graphs.get(subject_context.get(s))
+        if graph is not None:
+            for triple in s_triples:
+                graph.add(triple)
+    for uri in uris:
+        yield uri, graphs[uri]
+
+
+# the NIF classes that are returned by NifGraph.get, in order of precedence
+NIF_TYPES = {
+    NIF.ContextCollection: NifContextCollection,
+    NIF.Context: NifContext,
+    NIF.Sentence: NifSentence,
+    NIF.Page: NifPage,
+    NIF.Paragraph: NifParagraph,
+    NIF.Phrase: NifPhrase,
+    NIF.Word: NifWord,
+}
+
+
+def _no_number(s: str = "") -> bool:
+    return not s.replace(".", "", 1).replace(",", "", 1).isdigit()
+
+
+def _lexicon_entries(rows=None) -> dict:
+    """
+    Function that aggregates (anchor, lemma, pos, lang) rows into a dict per
+    language (default "en") with per lexical entry uri the dicts of the lemmas,
+    the anchors that differ from the lemma and the parts of speech (as ordered
+    sets)
+    """
+    entries = defaultdict(dict)
+    entry_uris = dict()
+    for anchorOf, lemma, pos, lang in rows:
+        if lemma is not None and _no_number(lemma):
+            # default language is "en"
+            if lang is None:
+                lang = "en"
+            # derive lexical entry uri from the lemma
+            entry_uri = entry_uris.get((lang, lemma))
+            if entry_uri is None:
+                if not isinstance(lemma, URIRef):
+                    entry_uri = to_iri(DEFAULT_URI + "lexicon/" + lang + "/" + lemma)
+                else:
+                    entry_uri = lemma
+                entry_uris[(lang, lemma)] = entry_uri
+            entry = entries[lang].get(entry_uri)
+            if entry is None:
+                entry = entries[lang][entry_uri] = (dict(), dict(), dict())
+            entry[0][lemma] = None
+            if str(anchorOf) != str(lemma):
+                entry[1][anchorOf] = None
+            if pos is not None:
+                entry[2][pos] = None
+    return entries
+
+
+def _log_throughput(documents: int = 0, seconds: float = 0) -> None:
+    rate = documents / seconds if seconds > 0 else 0
+    logging.info(
+        ".. Parsed "
+        + str(documents)
+        + " documents in "
+        + "{:.1f}".format(seconds)
+        + "s ("
+        + "{:.1f}".format(rate)
+        + " documents/sec)"
+    )
+
+
 class NifGraph(Graph):
 
     """
@@ -40,6 +371,11 @@ class NifGraph(Graph):
 
     :param collection: an NifContextCollection
 
+    :param files: a list of filenames or a glob pattern of the files to read
+
+    :param workers: the number of processes that parse the files in a zip file or
+        in the list of files
+
     """
 
     def __init__(
@@ -48,6 +384,8 @@ class NifGraph(Graph):
         nafdocument: NafDocument = None,
         collection: NifContextCollection = None,
         URIScheme: str = None,
+        files: Union[List[str], str] = None,
+        workers: int = 1,
         store: Union[Store, str] = "default",
         identifier: Optional[Union[IdentifiedNode, str]] = None,
         namespace_manager: Optional[NamespaceManager] = None,
@@ -63,6 +401,11 @@ class NifGraph(Graph):
 
         :param collection: an NifContextCollection
 
+        :param files: a list of filenames or a glob pattern of the files to read
+
+        :param workers: the number of processes that parse the files in a zip file or
+            in the list of files
+
         """
 
         super(NifGraph, self).__init__(
@@ -75,6 +418,10 @@ class NifGraph(Graph):
 
         self.URIScheme = URIScheme
 
+        # the catalog is cached until the graph is modified
+        self._modifications = 0
+        self._catalog = None
+
         self.bind("rdf", ITSRDF)
         self.bind("rdfs", ITSRDF)
         self.bind("itsrdf", ITSRDF)
@@ -84,13 +431,21 @@ class NifGraph(Graph):
         self.bind("nif", NIF)
         self.bind("olia", OLIA)
 
-        self.open(file=file, nafdocument=nafdocument, collection=collection)
+        self.open(
+            file=file,
+            nafdocument=nafdocument,
+            collection=collection,
+            files=files,
+            workers=workers,
+        )
 
     def open(
         self,
         file: str = None,
         nafdocument: NafDocument = None,
         collection: NifContextCollection = None,
+        files: Union[List[str], str] = None,
+        workers: int = 1,
     ):
         """
         Read data from multiple sources into current `NifGraph` object.
@@ -101,11 +456,20 @@ class NifGraph(Graph):
 
         :param collection: an NifContextCollection
 
+        :param files: a list of filenames or a glob pattern of the files to read
+
+        :param workers: the number of processes that parse the files in a zip file or
+            in the list of files
+
         :return: None
 
         """
         if file is not None:
-            self.__parse_file(file=file)
+            self.__parse_file(file=file, workers=workers)
+        elif files is not None:
+            if isinstance(files, str):
+                files = sorted(glob.glob(files))
+            self.__parse_files(files=files, workers=workers)
         elif nafdocument is not None:
             self.__parse_nafdocument(nafdocument=nafdocument)
         elif collection is not None:
@@ -123,50 +487,91 @@ class NifGraph(Graph):
         """
         logging.info(".. Parsing NafDocument to NifGraph")
 
-        doc_uri = nafdocument.header["public"]["{http://purl.org/dc/elements/1.1/}uri"]
-        doc_uuid = "nif-" + str(uuid.uuid3(uuid.NAMESPACE_DNS, doc_uri).hex)
-
-        base_uri = DEFAULT_URI
-        base_prefix = DEFAULT_PREFIX
-
-        collection = nafConverter(
-            collection_name="collection",
-            context_name=doc_uuid,
-            nafdocument=nafdocument,
-            base_uri=base_uri,
-            base_prefix=base_prefix,
-            URIScheme=self.URIScheme,
-        )
+        collection = _naf_collection(nafdocument, self.URIScheme)
 
         self.__parse_collection(collection)
 
     # self.parse_collection(collection)
 
-    def __parse_collection(self, collection: NifContextCollection = None):
+    def __parse_collection(
+        self,
+        collection: NifContextCollection = None,
+        batch_size: int = 2**14,
+        max_bytes: int = 2**22,
+    ):
         """
         Read data from a NifContextCollection object.
 
+        The triples are added to the store with addN in batches while they are
+        generated. For a SPARQL store every batch is sent as a separate INSERT
+        DATA update of at most (approximately) max_bytes.
+
         :param collection: a NifContextCollection
 
+        :param batch_size: the maximum number of triples in a batch
+
+        :param max_bytes: the maximum size of an update to a SPARQL store
+
         :return: None
 
         """
-        g = Graph(identifier=self.identifier)
-        for r in collection.triples():
-            g.add(r)
-        self += g
+        remote = isinstance(self.store, sparqlstore.SPARQLUpdateStore)
+        start = time.perf_counter()
+        num_triples = 0
+        for idx, batch in enumerate(
+            _sized_batches(
+                collection.triples(), batch_size, max_bytes if remote else None
+            )
+        ):
+            batch_start = time.perf_counter()
+            try:
+                self.addN((s, p, o, self) for s, p, o in batch)
+                if remote:
+                    self.store.commit()
+            except Exception as e:
+                logging.error(
+                    ".. Adding batch "
+                    + str(idx)
+                    + " ("
+                    + str(len(batch))
+                    + " triples) failed after "
+                    + str(num_triples)
+                    + " triples: "
+                    + str(e)
+                )
+                raise
+            num_triples += len(batch)
+            logging.debug(
+                ".. Added batch "
+                + str(idx)
+                + " ("
+                + str(len(batch))
+                + " triples) in "
+                + "{:.3f}".format(time.perf_counter() - batch_start)
+                + "s"
+            )
+        logging.info(
+            ".. Added "
+            + str(num_triples)
+            + " triples in "
+            + "{:.1f}".format(time.perf_counter() - start)
+            + "s"
+        )
 
-    def __parse_file(self, file: str = None):
+    def __parse_file(self, file: str = None, workers: int = 1):
         """
         Read data from a file.
 
         filename ending with "naf.xml": file is read and parsed as
         an xml file in NLP Annotation Format.
         filename ending with "zip": file is extracted and content
-        is parsed.
+        is parsed (in parallel if workers > 1).
+        filename ending with "nt" or "hext": file is parsed line by line.
 
         :param file: a filename.
 
+        :param workers: the number of processes that parse the files in a zip file
+
         :return: None
 
         """
@@ -175,58 +580,87 @@ class NifGraph(Graph):
                 logging.info(".. Parsing file " + file + "")
                 nafdocument = NafDocument().open(file)
                 self.__parse_nafdocument(nafdocument=nafdocument)
-            else:
+            elif file[-3:].lower() == "zip" or _is_line_based(file):
                 if file[-3:].lower() == "zip":
                     # if zip file then parse all files in zip
                     with ZipFile(file, mode="r") as zipfile:
                         logging.info(".. Reading zip file " + file)
-                        for filename in zipfile.namelist():
-                            with zipfile.open(filename) as f:
-                                logging.info(
-                                    ".. Parsing file " + filename + " from zip file"
-                                )
-                                if filename[-4:].lower() == "hext":
-                                    self += Graph().parse(
-                                        data=f.read().decode(), format="hext"
-                                    )
-                                elif filename[-3:].lower() == "ttl":
-                                    self += Graph().parse(
-                                        data=f.read().decode(), format="turtle"
-                                    )
-                                else:
-                                    self += Graph().parse(data=f.read().decode())
-                elif file[-4:].lower() == "hext":
-                    # if file ends with .hext then parse as hext file
-                    with open(file, encoding="utf-8") as f:
-                        logging.info(".. Parsing file " + file + "")
-                        self += Graph().parse(data=f.read(), format="hext")
+                        sources = [
+                            (file, filename)
+                            for filename in zipfile.namelist()
+                            if filename[-1:] != "/"
+                        ]
                 else:
-                    # otherwise let rdflib determine format
-                    with open(file, encoding="utf-8") as f:
-                        logging.info(".. Parsing file " + file + "")
-                        self += Graph().parse(data=f.read())
+                    sources = [file]
+                # the batches of triples are written by this process only
+                for batch in parallel_batches(_triple_batches, sources, workers):
+                    self.addN((s, p, o, self) for s, p, o in batch)
+            else:
+                # otherwise let rdflib determine format and parse into this graph
+                logging.info(".. Parsing file " + file + "")
+                self.parse(source=file, format=_rdf_format(file))
+
+    def __parse_files(self, files: List[str] = None, workers: int = 1):
+        """
+        Read data from a list of files.
+
+        Every file (or every file in a zip file) is a document that is parsed (and
+        converted to NIF if it is a NAF file ending with "naf.xml") in a pool of
+        worker processes. The workers send compact batches of triples to this
+        process, which is the only one that writes to the graph.
+
+        :param files: a list of filenames.
+
+        :param workers: the number of processes that parse the files
+
+        :return: None
+
+        """
+        sources = []
+        for file in files:
+            if file[-3:].lower() == "zip":
+                with ZipFile(file, mode="r") as zipfile:
+                    sources.extend(
+                        (file, filename)
+                        for filename in zipfile.namelist()
+                        if filename[-1:] != "/"
+                    )
+            else:
+                sources.append(file)
+        logging.info(".. Parsing " + str(len(sources)) + " documents")
+        start = last = time.perf_counter()
+        documents = 0
+        for terms, ids, done in parallel_batches(
+            partial(_document_batches, URIScheme=self.URIScheme), sources, workers
+        ):
+            self.addN((s, p, o, self) for s, p, o in _expand_batch(terms, ids))
+            documents += done
+            if done and time.perf_counter() - last > 10:
+                last = time.perf_counter()
+                _log_throughput(documents, last - start)
+        _log_throughput(documents, time.perf_counter() - start)
 
     @property
-    def contexts(self, uri: str = DEFAULT_URI) -> list:
+    def contexts(self, uri: str = DEFAULT_URI) -> NifView:
         """
         This property constructs and returns a nif:Context from the NifGraph.
 
-        return list of nif:Context in the graph
+        return a lazy view (NifView) of the nif:Context in the graph
 
         """
-        uris = list(self.subjects(RDF.type, NIF.Context))
-        return [NifContext(uri=uri, graph=self) for uri in uris]
+        return NifView(self, (None, RDF.type, NIF.Context), NifContext)
 
     @property
-    def collections(self, uri: str = DEFAULT_URI) -> list:
+    def collections(self, uri: str = DEFAULT_URI) -> NifView:
         """
         This property constructs and returns a list of nif:ContextCollection from the NifGraph.
 
-        return list of `nif:ContextCollection` in the graph
+        return a lazy view (NifView) of the `nif:ContextCollection` in the graph
 
         """
-        uris = list(self.subjects(RDF.type, NIF.ContextCollection))
-        return [NifContextCollection(uri=uri, graph=self) for uri in uris]
+        return NifView(
+            self, (None, RDF.type, NIF.ContextCollection), NifContextCollection
+        )
 
     @property
     def collection(self, uri: str = DEFAULT_URI) -> NifContextCollection:
@@ -285,92 +719,143 @@ class NifGraph(Graph):
         #         collection.add_context(context=nif_context)
         #     return collection
 
-    @property
-    def catalog(self):
-        """ """
-        # derive the conformsTo from the collection
+    def add(self, triple: tuple = None):
+        self._modifications += 1
+        return super(NifGraph, self).add(triple)
+
+    def addN(self, quads=None):
+        self._modifications += 1
+        return super(NifGraph, self).addN(quads)
+
+    def remove(self, triple: tuple = None):
+        self._modifications += 1
+        return super(NifGraph, self).remove(triple)
+
+    def update(self, *args, **kwargs):
+        self._modifications += 1
+        return super(NifGraph, self).update(*args, **kwargs)
+
+    def _typed_rows(self, rdf_type: URIRef = None, chunk_size: int = None):
+        """
+        Generator of the (s, p, o) rows of all subjects s of rdf_type, in chunks
+        of chunk_size rows (ordered and with LIMIT and OFFSET) if the graph is in
+        a SPARQL store
+
+        :param rdf_type: the rdf:type of the subjects
+
+        :param chunk_size: the number of rows in a chunk of a remote query
+
+        """
         if isinstance(self.store, sparqlstore.SPARQLUpdateStore):
             q = (
-                """
-            SELECT ?s ?p ?o
-            WHERE {
-                SERVICE <"""
+                "SELECT ?s ?p ?o WHERE { SERVICE <"
                 + self.store.query_endpoint
-                + """>
-                {
-                    ?s rdf:type nif:ContextCollection .
-                    ?s ?p ?o .
-                }
-            }"""
+                + "> { ?s rdf:type "
+                + rdf_type.n3()
+                + " . ?s ?p ?o . } } ORDER BY ?s ?p ?o LIMIT "
+                + str(chunk_size)
+                + " OFFSET "
             )
+            offset = 0
+            while True:
+                rows = 0
+                for row in self.query(q + str(offset)):
+                    rows += 1
+                    yield row
+                if rows < chunk_size:
+                    break
+                offset += chunk_size
         else:
-            q = """
-            SELECT ?s ?p ?o
-            WHERE {
-                ?s rdf:type nif:ContextCollection .
-                ?s ?p ?o .
-            }"""
-        results = self.query(q)
+            for s in self.subjects(RDF.type, rdf_type):
+                for p, o in self.predicate_objects(s):
+                    yield s, p, o
+
+    @property
+    def catalog(self):
+        """
+        This property returns a DataFrame with the contexts in the graph (in the
+        index) with their dc and dcterms metadata and their collection.
+
+        The catalog is cached until the graph is changed via this NifGraph, see
+        get_catalog.
+
+        """
+        return self.get_catalog()
+
+    def get_catalog(
+        self, chunk_size: int = 10**5, refresh: bool = False
+    ) -> pd.DataFrame:
+        """
+        Function that returns a DataFrame with the contexts in the graph (in the
+        index) with their dc and dcterms metadata and their collection.
+
+        The catalog of a local store is cached until the graph is changed via this
+        NifGraph. Changes by other graphs on the same store are not detected, use
+        refresh=True to read the catalog again. The catalog of a SPARQL store is
+        not cached because the endpoint can be changed by others.
+
+        :param chunk_size: the number of rows that is retrieved at once from a
+            SPARQL store
+
+        :param refresh: if True then the cached catalog is not used
+
+        """
+        remote = isinstance(self.store, sparqlstore.SPARQLStore)
+        if (
+            not refresh
+            and not remote
+            and self._catalog is not None
+            and self._catalog[0] == self._modifications
+        ):
+            return self._catalog[1].copy()
+        modifications = self._modifications
+
+        # the collection and the conformsTo of the contexts
         collections = defaultdict(dict)
-        for s, p, o in results:
+        for s, p, o in self._typed_rows(NIF.ContextCollection, chunk_size):
             if p == NIF.hasContext:
-                if collections[s].get(p, None) is None:
-                    collections[s][p] = [o]
-                else:
-                    collections[s][p].append(o)
+                collections[s].setdefault(p, []).append(o)
             else:
                 collections[s][p] = o
-
-        # find all context in the graphs with corresponding data
-        if isinstance(self.store, sparqlstore.SPARQLUpdateStore):
-            q = (
-                """
-            SELECT ?s ?p ?o 
-            WHERE { 
-                SERVICE <"""
-                + self.store.query_endpoint
-                + """>
-                {
-                    ?s rdf:type nif:Context . ?s ?p ?o . 
-                }
-            }"""
-            )
-        else:
-            q = """
-            SELECT ?s ?p ?o 
-            WHERE { 
-                ?s rdf:type nif:Context . ?s ?p ?o . 
-            }"""
-        results = self.query(q)
-
-        # construct DataFrame from query results
-        d = defaultdict(dict)
-        index = list()
-        columns = set()
-        for result in results:
-            idx = result[0]
-            col = result[1].n3(self.namespace_manager)
-            if isinstance(result[2], Literal):
-                val = result[2].value
-            else:
-                val = result[2]
+        context_index, collection_data = [], []
+        for c, values in collections.items():
+            for context in values.get(NIF.hasContext, []):
+                context_index.append(context)
+                collection_data.append((values.get(DCTERMS.conformsTo), c))
+
+        # the dc and dcterms metadata of the contexts
+        index, subjects, columns, values = dict(), [], [], []
+        names = dict()
+        for s, p, o in self._typed_rows(NIF.Context, chunk_size):
+            index[s] = None
+            col = names.get(p)
+            if col is None:
+                col = names[p] = p.n3(self.namespace_manager)
             if "dc:" in col or "dcterms:" in col:
-                d[idx][col] = val
-                columns.add(col)
-            if idx not in index:
-                index.append(idx)
-
-        df = pd.DataFrame(
-            index=index,
-            columns=list(columns),
-            data=[[d[idx][col] for col in columns] for idx in index],
+                subjects.append(s)
+                columns.append(col)
+                values.append(o.value if isinstance(o, Literal) else o)
+
+        df = (
+            pd.DataFrame({"s": subjects, "col": columns, "val": values})
+            .drop_duplicates(["s", "col"], keep="last")
+            .pivot(index="s", columns="col", values="val")
+            .reindex(list(index.keys()))
+            .infer_objects()
         )
-        for idx in df.index:
-            for c in collections.keys():
-                if idx in collections[c][NIF.hasContext]:
-                    df.loc[idx, DCTERMS.conformsTo] = collections[c][DCTERMS.conformsTo]
-                    df.loc[idx, NIF.ContextCollection] = c
+        df.index.name, df.columns.name = None, None
+        if context_index:
+            mapping = pd.DataFrame(
+                data=collection_data,
+                index=context_index,
+                columns=[DCTERMS.conformsTo, NIF.ContextCollection],
+            )
+            mapping = mapping[~mapping.index.duplicated(keep="last")]
+            df = df.join(mapping)
         df = df.reindex(sorted(df.columns), axis=1)
+        if not remote:
+            self._catalog = (modifications, df)
+            return df.copy()
         return df
 
     # def query_rdf_type(self, rdf_type: URIRef = None):
@@ -425,163 +910,314 @@ class NifGraph(Graph):
     #     return d
 
     def context_graph(self, uri: URIRef = None):
-        """ """
-        if isinstance(self.store, rdflib.plugins.stores.sparqlstore.SPARQLUpdateStore):
+        """
+        Function that returns a graph with the triples of a context
+
+        :param uri: the uri of the context
+
+        """
+        for _, graph in self.context_graphs(uris=[uri]):
+            return graph
+
+    def context_graphs(
+        self, uris: list = None, batch_size: int = 2**6, workers: int = 1
+    ):
+        """
+        Generator of the (uri, graph) pairs of contexts, where each graph is an
+        in-memory graph with the triples of the context. The triples of
+        batch_size contexts are retrieved with one CONSTRUCT query if the graph
+        is in a SPARQL store.
+
+        Use dict(graph.context_graphs(uris)) to get a dict of the graphs.
+
+        :param uris: the uris of the contexts
+
+        :param batch_size: the number of contexts of which the triples are
+            retrieved at once
+
+        :param workers: the number of threads that send queries concurrently
+
+        """
+        batches = [
+            [URIRef(uri) for uri in uris[start : start + batch_size]]
+            for start in range(0, len(uris), batch_size)
+        ]
+        if workers > 1 and isinstance(self.store, sparqlstore.SPARQLUpdateStore):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for batch, triples in zip(
+                    batches, executor.map(self._context_triples, batches)
+                ):
+                    for item in _split_context_graphs(batch, triples):
+                        yield item
+        else:
+            for batch in batches:
+                triples = self._context_triples(batch)
+                for item in _split_context_graphs(batch, triples):
+                    yield item
+
+    def _context_triples(self, uris: list = None) -> list:
+        """
+        Function that returns the triples of the strings of the contexts in uris
+        """
+        if isinstance(self.store, sparqlstore.SPARQLUpdateStore):
             q = (
                 """
-            SELECT ?s ?p ?o
+            CONSTRUCT { ?s ?p ?o . }
             WHERE {
                 SERVICE <"""
-                + graph.store.query_endpoint
+                + self.store.query_endpoint
                 + """>
                 {
-                    ?s nif:referenceContext """
-                + uri.n3(graph.namespace_manager)
-                + """ .
+                    VALUES ?c { """
+                + " ".join(uri.n3() for uri in uris)
+                + """ }
+                    ?s nif:referenceContext ?c .
                     ?s ?p ?o .
                 }
             }"""
             )
+            return list(self.query(q))
         else:
-            q = (
-                """
-            SELECT ?s ?p ?o
-            WHERE {
-                ?s nif:referenceContext """
-                + uri.n3(graph.namespace_manager)
-                + """ .
-                ?s ?p ?o .
-            }"""
-            )
-        results = self.query(q)
-
-        graph = Graph(store="SimpleMemory")
-        for s, p, o in results:
-            # necessary if data is read from http protocol
-            if isinstance(o, Literal) and isinstance(o.value, str):
-                o = Literal(o.value.replace("\r\n", "\n"), datatype=XSD.string)
-            graph.add((s, p, o))
-        return graph
+            return [
+                (s, p, o)
+                for uri in uris
+                for s in self.subjects(NIF.referenceContext, uri)
+                for p, o in self.predicate_objects(s)
+            ]
 
     @property
     def lexicon(self):
-        """ """
-
-        def noNumber(s: str = ""):
-            return not s.replace(".", "", 1).replace(",", "", 1).isdigit()
+        """
+        This property returns a dict with a Lexicon per language with one
+        lexical entry per lemma of the words in the graph
 
-        # query for all anchorOfs of all word with optional lemma
-        if isinstance(self.store, rdflib.plugins.stores.sparqlstore.SPARQLUpdateStore):
-            q = (
-                """
-                SELECT ?anchor ?lemma ?pos ?lang
-                WHERE {
-                    SERVICE <"""
-                + graph.store.query_endpoint
-                + """>
-                    {
-                        ?w rdf:type nif:Word .
-                        ?w nif:anchorOf ?anchor .
-                        ?w nif:referenceContext ?context .
-                        OPTIONAL {?w nif:lemma ?lemma . } .
-                        OPTIONAL {?w nif:pos ?pos . } .
-                        OPTIONAL {?context dc:language ?lang }
-                    }
-                }"""
-            )
-        else:
-            q = """
-                SELECT ?anchor ?lemma ?pos ?lang
-                WHERE {
-                    ?w rdf:type nif:Word .
-                    ?w nif:anchorOf ?anchor .
-                    ?w nif:referenceContext ?context .
-                    OPTIONAL {?w nif:lemma ?lemma . } .
-                    OPTIONAL {?w nif:pos ?pos . } .
-                    OPTIONAL {?context dc:language ?lang }
-                }
-            """
-        # execute the query
-        results = self.query(q)
+        """
+        return self.get_lexicon()
 
-        lexica = dict()
+    def get_lexicon(self, page_size: int = 10**5, workers: int = 1) -> dict:
+        """
+        Function that returns a dict with a Lexicon per language with one lexical
+        entry per lemma of the words in the graph, with the lemmas as canonical
+        form, the other anchors of the lemma as other forms and the parts of
+        speech of the words.
 
-        for anchorOf, lemma, pos, lang in results:
-            if lemma is not None and noNumber(lemma):
-                # default language is "en"
-                if lang is None:
-                    lang = "en"
+        :param page_size: the number of rows that is retrieved at once from a
+            SPARQL store
 
-                # construct lexicon if necessary
-                if lang not in lexica.keys():
-                    lexica[lang] = Lexicon(uri=URIRef(DEFAULT_URI + "lexicon/" + lang))
-                    lexica[lang].set_language(lang)
+        :param workers: the number of threads that retrieve the rows of the
+            languages concurrently from a SPARQL store
 
-                # derive lexical entry uri from the lemma
-                if not isinstance(lemma, URIRef):
-                    entry_uri = to_iri(str(lexica[lang].uri) + "/" + lemma)
-                else:
-                    entry_uri = lemma
+        """
+        if isinstance(self.store, sparqlstore.SPARQLUpdateStore):
+            if workers > 1:
+                q = (
+                    "SELECT DISTINCT ?lang WHERE { SERVICE <"
+                    + self.store.query_endpoint
+                    + "> { ?context rdf:type nif:Context . "
+                    + "?context dc:language ?lang . } }"
+                )
+                languages = [row[0] for row in self.query(q)] + [None]
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    entries = dict()
+                    for lang_entries in executor.map(
+                        lambda lang: _lexicon_entries(
+                            self._lexicon_rows(page_size, lang)
+                        ),
+                        languages,
+                    ):
+                        entries.update(lang_entries)
+            else:
+                entries = _lexicon_entries(self._lexicon_rows(page_size))
+        else:
+            entries = _lexicon_entries(self._local_lexicon_rows())
 
-                # create the lexical entry
+        lexica = dict()
+        for lang, lang_entries in entries.items():
+            lexica[lang] = Lexicon(uri=URIRef(DEFAULT_URI + "lexicon/" + lang))
+            lexica[lang].set_language(lang)
+            for entry_uri, (lemmas, anchors, pos) in lang_entries.items():
                 entry = LexicalEntry(uri=entry_uri, language=lexica[lang].language)
-
                 # set canonicalForm (this is the lemma)
                 entry.set_canonicalForm(
                     Form(
                         uri=URIRef(entry_uri),
                         formVariant="canonicalForm",
-                        writtenReps=[lemma],
+                        writtenReps=list(lemmas),
                     )
                 )
-
-                # set otherForm if the anchorOf is not the same as the lemma
-                if anchorOf.value != lemma.value:
+                # set otherForm with the anchorOfs that are not the same as the lemma
+                if anchors:
                     entry.set_otherForms(
                         [
                             Form(
                                 uri=URIRef(entry_uri),
                                 formVariant="otherForm",
-                                writtenReps=[anchorOf],
+                                writtenReps=list(anchors),
                             )
                         ]
                     )
-
                 # set part of speech if it exists
-                if pos is not None:
-                    entry.set_partOfSpeechs([pos])
-
+                if pos:
+                    entry.set_partOfSpeechs(list(pos))
                 lexica[lang].add_entry(entry)
-
         return lexica
 
+    def _lexicon_rows(self, page_size: int = 10**5, lang="all"):
+        """
+        Generator of the distinct (anchor, lemma, pos, lang) rows of the words with
+        a lemma in a SPARQL store, in pages of page_size rows
+
+        :param page_size: the number of rows in a page
+
+        :param lang: the language of the rows (None for words of contexts without
+            language), all languages if "all"
+
+        """
+        if lang is None:
+            language_filter = "FILTER (!BOUND(?lang))"
+        elif lang != "all":
+            language_filter = "FILTER (sameTerm(?lang, " + lang.n3() + "))"
+        else:
+            language_filter = ""
+        q = (
+            """
+            SELECT DISTINCT ?anchor ?lemma ?pos ?lang
+            WHERE {
+                SERVICE <"""
+            + self.store.query_endpoint
+            + """>
+                {
+                    ?w rdf:type nif:Word .
+                    ?w nif:anchorOf ?anchor .
+                    ?w nif:referenceContext ?context .
+                    ?w nif:lemma ?lemma .
+                    OPTIONAL {?w nif:pos ?pos . } .
+                    OPTIONAL {?context dc:language ?lang }
+                    """
+            + language_filter
+            + """
+                }
+            }
+            ORDER BY ?lemma ?anchor ?pos ?lang LIMIT """
+            + str(page_size)
+            + " OFFSET "
+        )
+        offset = 0
+        while True:
+            rows = 0
+            for row in self.query(q + str(offset)):
+                rows += 1
+                yield row
+            if rows < page_size:
+                break
+            offset += page_size
+
+    def _local_lexicon_rows(self):
+        """
+        Generator of the (anchor, lemma, pos, lang) rows of the words with a lemma
+        """
+        languages = dict()
+        for w in self.subjects(RDF.type, NIF.Word):
+            lemmas = list(self.objects(w, NIF.lemma))
+            if not lemmas:
+                continue
+            anchors = list(self.objects(w, NIF.anchorOf))
+            pos = list(self.objects(w, NIF.pos)) or [None]
+            for context in self.objects(w, NIF.referenceContext):
+                langs = languages.get(context)
+                if langs is None:
+                    langs = list(self.objects(context, DC.language)) or [None]
+                    languages[context] = langs
+                for row in product(anchors, lemmas, pos, langs):
+                    yield row
+
     def get(self, uri: URIRef = None):
-        """ """
+        """
+        Function that returns the NIF object of a uri (None if the uri is not found)
+
+        :param uri: the uri of the object
+
+        """
         if uri is None:
             return None
-        else:
-            r = list(self.triples([uri, RDF.type, None]))
-            if len(r) > 0:
-                rdf_type = r[0][2]
-            else:
-                logging.warning("uri not found: " + str(uri))
-                return None
+        return self.get_many(uris=[uri])[0]
+
+    def get_many(self, uris: list = None, batch_size: int = 2**8) -> list:
+        """
+        Function that returns the NIF objects of a list of uris in the same order
+        (None for a uri that is not found). The types and reference contexts of
+        the uris are retrieved at once (with one query per batch of uris if the
+        graph is in a SPARQL store) and every reference context is created once.
 
-            if rdf_type == NIF.ContextCollection:
-                collection = NifContextCollection(uri=uri, graph=self)
-                return collection
+        :param uris: the uris of the objects
+
+        :param batch_size: the number of uris of which the types are retrieved
+            with one query from a SPARQL store
+
+        """
+        uris = [URIRef(uri) for uri in uris]
+        types, references = self._types_and_contexts(uris, batch_size)
+        contexts = dict()
+        objects = []
+        for uri in uris:
+            rdf_type = next((t for t in NIF_TYPES if t in types.get(uri, ())), None)
+            if rdf_type is None:
+                if uri not in types:
+                    logging.warning("uri not found: " + str(uri))
+                objects.append(None)
+            elif rdf_type == NIF.ContextCollection:
+                objects.append(NifContextCollection(uri=uri, graph=self))
             elif rdf_type == NIF.Context:
-                return NifContext(uri=uri, graph=self)
+                context = contexts.get(uri)
+                if context is None:
+                    context = contexts[uri] = NifContext(uri=uri, graph=self)
+                objects.append(context)
             else:
-                context_uri = uri.split("&nif=")[0] + "&nif=context"
-                context = NifContext(uri=context_uri, graph=self)
-                if rdf_type == NIF.Sentence:
-                    return NifSentence(uri=uri, referenceContext=context, graph=self)
-                elif rdf_type == NIF.Page:
-                    return NifPage(uri=uri, referenceContext=context, graph=self)
-                elif rdf_type == NIF.Paragraph:
-                    return NifParagraph(uri=uri, referenceContext=context, graph=self)
-                elif rdf_type == NIF.Phrase:
-                    return NifPhrase(uri=uri, referenceContext=context, graph=self)
-                elif rdf_type == NIF.Word:
-                    return NifWord(uri=uri, referenceContext=context, graph=self)
+                context_uri = references.get(uri)
+                if context_uri is None:
+                    context_uri = URIRef(uri.split("&nif=")[0] + "&nif=context")
+                context = contexts.get(context_uri)
+                if context is None:
+                    context = contexts[context_uri] = NifContext(
+                        uri=context_uri, graph=self
+                    )
+                objects.append(
+                    NIF_TYPES[rdf_type](uri=uri, referenceContext=context, graph=self)
+                )
+        return objects
+
+    def _types_and_contexts(self, uris: list = None, batch_size: int = 2**8):
+        """
+        Function that returns dicts with the rdf:types and the nif:referenceContext
+        of uris
+        """
+        types, references = defaultdict(set), dict()
+        if isinstance(self.store, sparqlstore.SPARQLUpdateStore):
+            for start in range(0, len(uris), batch_size):
+                q = (
+                    """
+            SELECT ?s ?type ?context
+            WHERE {
+                SERVICE <"""
+                    + self.store.query_endpoint
+                    + """>
+                {
+                    VALUES ?s { """
+                    + " ".join(uri.n3() for uri in uris[start : start + batch_size])
+                    + """ }
+                    ?s rdf:type ?type .
+                    OPTIONAL { ?s nif:referenceContext ?context . }
+                }
+            }"""
+                )
+                for uri, rdf_type, context in self.query(q):
+                    types[uri].add(rdf_type)
+                    if context is not None:
+                        references[uri] = context
+        else:
+            for uri in set(uris):
+                for rdf_type in self.objects(uri, RDF.type):
+                    types[uri].add(rdf_type)
+                for context in self.objects(uri, NIF.referenceContext):
+                    references[uri] = context
+        return types, references
@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import OrderedDict, defaultdict, deque
+from itertools import accumulate, islice
+from types import SimpleNamespace
 from typing import Union, List
 
 import iribaker
+import numpy as np
+import pandas as pd
 from rdflib import Graph
 from rdflib.namespace import DC, DCTERMS, RDF, XSD
+from rdflib.plugins.stores import sparqlstore
 from rdflib.term import IdentifiedNode, Literal, URIRef
 
 from .const import (
@@ -21,7 +29,12 @@ from .const import (
     mapobject,
     upos2olia,
 )
-from .utils import tokenize_text, delete_accents, delete_diacritics, natural_sort
+from .utils import (
+    tokenize_offsets,
+    delete_accents,
+    delete_diacritics,
+    natural_sort,
+)
 
 
 class NifContext:
@@ -48,6 +61,14 @@ class NifWord:
     pass
 
 
+class NifWordTable:
+    pass
+
+
+class NifContextCollection:
+    pass
+
+
 class NifBase(object):
     """
     A NIF Base
@@ -56,6 +77,8 @@ class NifBase(object):
 
     """
 
+    __slots__ = ("_uri",)
+
     def __init__(self, uri: Union[URIRef, str] = None):
         self.set_uri(uri)
 
@@ -100,6 +123,15 @@ class NifString(NifBase):
 
     """
 
+    __slots__ = (
+        "graph",
+        "_URIScheme",
+        "_beginIndex",
+        "_endIndex",
+        "_base_uri",
+        "_referenceContext",
+    )
+
     def __init__(
         self,
         URIScheme: str = None,
@@ -133,7 +165,7 @@ class NifString(NifBase):
         Returns the start index of the context string as an `int`.
         """
         if self._beginIndex is not None:
-            return int(self._beginIndex)
+            return self._beginIndex
         elif self.graph is not None:
             for item in self.graph.objects(subject=self.uri, predicate=NIF.beginIndex):
                 return int(item)
@@ -146,7 +178,7 @@ class NifString(NifBase):
         Returns the end index of the context string as an `int`.
         """
         if self._endIndex is not None:
-            return int(self._endIndex)
+            return self._endIndex
         elif self.graph is not None:
             for item in self.graph.objects(subject=self.uri, predicate=NIF.endIndex):
                 return int(item)
@@ -260,22 +292,22 @@ class NifString(NifBase):
     def set_beginIndex(self, beginIndex: Union[Literal, int] = None):
         """
         Sets the start of the index of the string. The type of beginIndex can be a `Literal` or
-        an `int`. If the type is an `int` then it is converted to a Literal.
+        an `int`. It is stored as an `int` and converted to a Literal in the triples.
         """
-        if isinstance(beginIndex, int) or isinstance(beginIndex, str):
-            self._beginIndex = Literal(beginIndex, datatype=XSD.nonNegativeInteger)
+        if beginIndex is not None:
+            self._beginIndex = int(beginIndex)
         else:
-            self._beginIndex = beginIndex
+            self._beginIndex = None
 
     def set_endIndex(self, endIndex: Union[Literal, int] = None):
         """
         Sets the end of the index of the string. The type of endIndex can be a `Literal` or
-        an `int`. If the type is an `int` then it is converted to a Literal.
+        an `int`. It is stored as an `int` and converted to a Literal in the triples.
         """
-        if isinstance(endIndex, int) or isinstance(endIndex, str):
-            self._endIndex = Literal(endIndex, datatype=XSD.nonNegativeInteger)
+        if endIndex is not None:
+            self._endIndex = int(endIndex)
         else:
-            self._endIndex = endIndex
+            self._endIndex = None
 
     def set_referenceContext(self, referenceContext: NifContext = None):
         """
@@ -320,9 +352,17 @@ class NifString(NifBase):
                     yield (self.uri, RDF.type, NIF.RFC5147String)
                 yield (self.uri, RDF.type, NIF.String)
                 if self._beginIndex is not None:
-                    yield (self.uri, NIF.beginIndex, self._beginIndex)
+                    yield (
+                        self.uri,
+                        NIF.beginIndex,
+                        Literal(self._beginIndex, datatype=XSD.nonNegativeInteger),
+                    )
                 if self._endIndex is not None:
-                    yield (self.uri, NIF.endIndex, self._endIndex)
+                    yield (
+                        self.uri,
+                        NIF.endIndex,
+                        Literal(self._endIndex, datatype=XSD.nonNegativeInteger),
+                    )
                 if self._referenceContext is not None:
                     yield (self.uri, NIF.referenceContext, self._referenceContext.uri)
 
@@ -476,8 +516,7 @@ class NifContext(NifString):
         """
         Returns the first sentence of the context.
         """
-        if self._sentences is None and self.graph is not None:
-            self.load_sentences()
+        self._load_sentences()
 
         if self._sentences is not None:
             return self._sentences[0]
@@ -489,8 +528,7 @@ class NifContext(NifString):
         """
         Returns the last sentence of the context.
         """
-        if self._sentences is None and self.graph is not None:
-            self.load_sentences()
+        self._load_sentences()
 
         if self._sentences is not None:
             return self._sentences[-1]
@@ -502,8 +540,7 @@ class NifContext(NifString):
         """
         Returns all sentences in the context as a list.
         """
-        if self._sentences is None and self.graph is not None:
-            self.load_sentences()
+        self._load_sentences()
 
         if self._sentences is not None:
             return list(self._sentences)
@@ -683,6 +720,7 @@ class NifContext(NifString):
         """
         Sets the pages of the context (a list of NifPage)
         """
+        self._index = None
         if pages is not None and pages != []:
             self._pages = deque(pages)
         else:
@@ -692,6 +730,7 @@ class NifContext(NifString):
         """
         Sets the paragraphs of the context (a list of NifParagraph)
         """
+        self._index = None
         if paragraphs is not None and paragraphs != []:
             self._paragraphs = deque(paragraphs)
         else:
@@ -701,6 +740,7 @@ class NifContext(NifString):
         """
         Sets the phrases of the context (a list of NifPhrases)
         """
+        self._index = None
         if phrases is not None and phrases != []:
             self._phrases = deque(phrases)
         else:
@@ -710,6 +750,8 @@ class NifContext(NifString):
         """
         Sets the sentences of the context (a list of NifSentence)
         """
+        self._index = None
+        self._word_table = None
         if sentences is not None and sentences != []:
             self._sentences = deque(sentences)
         else:
@@ -720,58 +762,77 @@ class NifContext(NifString):
         Adds a sentences to the context (a NifSentence)
         """
         if sentence is not None:
+            if self._sentences is None and self._word_table is not None:
+                self.load_word_table()
+            self._word_table = None
             if self._sentences is None:
                 self._sentences = deque([sentence])
             else:
                 self._sentences.append(sentence)
+            if self._index is not None:
+                self._index.add(sentence)
+                for word in sentence._words or []:
+                    self._index.add(word)
 
-    def triples(self, objects=None):
-        """
-        Generates all the triples
+    @property
+    def index(self):
+        """
+        Returns the interval index (a NifIndex) of the pages, paragraphs, sentences,
+        phrases and words of the context
+        """
+        if self._index is None:
+            index = NifIndex()
+            for strings in [self.pages, self.paragraphs, self.phrases]:
+                for string in strings or []:
+                    index.add(string)
+            for sentence in self.sentences or []:
+                index.add(sentence)
+                for word in sentence._words or []:
+                    index.add(word)
+            self._index = index
+        return self._index
+
+    @property
+    def word_table(self):
         """
-        if objects is None or any([isinstance(self, obj) for obj in objects]):
-            if self.uri is not None:
-                yield (self.uri, RDF.type, NIF.Context)
-                for key in self._metadata.keys():
-                    yield (self.uri, key, self._metadata[key])
-                if self._isString is not None:
-                    yield (self.uri, NIF.isString, self._isString)
-                if self._sourceUrl is not None:
-                    yield (self.uri, NIF.sourceUrl, self._sourceUrl)
-                if self._predLang is not None:
-                    yield (self.uri, NIF.predLang, self._predLang)
-                if self.firstSentence is not None:
-                    yield (self.uri, NIF.firstSentence, self.firstSentence.uri)
-                if self.lastSentence is not None:
-                    yield (self.uri, NIF.lastSentence, self.lastSentence.uri)
-            for triple in super().triples(objects=objects):
-                yield triple
+        Returns the columnar table (a NifWordTable) of the words of the context
 
-        if self._sentences is not None:
-            for sentence in self._sentences:
-                for triple in sentence.triples(objects=objects):
-                    yield triple
+        The table is filled by load_from_dict, otherwise it is created from the
+        sentences and words of the context. Changes to the words after the table
+        is created are not in the table.
+        """
+        if self._word_table is None:
+            sentences = self.sentences
+            if sentences is not None:
+                self._word_table = NifWordTable.from_sentences(sentences)
+        return self._word_table
 
-        if self._paragraphs is not None:
-            for paragraph in self._paragraphs:
-                for triple in paragraph.triples(objects=objects):
-                    yield triple
+    def set_word_table(self, word_table: NifWordTable = None):
+        """
+        Sets the word table of the context, the sentences and words of the context
+        are created from the table when they are used
+        """
+        self.set_Sentences(None)
+        self._word_table = word_table
 
-        if self._pages is not None:
-            for page in self._pages:
-                for triple in page.triples(objects=objects):
-                    yield triple
+    def _load_sentences(self):
+        if self._sentences is None:
+            if self._word_table is not None:
+                self.load_word_table()
+            elif self.graph is not None:
+                self.load_sentences()
 
-        if self._phrases is not None:
-            for phrase in self._phrases:
-                for triple in phrase.triples(objects=objects):
-                    yield triple
+    def triples(self, objects=None):
+        """
+        Generates all the triples
+        """
+        return _TripleEmitter(objects).context(self)
 
     def extract_sentences(self, forced_sentence_split_characters: list = []):
         """
         Tokenize the string of the context and add sentences to the context
         """
-        text_dict = tokenize_text(
+        text_dict = tokenize_offsets(
             self.isString,
             forced_sentence_split_characters=forced_sentence_split_characters,
         )
@@ -780,53 +841,116 @@ class NifContext(NifString):
             for sent_idx, sent in enumerate(text_dict):
                 nif_sent = NifSentence(
                     base_uri=self.uri,
-                    beginIndex=sent[0]["start_char"],
-                    endIndex=sent[-1]["end_char"],
+                    beginIndex=sent.start_char,
+                    endIndex=sent.end_char,
                     referenceContext=self,
                 )
                 sent_list.append(nif_sent)
             self.set_Sentences(sent_list)
 
+    def _string_index(self, rdf_types: list = None) -> dict:
+        """
+        Function that returns the properties of the strings of the context of which
+        the type is in rdf_types, as a dict of dicts of lists of objects
+
+        The triples are read in one pass over the strings of the context or, for a
+        SPARQL store, with one CONSTRUCT query.
+        """
+        index = defaultdict(lambda: defaultdict(list))
+        if isinstance(self.graph.store, sparqlstore.SPARQLUpdateStore):
+            q = (
+                "CONSTRUCT { ?s ?p ?o . } WHERE { SERVICE <"
+                + self.graph.store.query_endpoint
+                + "> { VALUES ?t { "
+                + " ".join(rdf_type.n3() for rdf_type in rdf_types)
+                + " } ?s "
+                + NIF.referenceContext.n3()
+                + " "
+                + self.uri.n3()
+                + " . ?s "
+                + RDF.type.n3()
+                + " ?t . ?s ?p ?o . } }"
+            )
+            for s, p, o in self.graph.query(q):
+                index[s][p].append(o)
+        else:
+            for s in self.graph.subjects(
+                predicate=NIF.referenceContext, object=self.uri
+            ):
+                for p, o in self.graph.predicate_objects(s):
+                    index[s][p].append(o)
+        return {
+            s: properties
+            for s, properties in index.items()
+            if any(rdf_type in properties[RDF.type] for rdf_type in rdf_types)
+        }
+
     def load_sentences(self):
-        """ """
-        sent_uris = natural_sort(
-            [
-                s
-                for s in self.graph.subjects(
-                    predicate=NIF.referenceContext, object=self.uri
-                )
-                if list(self.graph.triples([s, RDF.type, NIF.Sentence])) != []
-            ]
-        )
+        """
+        Load the sentences and the words of the context from the graph
+
+        All sentence and word triples of the context are read at once, the
+        properties of the words are set from these triples, so they are not
+        queried separately.
+        """
+        index = self._string_index([NIF.Sentence, NIF.Word])
+        sent_uris = []
+        word_uris = defaultdict(list)
+        for uri, properties in index.items():
+            if NIF.Sentence in properties[RDF.type]:
+                sent_uris.append(uri)
+            if NIF.Word in properties[RDF.type]:
+                for sent_uri in properties[NIF.sentence]:
+                    word_uris[sent_uri].append(uri)
+
+        beginIndex, endIndex = NIF.beginIndex, NIF.endIndex
+
+        def first(properties: dict = None, predicate: URIRef = None):
+            objects = properties.get(predicate)
+            return objects[0] if objects else None
+
         nifsentences = []
-        for sent_uri in sent_uris:
+        for sent_uri in natural_sort(sent_uris):
+            properties = index[sent_uri]
             nifsentence = NifSentence(
                 URIScheme=self.URIScheme,
                 uri=sent_uri,
+                beginIndex=first(properties, beginIndex),
+                endIndex=first(properties, endIndex),
                 referenceContext=self,
                 graph=self.graph,
             )
-            word_uris = list()
-            for s in self.graph.subjects(predicate=NIF.sentence, object=sent_uri):
-                if (s, RDF.type, NIF.Word) in self.graph:
-                    word_uris.append(s)
-            word_uris = natural_sort(word_uris)
 
-            # extract words from graph
+            # extract words from the index
             words = OrderedDict()
-            for word_uri in word_uris:
+            for word_uri in natural_sort(word_uris[sent_uri]):
+                properties = index[word_uri]
                 words[word_uri] = NifWord(
                     URIScheme=self.URIScheme,
                     uri=word_uri,
+                    beginIndex=first(properties, beginIndex),
+                    endIndex=first(properties, endIndex),
                     referenceContext=self.referenceContext,
                     nifsentence=nifsentence,
+                    lemma=first(properties, NIF.lemma),
+                    pos=properties.get(NIF.pos),
+                    morphofeats=properties.get(NIF.oliaLink),
+                    dependencyRelationType=first(
+                        properties, NIF.dependencyRelationType
+                    ),
                     graph=self.graph,
                 )
             nifsentence.set_Words(words.values())
 
             # replace dependency uris by word objects
-            for word_idx, word in enumerate(words.values()):
-                word.set_dependency([words[dep] for dep in word.dependency])
+            for word_uri, word in words.items():
+                word.set_dependency(
+                    [
+                        words[dep]
+                        for dep in index[word_uri].get(NIF.dependency, [])
+                        if dep in words
+                    ]
+                )
 
             words = nifsentence.words
             if words is not None:
@@ -919,89 +1043,48 @@ class NifContext(NifString):
             ]
         )
 
-    def load_from_dict(self, stanza_dict: list = None):
+    def load_word_table(self):
         """
-        Load a context from stanza dictionary
+        Create the sentences and words of the context from its word table
         """
-        if stanza_dict is not None:
-            for sent_idx, sent in enumerate(stanza_dict):
-                nif_sent = NifSentence(
-                    base_uri=self.uri,
-                    beginIndex=sent[0]["start_char"],
-                    endIndex=sent[-1]["end_char"],
-                    referenceContext=self,
-                    URIScheme=self.URIScheme,
-                )
-                self.add_sentence(nif_sent)
-
-                for word_idx, word in enumerate(sent):
-                    nif_word = NifWord(
-                        base_uri=self.uri,
-                        beginIndex=word["start_char"],
-                        endIndex=word["end_char"],
-                        referenceContext=self,
-                        nifsentence=nif_sent,
-                        URIScheme=self.URIScheme,
-                    )
-                    nif_sent.add_word(nif_word)
-
-                    nif_word.set_lemma(word.get("lemma", None))
-
-                    upos = word.get("upos", None)
-                    if upos is not None:
-                        if upos in upos2olia.keys():
-                            nif_word.add_pos(upos2olia.get(word["upos"]))
-                        else:
-                            logging.error(
-                                ".. part-of-speech tag not found: " + word["upos"]
-                            )
-                    feats = word.get("feats", None)
-                    if feats is not None:
-                        for i in feats.split("|"):
-                            p = i.split("=")[0]
-                            o = i.split("=")[1]
-                            olia = mapobject(p, o)
-                            if olia is not None:
-                                nif_word.add_morphofeat(URIRef(olia))
-
-                for word_idx, word in enumerate(sent):
-                    nif_sent._words[word_idx].set_dependencyRelationType(
-                        word.get("deprel", None)
-                    )
+        word_table = self._word_table
+        self.set_Sentences(word_table.to_sentences(self))
+        self._word_table = word_table
+        self._add_pages(self._sentences)
 
-                    dep = word.get("head", None)
-                    if dep is not None:
-                        if dep != 0:  # if dep is 0 then it is the root
-                            nif_sent._words[word_idx].set_dependency(
-                                [nif_sent._words[dep - 1]]
-                            )
-
-                words = nif_sent._words
-                if words is not None:
-                    for word_idx, word in enumerate(words):
-                        if word_idx < len(words) - 1:
-                            word.set_nextWord(words[word_idx + 1])
-                        if word_idx > 0:
-                            word.set_previousWord(words[word_idx - 1])
+    def _add_pages(self, sentences: list = None):
+        if sentences is not None and self.pages is not None:
+            # set the pages of each sentence where it occurs
+            for sentence in sentences:
+                for page in self.index.overlapping(
+                    sentence.beginIndex, sentence.endIndex, [NifPage]
+                ):
+                    sentence.add_page(page)
 
-            sentences = self.sentences
-            if sentences is not None:
-                for sent_idx, sentence in enumerate(sentences):
-                    if sent_idx < len(sentences) - 1:
-                        sentence.set_nextSentence(sentences[sent_idx + 1])
-                    if sent_idx > 0:
-                        sentence.set_previousSentence(sentences[sent_idx - 1])
+    def load_from_dict(self, stanza_dict: list = None):
+        """
+        Load a context from stanza dictionary
 
-            pages = self.pages
-            if pages is not None:
-                # set the pages of each sentence where it occurs
-                page_idx = 0
-                for sentence in self.sentences:
-                    sentence.add_page(pages[page_idx])
-                    if page_idx < len(pages) - 1:
-                        while sentence.endIndex > pages[page_idx].endIndex:
-                            page_idx += 1
-                            sentence.add_page(pages[page_idx])
+        The words are stored in the word table of the context, the sentence and
+        word objects are created when they are used. The sentences are added to
+        the sentences of the context that are already loaded.
+        """
+        if stanza_dict is not None:
+            word_table = NifWordTable.from_dict(stanza_dict)
+            if self._sentences is not None:
+                sentences = word_table.to_sentences(self)
+                if sentences != []:
+                    previous = self._sentences[-1]
+                    previous.set_nextSentence(sentences[0])
+                    sentences[0].set_previousSentence(previous)
+                for sentence in sentences:
+                    self.add_sentence(sentence)
+                self._add_pages(sentences)
+            elif self._word_table is not None:
+                self._word_table.extend(word_table)
+                self._index = None
+            else:
+                self.set_word_table(word_table)
 
 
 class NifStructure(NifString):
@@ -1022,6 +1105,8 @@ class NifStructure(NifString):
 
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         base_uri: URIRef = None,
@@ -1079,6 +1164,16 @@ class NifPhrase(NifStructure):
     :param PhraseType: type of phrase (EntityOccurrence, TermOccurrence)
     """
 
+    __slots__ = (
+        "_nifsentence",
+        "_taIdentRef",
+        "_taClassRef",
+        "_taConfidence",
+        "_PhraseType",
+        "_nextPhrase",
+        "_previousPhrase",
+    )
+
     def __init__(
         self,
         base_uri: URIRef = None,
@@ -1326,6 +1421,8 @@ class NifSentence(NifStructure):
 
     """
 
+    __slots__ = ("_nextSentence", "_previousSentence", "_words", "_pages")
+
     def __init__(
         self,
         base_uri: URIRef = None,
@@ -1442,6 +1539,11 @@ class NifSentence(NifStructure):
             self._words = deque(words)
         else:
             self._words = None
+        context = getattr(self, "_referenceContext", None)
+        if words is not None and context is not None:
+            # the index and the word table of the context are rebuilt when used
+            context._index = None
+            context._word_table = None
 
     def set_pages(self, pages: List[NifPage] = None):
         if pages is not None:
@@ -1462,6 +1564,11 @@ class NifSentence(NifStructure):
                 self._words = deque([word])
             else:
                 self._words.append(word)
+            context = getattr(self, "_referenceContext", None)
+            if context is not None:
+                context._word_table = None
+                if context._index is not None:
+                    context._index.add(word)
 
     def triples(self, objects=None):
         """
@@ -1508,6 +1615,8 @@ class NifParagraph(NifStructure):
 
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         URIScheme: str = None,
@@ -1575,6 +1684,8 @@ class NifPage(NifStructure):
 
     """
 
+    __slots__ = ("_pageNumber",)
+
     def __init__(
         self,
         URIScheme: str = None,
@@ -1617,14 +1728,14 @@ class NifPage(NifStructure):
 
     def set_pageNumber(self, pageNumber: int = None):
         if pageNumber is not None and pageNumber != 0:
-            self._pageNumber = Literal(pageNumber, datatype=XSD.nonNegativeInteger)
+            self._pageNumber = int(pageNumber)
         else:
             self._pageNumber = None
 
     @property
     def pageNumber(self):
         if self._pageNumber is not None:
-            return self._pageNumber.value
+            return self._pageNumber
         else:
             return None
 
@@ -1636,7 +1747,11 @@ class NifPage(NifStructure):
             if self.uri is not None:
                 yield (self.uri, RDF.type, NIF.Page)
                 if self._pageNumber is not None:
-                    yield (self.uri, NIF.pageNumber, self._pageNumber)
+                    yield (
+                        self.uri,
+                        NIF.pageNumber,
+                        Literal(self._pageNumber, datatype=XSD.nonNegativeInteger),
+                    )
                 for triple in super().triples(objects=objects):
                     yield triple
 
@@ -1681,6 +1796,17 @@ class NifWord(NifStructure):
 
     """
 
+    __slots__ = (
+        "_nifsentence",
+        "_lemma",
+        "_pos",
+        "_morphofeats",
+        "_dependency",
+        "_dependencyRelationType",
+        "_nextWord",
+        "_previousWord",
+    )
+
     def __init__(
         self,
         URIScheme: str = None,
@@ -1829,7 +1955,7 @@ class NifWord(NifStructure):
         Returns the dependency relation type of the word
         """
         if self._dependencyRelationType is not None:
-            return self._dependencyRelationType.value
+            return self._dependencyRelationType
         elif self.graph is not None:
             for item in self.graph.objects(
                 subject=self.uri, predicate=NIF.dependencyRelationType
@@ -1869,10 +1995,14 @@ class NifWord(NifStructure):
         Sets the lemma of the word (a string)
         """
         if lemma is not None and lemma != "":
-            if isinstance(lemma, URIRef):
+            if isinstance(lemma, URIRef) or (
+                isinstance(lemma, Literal) and lemma.language is not None
+            ):
                 self._lemma = lemma
             else:
-                self._lemma = Literal(lemma, datatype=XSD.string)
+                # the lemma strings are shared by the words, the Literal is only
+                # created in the triples
+                self._lemma = sys.intern(str(lemma))
 
         else:
             self._lemma = None
@@ -1911,9 +2041,7 @@ class NifWord(NifStructure):
         Sets the dependencyRelationType of the word (a string)
         """
         if dependencyRelationType is not None and dependencyRelationType != "":
-            self._dependencyRelationType = Literal(
-                dependencyRelationType, datatype=XSD.string
-            )
+            self._dependencyRelationType = sys.intern(str(dependencyRelationType))
         else:
             self._dependencyRelationType = None
 
@@ -1980,8 +2108,14 @@ class NifWord(NifStructure):
                             iribaker.to_iri(str(self.referenceContext.lexicon) + lemma)
                         )
                         yield (self.uri, NIF.lemma, lemma_uri)
-                    else:
+                    elif isinstance(self._lemma, (URIRef, Literal)):
                         yield (self.uri, NIF.lemma, self._lemma)
+                    else:
+                        yield (
+                            self.uri,
+                            NIF.lemma,
+                            Literal(self._lemma, datatype=XSD.string),
+                        )
                 if self.pos is not None and self._pos != []:
                     for pos in self._pos:
                         yield (self.uri, NIF.pos, pos)
@@ -1996,13 +2130,984 @@ class NifWord(NifStructure):
                     yield (
                         self.uri,
                         NIF.dependencyRelationType,
-                        self._dependencyRelationType,
+                        Literal(self._dependencyRelationType, datatype=XSD.string),
                     )
                 if self._dependency is not None:
                     for dep in self._dependency:
                         yield (self.uri, NIF.dependency, dep.uri)
 
 
+class _Intervals(object):
+    """
+    The intervals of the strings of one type, sorted on begin and end index, with
+    the running maximum of the end indexes for overlap queries
+    """
+
+    __slots__ = ("begins", "ends", "max_ends", "strings", "dirty")
+
+    def __init__(self):
+        self.begins = array("q")
+        self.ends = array("q")
+        self.max_ends = array("q")
+        self.strings = []
+        self.dirty = False
+
+    def add(self, begin: int = None, end: int = None, string: NifString = None):
+        if not self.dirty and (
+            len(self.begins) == 0 or (begin, end) >= (self.begins[-1], self.ends[-1])
+        ):
+            # strings are mostly added in order of their offsets
+            self.max_ends.append(
+                max(end, self.max_ends[-1]) if len(self.max_ends) > 0 else end
+            )
+        else:
+            self.dirty = True
+        self.begins.append(begin)
+        self.ends.append(end)
+        self.strings.append(string)
+
+    def sort(self):
+        if self.dirty:
+            order = sorted(
+                range(len(self.begins)), key=lambda i: (self.begins[i], self.ends[i])
+            )
+            self.begins = array("q", (self.begins[i] for i in order))
+            self.ends = array("q", (self.ends[i] for i in order))
+            self.max_ends = array("q", accumulate(self.ends, max))
+            self.strings = [self.strings[i] for i in order]
+            self.dirty = False
+
+    def select(self, begin: int = None, end: int = None, containing: bool = False):
+        """
+        Function that returns the strings that overlap with (or contain) the span
+        """
+        self.sort()
+        if containing:
+            # begin index <= begin and end index >= end
+            stop = bisect_right(self.begins, begin)
+            start = bisect_left(self.max_ends, end)
+            return [self.strings[i] for i in range(start, stop) if self.ends[i] >= end]
+        # begin index < end and end index > begin
+        stop = bisect_left(self.begins, end)
+        start = bisect_right(self.max_ends, begin)
+        return [self.strings[i] for i in range(start, stop) if self.ends[i] > begin]
+
+
+class NifIndex(object):
+    """
+    An interval index of the pages, paragraphs, sentences, phrases and words of a
+    context on their begin and end index
+
+    For every type the intervals are stored in arrays that are sorted on begin
+    index with the running maximum of the end indexes, so a query takes
+    logarithmic time (plus the number of results if the strings of a type do not
+    nest). A context keeps its index up to date when sentences and words are
+    added.
+
+    :param strings: the NIF strings that are indexed
+
+    """
+
+    TYPES = (NifPage, NifParagraph, NifSentence, NifPhrase, NifWord)
+
+    def __init__(self, strings: list = None):
+        self._intervals = {string_type: _Intervals() for string_type in self.TYPES}
+        if strings is not None:
+            for string in strings:
+                self.add(string)
+
+    def add(self, string: NifString = None):
+        """
+        Adds a string to the index (strings without offsets are not indexed)
+        """
+        intervals = self._intervals.get(type(string))
+        if intervals is None:
+            intervals = self._intervals.setdefault(type(string), _Intervals())
+        begin, end = string.beginIndex, string.endIndex
+        if begin is not None and end is not None:
+            intervals.add(begin, end, string)
+
+    def _select(
+        self, begin: int = None, end: int = None, types: list = None, containing=False
+    ) -> list:
+        result = []
+        types = tuple(types) if types is not None else None
+        for string_type, intervals in self._intervals.items():
+            # a type also selects the strings of its subclasses
+            if types is None or issubclass(string_type, types):
+                result.extend(intervals.select(begin, end, containing))
+        return result
+
+    def at(self, offset: int = None, types: list = None) -> list:
+        """
+        Returns the strings that cover an offset (begin index <= offset < end index)
+
+        :param offset: the character offset in the context string
+
+        :param types: the types of strings, e.g. [NifSentence, NifWord], None for all,
+            the strings of subclasses of the types are included
+
+        """
+        return self._select(offset, offset + 1, types)
+
+    def overlapping(self, begin: int = None, end: int = None, types: list = None):
+        """
+        Returns the strings that overlap with a span (begin index < end and end
+        index > begin)
+
+        :param begin: the begin index of the span
+
+        :param end: the end index of the span
+
+        :param types: the types of strings, e.g. [NifSentence, NifWord], None for all,
+            the strings of subclasses of the types are included
+
+        """
+        return self._select(begin, end, types)
+
+    def containing(self, begin: int = None, end: int = None, types: list = None):
+        """
+        Returns the strings that contain a span (begin index <= begin and end
+        index >= end)
+
+        :param begin: the begin index of the span
+
+        :param end: the end index of the span, the same as begin if None
+
+        :param types: the types of strings, e.g. [NifSentence, NifWord], None for all,
+            the strings of subclasses of the types are included
+
+        """
+        return self._select(begin, begin if end is None else end, types, True)
+
+    def __len__(self) -> int:
+        return sum(len(intervals.strings) for intervals in self._intervals.values())
+
+
+class NifWordTable(object):
+    """
+    The words of a context as columns, parallel numpy arrays of the begin and end
+    index, the sentence index, the lemma id, the part-of-speech id, the head index
+    and the dependency relation type id of every word
+
+    The ids refer to the vocabularies of the table (lemmas, pos_tags and deprels),
+    -1 means that the word has no value. The morphological features of word i are
+    morphofeats[morphofeat_ids[morphofeat_offsets[i]:morphofeat_offsets[i + 1]]].
+    The head of a word is the index of the word in the table on which it depends
+    (-1 for the root). Only the first part-of-speech tag of a word is stored.
+
+    The table of a context is filled by load_from_dict, the NifSentence and
+    NifWord objects are created from the table when they are used.
+
+    """
+
+    __slots__ = (
+        "beginIndex",
+        "endIndex",
+        "sentence",
+        "lemma_ids",
+        "pos_ids",
+        "head",
+        "deprel_ids",
+        "morphofeat_ids",
+        "morphofeat_offsets",
+        "sentence_beginIndex",
+        "sentence_endIndex",
+        "lemmas",
+        "pos_tags",
+        "deprels",
+        "morphofeats",
+    )
+
+    def __init__(self):
+        for name in ["beginIndex", "endIndex", "sentence", "head"]:
+            setattr(self, name, np.zeros(0, dtype=np.int64))
+        for name in ["lemma_ids", "pos_ids", "deprel_ids", "morphofeat_ids"]:
+            setattr(self, name, np.zeros(0, dtype=np.int32))
+        self.morphofeat_offsets = np.zeros(1, dtype=np.int64)
+        self.sentence_beginIndex = np.zeros(0, dtype=np.int64)
+        self.sentence_endIndex = np.zeros(0, dtype=np.int64)
+        self.lemmas = []
+        self.pos_tags = []
+        self.deprels = []
+        self.morphofeats = []
+
+    def __len__(self) -> int:
+        return len(self.beginIndex)
+
+    def __repr__(self):
+        return (
+            "NifWordTable("
+            + str(len(self.sentence_beginIndex))
+            + " sentences, "
+            + str(len(self))
+            + " words)"
+        )
+
+    @classmethod
+    def _from_rows(cls, sentences: list = None, words=None) -> "NifWordTable":
+        """
+        Function that returns a table of the (beginIndex, endIndex) of the sentences
+        and the rows (beginIndex, endIndex, sentence, lemma, pos, morphofeats, head,
+        dependencyRelationType) of the words
+        """
+        vocabularies = [dict(), dict(), dict(), dict()]
+        lemmas, pos_tags, deprels, morphofeats = vocabularies
+        columns = [array("q") for _ in range(7)]
+        begins, ends, sents, lemma_ids, pos_ids, heads, deprel_ids = columns
+        morphofeat_ids = array("q")
+        morphofeat_offsets = array("q", [0])
+        for begin, end, sent, lemma, pos, feats, head, deprel in words:
+            begins.append(begin)
+            ends.append(end)
+            sents.append(sent)
+            lemma_ids.append(
+                -1 if lemma is None else lemmas.setdefault(lemma, len(lemmas))
+            )
+            pos_ids.append(
+                -1 if pos is None else pos_tags.setdefault(pos, len(pos_tags))
+            )
+            heads.append(head)
+            deprel_ids.append(
+                -1 if deprel is None else deprels.setdefault(deprel, len(deprels))
+            )
+            for feat in feats or []:
+                morphofeat_ids.append(morphofeats.setdefault(feat, len(morphofeats)))
+            morphofeat_offsets.append(len(morphofeat_ids))
+        table = cls()
+        table.beginIndex = np.array(begins, dtype=np.int64)
+        table.endIndex = np.array(ends, dtype=np.int64)
+        table.sentence = np.array(sents, dtype=np.int64)
+        table.head = np.array(heads, dtype=np.int64)
+        table.lemma_ids = np.array(lemma_ids, dtype=np.int32)
+        table.pos_ids = np.array(pos_ids, dtype=np.int32)
+        table.deprel_ids = np.array(deprel_ids, dtype=np.int32)
+        table.morphofeat_ids = np.array(morphofeat_ids, dtype=np.int32)
+        table.morphofeat_offsets = np.array(morphofeat_offsets, dtype=np.int64)
+        table.sentence_beginIndex = np.array(
+            [begin for begin, _ in sentences], dtype=np.int64
+        )
+        table.sentence_endIndex = np.array(
+            [end for _, end in sentences], dtype=np.int64
+        )
+        table.lemmas, table.pos_tags, table.deprels, table.morphofeats = [
+            list(vocabulary.keys()) for vocabulary in vocabularies
+        ]
+        return table
+
+    @classmethod
+    def from_dict(cls, stanza_dict: list = None) -> "NifWordTable":
+        """
+        Returns the table of the words of a stanza dictionary
+
+        :param stanza_dict: a list of sentences, each a list of dicts of the words
+
+        """
+        olia_uris = dict()
+
+        def morphofeats(feats: str = None) -> list:
+            result = []
+            if feats is not None:
+                for i in feats.split("|"):
+                    p = i.split("=")[0]
+                    o = i.split("=")[1]
+                    olia = mapobject(p, o)
+                    if olia is not None:
+                        olia_uri = olia_uris.get(olia)
+                        if olia_uri is None:
+                            olia_uri = olia_uris[olia] = URIRef(olia)
+                        result.append(olia_uri)
+            return result
+
+        def pos(upos: str = None) -> URIRef:
+            if upos is not None:
+                if upos in upos2olia.keys():
+                    return upos2olia[upos]
+                else:
+                    logging.error(".. part-of-speech tag not found: " + upos)
+            return None
+
+        def rows():
+            start = 0
+            for sent_idx, sent in enumerate(stanza_dict):
+                for word in sent:
+                    # the head is the number of the word in the sentence, 0 is the root
+                    head = word.get("head", None)
+                    yield (
+                        word["start_char"],
+                        word["end_char"],
+                        sent_idx,
+                        word.get("lemma", None) or None,
+                        pos(word.get("upos", None)),
+                        morphofeats(word.get("feats", None)),
+                        start + head - 1 if head else -1,
+                        word.get("deprel", None) or None,
+                    )
+                start += len(sent)
+
+        sentences = [
+            (sent[0]["start_char"], sent[-1]["end_char"]) for sent in stanza_dict
+        ]
+        return cls._from_rows(sentences, rows())
+
+    @classmethod
+    def from_sentences(cls, sentences: List[NifSentence] = None) -> "NifWordTable":
+        """
+        Returns the table of the words of a list of NifSentences
+
+        :param sentences: the sentences with their words
+
+        """
+        sentences = sentences or []
+        words = [word for sentence in sentences for word in sentence._words or []]
+        positions = {id(word): idx for idx, word in enumerate(words)}
+        sentence_idx = {id(sentence): idx for idx, sentence in enumerate(sentences)}
+
+        def rows():
+            for word in words:
+                head = -1
+                if word._dependency:
+                    head = positions.get(id(word._dependency[0]), -1)
+                yield (
+                    word._beginIndex,
+                    word._endIndex,
+                    sentence_idx.get(id(word._nifsentence), -1),
+                    word._lemma,
+                    word._pos[0] if word._pos else None,
+                    word._morphofeats,
+                    head,
+                    word._dependencyRelationType,
+                )
+
+        return cls._from_rows(
+            [(sentence._beginIndex, sentence._endIndex) for sentence in sentences],
+            rows(),
+        )
+
+    def extend(self, table: "NifWordTable" = None) -> None:
+        """
+        Appends the sentences and words of another table, the sentence and head
+        indexes and the vocabulary ids of the table are mapped to this table
+
+        :param table: the table to append
+
+        """
+        if table is None:
+            return None
+        num_words = len(self)
+        num_sentences = len(self.sentence_beginIndex)
+
+        def mapped(vocabulary: list = None, values: list = None, ids=None):
+            positions = {value: idx for idx, value in enumerate(vocabulary)}
+            for value in values:
+                if value not in positions:
+                    positions[value] = len(positions)
+                    vocabulary.append(value)
+            # the last position maps -1 (no value) to -1
+            mapping = np.array([positions[value] for value in values] + [-1])
+            return mapping[ids].astype(np.int32)
+
+        self.lemma_ids = np.concatenate(
+            [self.lemma_ids, mapped(self.lemmas, table.lemmas, table.lemma_ids)]
+        )
+        self.pos_ids = np.concatenate(
+            [self.pos_ids, mapped(self.pos_tags, table.pos_tags, table.pos_ids)]
+        )
+        self.deprel_ids = np.concatenate(
+            [self.deprel_ids, mapped(self.deprels, table.deprels, table.deprel_ids)]
+        )
+        self.morphofeat_ids = np.concatenate(
+            [
+                self.morphofeat_ids,
+                mapped(self.morphofeats, table.morphofeats, table.morphofeat_ids),
+            ]
+        )
+        self.morphofeat_offsets = np.concatenate(
+            [
+                self.morphofeat_offsets,
+                table.morphofeat_offsets[1:] + self.morphofeat_offsets[-1],
+            ]
+        )
+        self.beginIndex = np.concatenate([self.beginIndex, table.beginIndex])
+        self.endIndex = np.concatenate([self.endIndex, table.endIndex])
+        self.sentence = np.concatenate(
+            [
+                self.sentence,
+                np.where(table.sentence >= 0, table.sentence + num_sentences, -1),
+            ]
+        )
+        self.head = np.concatenate(
+            [self.head, np.where(table.head >= 0, table.head + num_words, -1)]
+        )
+        self.sentence_beginIndex = np.concatenate(
+            [self.sentence_beginIndex, table.sentence_beginIndex]
+        )
+        self.sentence_endIndex = np.concatenate(
+            [self.sentence_endIndex, table.sentence_endIndex]
+        )
+
+    def to_sentences(self, context: NifContext = None) -> List[NifSentence]:
+        """
+        Returns the NifSentences and NifWords of the table, linked in the same way
+        as by NifContext.load_from_dict
+
+        :param context: the context of the sentences and words
+
+        """
+        URIScheme = context.URIScheme
+        sentences = [
+            NifSentence(
+                base_uri=context.uri,
+                beginIndex=begin,
+                endIndex=end,
+                referenceContext=context,
+                URIScheme=URIScheme,
+            )
+            for begin, end in zip(
+                self.sentence_beginIndex.tolist(), self.sentence_endIndex.tolist()
+            )
+        ]
+        lemmas, pos_tags, deprels = self.lemmas, self.pos_tags, self.deprels
+        morphofeats = self.morphofeats
+        feat_ids = self.morphofeat_ids.tolist()
+        offsets = self.morphofeat_offsets.tolist()
+        words = []
+        sentence_words = [[] for _ in sentences]
+        for idx, (begin, end, sent_idx, lemma, pos, deprel) in enumerate(
+            zip(
+                self.beginIndex.tolist(),
+                self.endIndex.tolist(),
+                self.sentence.tolist(),
+                self.lemma_ids.tolist(),
+                self.pos_ids.tolist(),
+                self.deprel_ids.tolist(),
+            )
+        ):
+            word = NifWord(
+                base_uri=context.uri,
+                beginIndex=begin,
+                endIndex=end,
+                referenceContext=context,
+                nifsentence=sentences[sent_idx] if sent_idx >= 0 else None,
+                URIScheme=URIScheme,
+                lemma=lemmas[lemma] if lemma >= 0 else None,
+                pos=[pos_tags[pos]] if pos >= 0 else None,
+                morphofeats=[
+                    morphofeats[i] for i in feat_ids[offsets[idx] : offsets[idx + 1]]
+                ],
+                dependencyRelationType=deprels[deprel] if deprel >= 0 else None,
+            )
+            words.append(word)
+            if sent_idx >= 0:
+                sentence_words[sent_idx].append(word)
+        for word, head in zip(words, self.head.tolist()):
+            if head >= 0:
+                word.set_dependency([words[head]])
+
+        for sentence, sent_words in zip(sentences, sentence_words):
+            if sent_words:
+                sentence.set_Words(sent_words)
+                for word_idx, word in enumerate(sent_words):
+                    if word_idx < len(sent_words) - 1:
+                        word.set_nextWord(sent_words[word_idx + 1])
+                    if word_idx > 0:
+                        word.set_previousWord(sent_words[word_idx - 1])
+        for sent_idx, sentence in enumerate(sentences):
+            if sent_idx < len(sentences) - 1:
+                sentence.set_nextSentence(sentences[sent_idx + 1])
+            if sent_idx > 0:
+                sentence.set_previousSentence(sentences[sent_idx - 1])
+        return sentences
+
+    def to_dataframe(self, isString: str = None) -> pd.DataFrame:
+        """
+        Returns the words as a pandas DataFrame with a row per word, the lemma, pos
+        and dependencyRelationType columns are categoricals of the vocabularies
+
+        :param isString: the string of the context, if given then the anchorOf of
+            the words is added
+
+        """
+        data = {
+            "beginIndex": self.beginIndex,
+            "endIndex": self.endIndex,
+            "sentence": self.sentence,
+        }
+        if isString is not None:
+            data["anchorOf"] = [
+                isString[begin:end]
+                for begin, end in zip(self.beginIndex.tolist(), self.endIndex.tolist())
+            ]
+        data["lemma"] = pd.Categorical.from_codes(self.lemma_ids, self.lemmas)
+        data["pos"] = pd.Categorical.from_codes(self.pos_ids, self.pos_tags)
+        if len(self) > 0:
+            feats = np.array(self.morphofeats, dtype=object)
+            data["morphofeats"] = [
+                list(values)
+                for values in np.split(
+                    feats[self.morphofeat_ids], self.morphofeat_offsets[1:-1]
+                )
+            ]
+        else:
+            data["morphofeats"] = []
+        data["head"] = self.head
+        data["dependencyRelationType"] = pd.Categorical.from_codes(
+            self.deprel_ids, self.deprels
+        )
+        return pd.DataFrame(data)
+
+
+class _TripleEmitter(object):
+    """
+    Emitter of the triples of NIF contexts and collections in the same order as
+    the triples() of the objects
+
+    The filter on the classes of the objects is evaluated once per class and the
+    fields of the sentences and words are read directly. The Literals of the
+    offsets, strings, lemmas and dependency relation types and the uris of the
+    lemmas, part-of-speech tags and morphological features are created once and
+    shared by the triples.
+
+    :param objects: the classes of the objects of which the triples are
+        generated, None for all
+
+    :param cache_size: the maximum number of cached Literals and uris
+
+    """
+
+    # an attribute of a rdflib Namespace creates a new URIRef on every access
+    nif = SimpleNamespace(
+        **{
+            name: NIF[name]
+            for name in [
+                "Context",
+                "ContextCollection",
+                "OffsetBasedString",
+                "RFC5147String",
+                "String",
+                "Sentence",
+                "Word",
+                "beginIndex",
+                "endIndex",
+                "referenceContext",
+                "isString",
+                "sourceUrl",
+                "predLang",
+                "firstSentence",
+                "lastSentence",
+                "hasContext",
+                "sentence",
+                "page",
+                "nextSentence",
+                "previousSentence",
+                "firstWord",
+                "lastWord",
+                "anchorOf",
+                "lemma",
+                "pos",
+                "oliaLink",
+                "nextWord",
+                "previousWord",
+                "dependencyRelationType",
+                "dependency",
+            ]
+        }
+    )
+    rdf_type = RDF.type
+    xsd_string = XSD.string
+    xsd_nonNegativeInteger = XSD.nonNegativeInteger
+
+    def __init__(self, objects: list = None, cache_size: int = 2**16):
+        self.objects = objects
+        self.cache_size = cache_size
+        self._selected = dict()
+        self._literals = dict()
+        self._terms = dict()
+        self._lemma_uris = dict()
+
+    def selected(self, obj=None) -> bool:
+        """
+        Function that returns whether the triples of an object are generated
+        """
+        selected = self._selected.get(type(obj))
+        if selected is None:
+            selected = self.objects is None or any(
+                [isinstance(obj, o) for o in self.objects]
+            )
+            self._selected[type(obj)] = selected
+        return selected
+
+    def literal(self, value=None, datatype: URIRef = None) -> Literal:
+        literal = self._literals.get((value, datatype))
+        if literal is None:
+            literal = Literal(value, datatype=datatype)
+            if len(self._literals) >= self.cache_size:
+                self._literals.clear()
+            self._literals[(value, datatype)] = literal
+        return literal
+
+    def term(self, term: URIRef = None) -> URIRef:
+        # equal uris of the triples are the same object
+        shared = self._terms.get(term)
+        if shared is None:
+            if len(self._terms) >= self.cache_size:
+                self._terms.clear()
+            shared = self._terms[term] = term
+        return shared
+
+    def lemma_uri(self, lexicon: URIRef = None, lemma: str = None) -> URIRef:
+        lemma_uri = self._lemma_uris.get((lexicon, lemma))
+        if lemma_uri is None:
+            # prevent that uribaker converts this to underscore
+            lemma_uri = URIRef(
+                iribaker.to_iri(str(lexicon) + lemma.replace('"', "%22"))
+            )
+            if len(self._lemma_uris) >= self.cache_size:
+                self._lemma_uris.clear()
+            self._lemma_uris[(lexicon, lemma)] = lemma_uri
+        return lemma_uri
+
+    def string(self, string: NifString = None) -> list:
+        """
+        Function that returns the NifString triples of an object with a uri
+        """
+        nif, uri = self.nif, string._uri
+        triples = []
+        if string._URIScheme == OffsetBasedString:
+            triples.append((uri, self.rdf_type, nif.OffsetBasedString))
+        elif string._URIScheme == RFC5147String:
+            triples.append((uri, self.rdf_type, nif.RFC5147String))
+        triples.append((uri, self.rdf_type, nif.String))
+        if string._beginIndex is not None:
+            triples.append(
+                (
+                    uri,
+                    nif.beginIndex,
+                    self.literal(string._beginIndex, self.xsd_nonNegativeInteger),
+                )
+            )
+        if string._endIndex is not None:
+            triples.append(
+                (
+                    uri,
+                    nif.endIndex,
+                    self.literal(string._endIndex, self.xsd_nonNegativeInteger),
+                )
+            )
+        if string._referenceContext is not None:
+            triples.append((uri, nif.referenceContext, string._referenceContext.uri))
+        return triples
+
+    def word(self, word: NifWord = None) -> list:
+        """
+        Function that returns the triples of a word
+        """
+        if (
+            type(word) is not NifWord
+            or word._referenceContext is None
+            or (
+                word.graph is not None
+                and (
+                    word._beginIndex is None
+                    or word._endIndex is None
+                    or word._lemma is None
+                    or word._pos is None
+                    or word._dependencyRelationType is None
+                )
+            )
+        ):
+            # the properties of the word are read from the graph
+            return list(word.triples(objects=self.objects))
+        uri = word._uri
+        if uri is None or not self.selected(word):
+            return []
+        nif, term, literal = self.nif, self.term, self.literal
+        context = word._referenceContext
+        triples = [(uri, self.rdf_type, nif.Word)]
+        if word._nifsentence is not None:
+            triples.append((uri, nif.sentence, word._nifsentence._uri))
+        triples.extend(self.string(word))
+        triples.append(
+            (
+                uri,
+                nif.anchorOf,
+                literal(
+                    context.isString[word._beginIndex : word._endIndex],
+                    self.xsd_string,
+                ),
+            )
+        )
+        lemma = word._lemma
+        if lemma is not None and (
+            not isinstance(lemma, Literal) or lemma.value is not None
+        ):
+            if context._lexicon is not None:
+                triples.append(
+                    (uri, nif.lemma, self.lemma_uri(context._lexicon, lemma))
+                )
+            elif isinstance(lemma, (URIRef, Literal)):
+                triples.append((uri, nif.lemma, term(lemma)))
+            else:
+                triples.append((uri, nif.lemma, literal(lemma, self.xsd_string)))
+        if word._pos is not None and word._pos != []:
+            for pos in word._pos:
+                triples.append((uri, nif.pos, term(pos)))
+        if word._morphofeats is not None and word._morphofeats != []:
+            for morphofeat in word._morphofeats:
+                triples.append((uri, nif.oliaLink, term(morphofeat)))
+        if word._nextWord is not None:
+            triples.append((uri, nif.nextWord, word._nextWord.uri))
+        if word._previousWord is not None:
+            triples.append((uri, nif.previousWord, word._previousWord.uri))
+        if word._dependencyRelationType is not None:
+            triples.append(
+                (
+                    uri,
+                    nif.dependencyRelationType,
+                    literal(word._dependencyRelationType, self.xsd_string),
+                )
+            )
+        if word._dependency is not None:
+            for dep in word._dependency:
+                triples.append((uri, nif.dependency, dep.uri))
+        return triples
+
+    def sentence(self, sentence: NifSentence = None):
+        """
+        Generator of the triples of a sentence and its words
+        """
+        if type(sentence) is not NifSentence:
+            for triple in sentence.triples(objects=self.objects):
+                yield triple
+            return
+        nif, uri = self.nif, sentence._uri
+        if uri is not None and self.selected(sentence):
+            yield (uri, self.rdf_type, nif.Sentence)
+            for triple in self.string(sentence):
+                yield triple
+            if sentence._pages is not None:
+                for page in sentence._pages:
+                    yield (uri, nif.page, page.uri)
+            if sentence._nextSentence is not None:
+                yield (uri, nif.nextSentence, sentence._nextSentence.uri)
+            if sentence._previousSentence is not None:
+                yield (uri, nif.previousSentence, sentence._previousSentence.uri)
+            if sentence._words is not None and len(sentence._words) > 0:
+                yield (uri, nif.firstWord, sentence._words[0].uri)
+                yield (uri, nif.lastWord, sentence._words[-1].uri)
+        if sentence._words is not None:
+            for word in sentence._words:
+                for triple in self.word(word):
+                    yield triple
+
+    def context(self, context: NifContext = None):
+        """
+        Generator of the triples of a context and its sentences, paragraphs, pages
+        and phrases
+        """
+        nif, uri = self.nif, context._uri
+        if self.selected(context):
+            if uri is not None:
+                yield (uri, self.rdf_type, nif.Context)
+                for key in context._metadata.keys():
+                    yield (uri, key, context._metadata[key])
+                if context._isString is not None:
+                    yield (uri, nif.isString, context._isString)
+                if context._sourceUrl is not None:
+                    yield (uri, nif.sourceUrl, context._sourceUrl)
+                if context._predLang is not None:
+                    yield (uri, nif.predLang, context._predLang)
+                if context.firstSentence is not None:
+                    yield (uri, nif.firstSentence, context.firstSentence.uri)
+                if context.lastSentence is not None:
+                    yield (uri, nif.lastSentence, context.lastSentence.uri)
+                for triple in self.string(context):
+                    yield triple
+
+        if context._sentences is None and context._word_table is not None:
+            context.load_word_table()
+        if context._sentences is not None:
+            for sentence in context._sentences:
+                for triple in self.sentence(sentence):
+                    yield triple
+
+        for strings in [context._paragraphs, context._pages, context._phrases]:
+            if strings is not None:
+                for string in strings:
+                    for triple in string.triples(objects=self.objects):
+                        yield triple
+
+    def collection(self, collection: NifContextCollection = None):
+        """
+        Generator of the triples of a collection and its contexts
+        """
+        uri = collection._uri
+        if self.selected(collection):
+            if uri is not None:
+                yield (uri, self.rdf_type, self.nif.ContextCollection)
+                if collection.conformsTo is not None:
+                    yield (uri, DCTERMS.conformsTo, collection.conformsTo)
+        for context in collection.hasContext:
+            if uri is not None:
+                yield (uri, self.nif.hasContext, context.uri)
+                if type(context) is NifContext:
+                    triples = self.context(context)
+                else:
+                    triples = context.triples(objects=self.objects)
+                for triple in triples:
+                    yield triple
+
+
+class NifView(object):
+    """
+    A lazy view of the NIF objects of which the uris match a triple pattern in a
+    graph
+
+    The uris are fetched in pages (with SPARQL queries if the graph is in a
+    SPARQL store) and a NIF object is only created when it is accessed. The
+    objects that are created are kept by the view, so every access to a uri
+    returns the same object and changes to it are kept. The view supports
+    len(), iteration, indexing and slicing.
+
+    :param graph: the graph
+
+    :param pattern: a triple pattern in which either the subject or the object
+        is None, the uris are the terms at that position
+
+    :param factory: the class of the NIF objects (created with uri and graph)
+
+    :param page_size: the number of uris in a page
+
+    """
+
+    def __init__(
+        self,
+        graph: Graph = None,
+        pattern: tuple = None,
+        factory: type = None,
+        page_size: int = 2**10,
+    ):
+        self.graph = graph
+        self.pattern = pattern
+        self.factory = factory
+        self.page_size = page_size
+        self._len = None
+        self._pages = dict()
+        # the iterator of the uris of a local graph and the number of uris read
+        self._iterator = None
+        self._position = 0
+        self._objects = dict()
+
+    @property
+    def remote(self) -> bool:
+        return isinstance(self.graph.store, sparqlstore.SPARQLStore)
+
+    def _where(self) -> str:
+        s, p, o = self.pattern
+        return (
+            (s.n3() if s is not None else "?uri")
+            + " "
+            + p.n3()
+            + " "
+            + (o.n3() if o is not None else "?uri")
+        )
+
+    def _local_uris(self):
+        position = 0 if self.pattern[0] is None else 2
+        for triple in self.graph.triples(self.pattern):
+            yield triple[position]
+
+    def _page(self, page: int = 0) -> list:
+        """
+        Function that returns the uris of a page
+        """
+        uris = self._pages.get(page)
+        if uris is None:
+            if self.remote:
+                q = (
+                    "SELECT DISTINCT ?uri WHERE { "
+                    + self._where()
+                    + " } ORDER BY ?uri LIMIT "
+                    + str(self.page_size)
+                    + " OFFSET "
+                    + str(page * self.page_size)
+                )
+                uris = [row[0] for row in self.graph.query(q)]
+            else:
+                start = page * self.page_size
+                if self._iterator is None or start < self._position:
+                    self._iterator = self._local_uris()
+                    self._position = 0
+                # continue reading where the previous page ended
+                skip = start - self._position
+                uris = list(islice(self._iterator, skip, skip + self.page_size))
+                self._position = start + len(uris)
+            if len(self._pages) >= 2**4:
+                self._pages.clear()
+            self._pages[page] = uris
+        return uris
+
+    def uris(self):
+        """
+        Generator of the uris of the view
+        """
+        if self.remote:
+            page = 0
+            while True:
+                uris = self._page(page)
+                for uri in uris:
+                    yield uri
+                if len(uris) < self.page_size:
+                    break
+                page += 1
+        else:
+            for uri in self._local_uris():
+                yield uri
+
+    def _object(self, uri: URIRef = None):
+        """
+        Function that returns the NIF object of a uri, created once
+        """
+        obj = self._objects.get(uri)
+        if obj is None:
+            obj = self._objects[uri] = self.factory(uri=uri, graph=self.graph)
+        return obj
+
+    def __iter__(self):
+        for uri in self.uris():
+            yield self._object(uri)
+
+    def __len__(self) -> int:
+        if self._len is None:
+            if self.remote:
+                q = (
+                    "SELECT (COUNT(DISTINCT ?uri) AS ?n) WHERE { "
+                    + self._where()
+                    + " }"
+                )
+                for row in self.graph.query(q):
+                    self._len = int(row[0])
+            else:
+                self._len = sum(1 for _ in self._local_uris())
+        return self._len
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError("NifView index out of range")
+        page, position = divmod(index, self.page_size)
+        uris = self._page(page)
+        if position >= len(uris):
+            raise IndexError("NifView index out of range")
+        return self._object(uris[position])
+
+    def __repr__(self):
+        return "NifView(" + self._where() + ")"
+
+
 class NifContextCollection(NifBase):
     """
     A NIF Context Collection
@@ -2031,11 +3136,25 @@ class NifContextCollection(NifBase):
 
     def set_graph(self, graph: Graph = None):
         self.graph = graph
+        self._view = None
+
+    def _contexts_view(self) -> NifView:
+        # the view is kept, so the contexts that it created are the same objects
+        if self._view is None:
+            self._view = NifView(
+                self.graph, (self.uri, NIF.hasContext, None), NifContext
+            )
+        return self._view
 
     @property
     def hasContext(self):
+        """
+        Returns the contexts of the collection, a lazy view (NifView) of the
+        contexts in the graph if the contexts are not loaded or added. A context
+        is created once, so changes to it are kept in the collection.
+        """
         if self._hasContext is None and self.graph is not None:
-            self.load_contexts()
+            return self._contexts_view()
         if self._hasContext is not None:
             return list(self._hasContext.values())
         else:
@@ -2052,10 +3171,16 @@ class NifContextCollection(NifBase):
             self._hasContext = None
 
     def load_contexts(self):
-        contexts = []
-        for item in self.graph.objects(subject=self.uri, predicate=NIF.hasContext):
-            contexts.append(NifContext(uri=item, graph=self.graph))
-        self.set_hasContext(contexts)
+        """
+        Loads the contexts of the collection from the graph, the contexts that are
+        added to the collection are kept
+
+        The contexts are created when they are loaded, use hasContext for a lazy
+        view of the contexts in the graph.
+        """
+        contexts = self._hasContext or {}
+        self.set_hasContext(list(self._contexts_view()))
+        self._hasContext.update(contexts)
 
     @property
     def conformsTo(self):
@@ -2079,7 +3204,11 @@ class NifContextCollection(NifBase):
     def add_context(self, context: NifContext = None):
         if context is not None:
             if self._hasContext is None:
-                self._hasContext = {}
+                if self.graph is not None:
+                    # the contexts in the graph are loaded before the context is added
+                    self.load_contexts()
+                else:
+                    self._hasContext = {}
             self._hasContext[context.uri] = context
 
     def __str__(self):
@@ -2098,13 +3227,4 @@ class NifContextCollection(NifBase):
         """
         Generates all the triples
         """
-        if objects is None or any([isinstance(self, obj) for obj in objects]):
-            if self.uri is not None:
-                yield (self.uri, RDF.type, NIF.ContextCollection)
-                if self.conformsTo is not None:
-                    yield (self.uri, DCTERMS.conformsTo, self.conformsTo)
-        for context in self.hasContext:
-            if self.uri is not None:
-                yield (self.uri, NIF.hasContext, context.uri)
-                for triple in context.triples(objects=objects):
-                    yield triple
+        return _TripleEmitter(objects).collection(self)
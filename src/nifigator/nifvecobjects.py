@@ -3,6 +3,7 @@
 import logging
 from collections import OrderedDict, defaultdict, deque, Counter
 from typing import Union, List, Optional
+from functools import partial
 from itertools import combinations, product
 
 import regex as re
@@ -35,7 +36,13 @@ from .const import (
     FORCED_SENTENCE_SPLIT_CHARACTERS,
     REGEX_FILTER,
 )
-from .utils import tokenizer, tokenize_text, to_iri
+from .utils import (
+    tokenizer,
+    tokenize_offsets,
+    to_iri,
+    parallel_map,
+    ContentCache,
+)
 from .nifgraph import NifGraph
 from .multisets import merge_multiset
 
@@ -65,6 +72,8 @@ class NifVectorGraph(NifGraph):
 
     :param params (dict): parameters for constructing the NIF Vector graph
 
+    :param workers (int): the number of processes that preprocess the contexts of the nif_graph
+
     """
 
     def __init__(
@@ -80,6 +89,7 @@ class NifVectorGraph(NifGraph):
         namespace_manager: Optional[NamespaceManager] = None,
         base: Optional[str] = None,
         bind_namespaces: str = "core",
+        workers: int = 1,
     ):
         super(NifVectorGraph, self).__init__(
             store=store,
@@ -112,19 +122,17 @@ class NifVectorGraph(NifGraph):
             # if nif_graph is available then contexts are extracted from this graph
             logging.debug(".. extracting documents from graph")
             documents = dict()
-            contexts = nif_graph.contexts
-            for context in contexts:
-                # if context_uris is None then all contexts are extracted
-                # otherwise only those in the context_uris list
-                if context_uris is None or context.uri in context_uris:
-                    isString = context.isString
-                    if isString is not None:
-                        documents[context.uri] = preprocess(isString, self.params)
-                    else:
-                        logging.warning("No isString found for " + str(context.uri))
+            phrases = generate_document_phrases(
+                documents=_store_items(
+                    self.generate_documents(nif_graph, context_uris, workers),
+                    documents,
+                ),
+                params=self.params,
+            )
+        elif documents is not None:
+            phrases = generate_document_phrases(documents=documents, params=self.params)
 
         if documents is not None:
-            phrases = generate_document_phrases(documents=documents, params=self.params)
             contexts, phrases = generate_document_contexts(
                 init_phrases=phrases, documents=documents, params=self.params
             )
@@ -133,6 +141,53 @@ class NifVectorGraph(NifGraph):
                 contexts=contexts,
             )
 
+    def generate_documents(
+        self,
+        nif_graph: NifGraph = None,
+        context_uris: list = None,
+        workers: int = 1,
+    ):
+        """
+        Generator of the preprocessed contexts of a NifGraph (in the order of the graph)
+
+        The strings of the contexts are retrieved with one query and preprocessed in
+        parallel if workers > 1.
+
+        :param nif_graph: the graph from which the contexts are extracted
+
+        :param context_uris: the uris of the contexts to extract (if None then all contexts)
+
+        :param workers: the number of processes
+
+        """
+        q = """
+    SELECT ?context ?isString
+    WHERE {
+        ?context rdf:type nif:Context .
+        OPTIONAL { ?context nif:isString ?isString . }
+    }
+    """
+        if context_uris is not None:
+            context_uris = set(context_uris)
+        uris, strings = [], []
+        for r in nif_graph.query(q, initNs={"rdf": RDF, "nif": NIF}):
+            # if context_uris is None then all contexts are extracted
+            # otherwise only those in the context_uris list
+            if context_uris is None or r[0] in context_uris:
+                if r[1] is not None:
+                    uris.append(r[0])
+                    strings.append(str(r[1]))
+                else:
+                    logging.warning("No isString found for " + str(r[0]))
+        preprocessed = parallel_map(
+            partial(preprocess, params=self.params),
+            strings,
+            workers=workers,
+            chunksize=max(1, len(strings) // (4 * max(1, workers))),
+        )
+        for uri, document in zip(uris, preprocessed):
+            yield uri, document
+
     def store_triples(
         self,
         phrases: dict = {},
@@ -632,10 +687,13 @@ class NifVectorGraph(NifGraph):
         includePhraseVectors: bool = True,
         includeContextVectors: bool = False,
         includeOtherForms: bool = False,
+        cache: ContentCache = None,
     ):
         """
         Function to retrieve the vectors of phrases and context of a set of documents
 
+        :param cache: cache in which the preprocessed documents are stored (optional)
+
         """
         if vectors is None:
             vectors = dict()
@@ -645,7 +703,8 @@ class NifVectorGraph(NifGraph):
         }
 
         documents = {
-            key: preprocess(value, self.params) for key, value in documents.items()
+            key: preprocess(value, self.params, cache)
+            for key, value in documents.items()
         }
 
         phrases = generate_document_phrases(documents=documents, params=params)
@@ -665,6 +724,17 @@ class NifVectorGraph(NifGraph):
         return vectors
 
 
+def vectors_key(vectors: dict = None) -> str:
+    """
+    Function that returns the key of the content of vectors, to be used as vectors_id
+    of document_vector
+
+    :param vectors: a dictionary of phrases and/or contexts and their multisets
+
+    """
+    return ContentCache.key("vectors", vectors)
+
+
 def document_vector(
     documents: dict = None,
     vectors: dict = None,
@@ -673,10 +743,43 @@ def document_vector(
     topn: int = 15,
     merge_dict: bool = False,
     params: dict = None,
+    cache: ContentCache = None,
+    vectors_id: str = None,
 ):
     """
     extract the phrases of a string and create dict of phrases with their contexts
+
+    :param cache: cache in which the document vectors are stored (optional), the
+        results from the cache are shared and should not be modified
+
+    :param vectors_id: the identity of the vectors in the keys of the cache, a new id
+        is needed if the vectors are changed. If None then it is derived from the
+        content of all vectors at every call (see vectors_key)
     """
+    if cache is not None:
+        if vectors_id is None:
+            vectors_id = vectors_key(vectors)
+        key = cache.key(
+            "document_vector",
+            vectors_id,
+            list(documents.items()),
+            includePhraseVectors,
+            includeContextVectors,
+            topn,
+            merge_dict,
+        )
+        res = cache.get(key)
+        if res is None:
+            res = document_vector(
+                documents,
+                vectors,
+                includePhraseVectors,
+                includeContextVectors,
+                topn,
+                merge_dict,
+            )
+            cache.put(key, res)
+        return res
     params = {
         WORDS_FILTER: {"data": {phrase: True for phrase in STOPWORDS}},
         MIN_PHRASE_COUNT: 1,
@@ -871,7 +974,8 @@ def generate_document_phrases(documents: dict = None, params: dict = {}):
     """
     This function generates all phrases in the documents
 
-    :param documents: a dict with context.uri as keys and context.isString as values
+    :param documents: a dict with context.uri as keys and context.isString as values (or
+        an iterable of tuples of the context.uri and the context.isString)
 
     :param params: a dict with parameters
 
@@ -882,7 +986,9 @@ def generate_document_phrases(documents: dict = None, params: dict = {}):
 
     # create a dict for each phrase that contain the phrase locations
     phrases = defaultdict(lambda: defaultdict(set))
-    for context_uri, context_isString in documents.items():
+    if isinstance(documents, dict):
+        documents = documents.items()
+    for context_uri, context_isString in documents:
         for phrase, loc in generate_sentence_phrases(context_isString, params=params):
             phrases[phrase][context_uri].add(loc)
 
@@ -935,17 +1041,43 @@ def generate_sentence_phrases(
                             )
 
 
+def _store_items(items=None, d: dict = None):
+    """
+    Generator that yields the (key, value) items and stores them in the dict d
+    """
+    for key, value in items:
+        d[key] = value
+        yield key, value
+
+
 def preprocess(
     document: str = None,
     params: dict = {},
+    cache: ContentCache = None,
 ):
-    """ """
+    """
+    Function to tokenize a document into sentences with words (with start and end tokens)
+
+    :param document: the text of the document
+
+    :param params: a dict with parameters
+
+    :param cache: cache in which the preprocessed documents are stored (optional), the
+        results from the cache are shared and should not be modified
+
+    """
     split_characters = params.get(FORCED_SENTENCE_SPLIT_CHARACTERS, [])
     regex_filter = params.get(REGEX_FILTER, default_regex_filter)
+    if cache is not None:
+        key = cache.key("preprocess", document, split_characters, regex_filter)
+        preprocessed = cache.get(key)
+        if preprocessed is None:
+            preprocessed = preprocess(document, params)
+            cache.put(key, preprocessed)
+        return preprocessed
     # tokenize documents into sentences
     sentences = [
-        [word["text"] for word in sentence]
-        for sentence in tokenize_text(document, split_characters)
+        sentence.tokens() for sentence in tokenize_offsets(document, split_characters)
     ]
     if regex_filter is not None:
         # select tokens given a regex filter and add start and end of sentence tokens SENTSTART and SENTEND
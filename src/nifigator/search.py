@@ -1,13 +1,29 @@
 # -*- coding: utf-8 -*-
 
-"""
-"""
-
-from collections import Counter, namedtuple
+""" """
+
+from bisect import bisect_left
+from collections import Counter, defaultdict, namedtuple
+from collections.abc import Mapping
+from fractions import Fraction
+from heapq import heappush, heapreplace
+import logging
+from itertools import accumulate, chain
+from math import log
 from typing import Union, List, Optional
 from datasketch import MinHashLSHEnsemble, MinHash, lshensemble
-from .multisets import containment_index, merge_multiset
-from .nifvecobjects import document_vector
+from datasketch.hashfunc import sha1_hash32
+import numpy as np
+from .multisets import (
+    containment_index,
+    weighted_containment_index,
+    merge_multiset,
+    encode_multisets,
+    intersection_sizes,
+)
+from .nifgraph import NifGraph
+from .nifvecobjects import document_vector, vectors_key
+from .utils import parallel_map, ContentCache
 
 MatchResult = namedtuple("MatchResult", ["score", "full_matches", "close_matches"])
 MatchResult.__doc__ = """A match result of the search engine"""
@@ -19,8 +35,345 @@ MatchResult.close_matches.__doc__ = (
     "The items in the first key that closely match the items in second key"
 )
 
+SimilarityPair = namedtuple("SimilarityPair", ["uri1", "uri2", "score"])
+SimilarityPair.__doc__ = """A pair of similar sentences found by the similarity join"""
+SimilarityPair.uri1.__doc__ = "The uri of the first sentence"
+SimilarityPair.uri2.__doc__ = "The uri of the second sentence"
+SimilarityPair.score.__doc__ = (
+    "The Jaccard index (float) of the vectors of the first and second sentence"
+)
+
+
+class SearchBase:
+    """
+    The SearchBase contains the functionality that is shared by the search engines
+
+    :param base_vectors: the base vectors from which the document vectors are derived
+
+    :param cache: cache of the document vectors of queries (optional)
+
+    """
+
+    base_vectors = None
+    cache = None
+    _vectors_id = None
+
+    def __init__(self, base_vectors: dict = None, cache: ContentCache = None) -> None:
+        """ """
+        self.set_cache(cache)
+        self.set_base_vectors(base_vectors)
+
+    def set_base_vectors(self, base_vectors: dict = None) -> None:
+        """
+        Sets the base vectors, this should be called again if the base vectors are
+        changed because the cached document vectors are stored with the key of the
+        content of the base vectors
+
+        :param base_vectors: a dictionary of phrases and/or contexts and their multisets
+
+        """
+        if base_vectors is not None:
+            self.base_vectors = base_vectors
+            self._vectors_id = None
+
+    @property
+    def vectors_id(self) -> str:
+        """
+        Returns the key of the content of the base vectors (see vectors_key)
+        """
+        if self._vectors_id is None:
+            self._vectors_id = vectors_key(self.base_vectors)
+        return self._vectors_id
+
+    def _document_vector(self, query: str = None, topn: int = 15) -> dict:
+        """
+        Function that returns the (cached) document vector of a query
+        """
+        if self.cache is None:
+            return document_vector({"query": query}, self.base_vectors, topn=topn)
+        return document_vector(
+            {"query": query},
+            self.base_vectors,
+            topn=topn,
+            cache=self.cache,
+            vectors_id=self.vectors_id,
+        )
+
+    def set_cache(self, cache: ContentCache = None) -> None:
+        """
+        Sets the cache of the document vectors of queries
+
+        :param cache: the cache, if None then the document vectors are not cached
 
-class MinHashSearch:
+        """
+        self.cache = cache
+
+    def matches(
+        self, key1: str = None, key2: str = None, topn: int = 15
+    ) -> MatchResult:
+        """
+        Function to find the exact and close matches of two docs
+
+        :param key1: first doc string
+
+        :param key2: second doc string
+
+        """
+        # generate contexts of the text
+        v1 = self._document_vector(key1, topn=topn)
+        v2 = self._document_vector(key2, topn=topn)
+        # encode the phrase vectors as sparse arrays of element ids
+        phrases1 = list(v1.keys())
+        phrases2 = list(v2.keys())
+        vocabulary = dict()
+        e1 = encode_multisets(v1.values(), vocabulary)
+        e2 = encode_multisets(v2.values(), vocabulary)
+        sizes2 = np.diff(e2.indptr)
+        # generate all phrase pairs with common elements and their intersections
+        rows2, rows1, sizes = intersection_sizes(e2, e1)
+        order = np.lexsort((rows2, rows1))
+        rows1, rows2, sizes = rows1[order], rows2[order], sizes[order]
+        is_full = sizes == sizes2[rows2]
+        # find the full phrase matches of the text and the sentence
+        full_matches = defaultdict(list)
+        for idx1, idx2 in zip(rows1[is_full].tolist(), rows2[is_full].tolist()):
+            full_matches[phrases1[idx1]].append((phrases2[idx2], 0))
+        full_matches = dict(full_matches)
+        # find the close phrase matches of the text and the sentence
+        full_rows1 = set(rows1[is_full].tolist())
+        full_rows2 = set(rows2[is_full].tolist())
+        close_matches = defaultdict(list)
+        for idx1, idx2, size, size2 in zip(
+            rows1[~is_full].tolist(),
+            rows2[~is_full].tolist(),
+            sizes[~is_full].tolist(),
+            sizes2[rows2[~is_full]].tolist(),
+        ):
+            if idx1 not in full_rows1 and idx2 not in full_rows2:
+                close_matches[phrases1[idx1]].append(
+                    (phrases2[idx2], Fraction(size2 - size, size2))
+                )
+        close_matches = {
+            key: sorted(value, key=lambda item: item[1])
+            for key, value in close_matches.items()
+        }
+        close_matches = dict(sorted(close_matches.items(), key=lambda item: item[1]))
+        # calculate the containment index
+        c1 = merge_multiset(v1)
+        c2 = merge_multiset(v2)
+        score = 1 - containment_index(c1, c2)
+        return MatchResult(score, full_matches, close_matches)
+
+
+# range of -log(value) of the weighted hash values, counts up to exp(_LOG_RANGE)
+_LOG_RANGE = 128.0
+
+
+def _mix(x: np.ndarray = None) -> np.ndarray:
+    """
+    Function that mixes the bits of an array of uint64 (splitmix64 finalizer)
+    """
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _uniform(state: np.ndarray = None) -> np.ndarray:
+    """
+    Function that converts an array of random uint64 to floats uniform in (0, 1)
+    """
+    return ((state >> np.uint64(11)).astype(np.float64) + 0.5) * 2.0**-53
+
+
+def _weighted_hashvalues(template: MinHash = None, values: list = None) -> np.ndarray:
+    """
+    Function to compute the hash values of a multiset as the minhash of the copies
+    (item, 0), ..., (item, count - 1) of its items without hashing every copy
+
+    For every item and permutation the copies with a lower value than all previous
+    copies (the records) are generated from a random state that is seeded with the
+    hash value of the item: the distance to the next record is geometric and its
+    value is uniform below the current value. The minimum of the first count copies
+    is the value of the last record before count, so it is the same in every multiset
+    and the cost only grows with the logarithm of the count. The values are kept as
+    floats and stored on a logarithmic scale, so the hash values keep their order and
+    do not run out of resolution for large counts.
+
+    :param template: an empty MinHash with the permutations
+
+    :param values: list of tuples of the item (bytes) and its count (positive integer)
+
+    """
+    minhash = template.copy()
+    rows = []
+    for value, count in values:
+        minhash.hashvalues = template.digest()
+        minhash.update(value)
+        rows.append(minhash.hashvalues.astype(np.uint64))
+    if rows == []:
+        return template.digest()
+    num_perm = len(template)
+    counts = np.repeat(
+        np.array([count for value, count in values], dtype=np.float64), num_perm
+    )
+    items = np.array([sha1_hash32(value) for value, count in values], dtype=np.uint64)
+    state = _mix((np.concatenate(rows) << np.uint64(32)) | np.repeat(items, num_perm))
+    current = _uniform(state)
+    index = np.zeros(len(current), dtype=np.float64)
+    positions = np.flatnonzero(counts > 1)
+    while len(positions) > 0:
+        state1 = _mix(state[positions])
+        state2 = _mix(state1)
+        state[positions] = state2
+        # the number of copies until the next copy with a lower value
+        skip = 1 + np.floor(np.log(_uniform(state1)) / np.log1p(-current[positions]))
+        following = index[positions] + skip
+        found = following < counts[positions]
+        positions = positions[found]
+        current[positions] *= _uniform(state2[found])
+        index[positions] = following[found]
+    # -log of the value on a scale of _LOG_RANGE nats below the maximum hash value
+    top = float(template.digest().max()) - 1
+    hashvalues = np.floor(top * (1 + np.log(current) / _LOG_RANGE))
+    return (
+        np.clip(hashvalues, 0, top)
+        .reshape(len(values), num_perm)
+        .min(axis=0)
+        .astype(template.hashvalues.dtype)
+    )
+
+
+def _minhash_hashvalues(args: tuple) -> np.ndarray:
+    """
+    Function to compute the hash values of a shard of item lists in one process
+
+    :param args: tuple of an empty MinHash (the template), a list of item lists and
+        whether the item lists contain items with their counts (weighted)
+
+    """
+    template, values_list, weighted = args
+    minhash = template.copy()
+    hashvalues = np.empty(
+        (len(values_list), len(template)), dtype=template.hashvalues.dtype
+    )
+    for idx, values in enumerate(values_list):
+        if weighted:
+            hashvalues[idx] = _weighted_hashvalues(template, values)
+            continue
+        minhash.hashvalues = template.digest()
+        if values:
+            minhash.update_batch(values)
+        hashvalues[idx] = minhash.hashvalues
+    return hashvalues
+
+
+def _merge_hashvalues(shared: dict = None, args: tuple = None) -> np.ndarray:
+    """
+    Function to merge the shared hash values for a shard of documents in one process
+
+    :param shared: dict with the hash value matrix and the empty hash values
+
+    :param args: tuple of the document offsets (indptr) and the row of each element
+
+    """
+    indptr, rows = args
+    hashvalues = np.tile(shared["empty"], (len(indptr) - 1, 1))
+    if len(rows) > 0:
+        nonempty = np.diff(indptr) > 0
+        hashvalues[nonempty] = np.minimum.reduceat(
+            shared["hashvalues"][rows], indptr[:-1][nonempty], axis=0
+        )
+    return hashvalues
+
+
+def _shards(iterable, size: int):
+    """
+    Generator that yields lists of at most size items of the iterable
+    """
+    shard = []
+    for item in iterable:
+        shard.append(item)
+        if len(shard) == size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+class MinHashDict(Mapping):
+    """
+    Read-only dictionary of minhashes that stores the hash values of all minhashes
+    in one matrix (one row per key)
+
+    :param keys: the keys of the minhashes
+
+    :param hashvalues: the matrix with the hash values
+
+    :param template: an empty MinHash with the permutations of the minhashes
+
+    """
+
+    def __init__(
+        self,
+        keys: list = None,
+        hashvalues: np.ndarray = None,
+        template: MinHash = None,
+    ) -> None:
+        """ """
+        self.index = {key: idx for idx, key in enumerate(keys)}
+        self.hashvalues = hashvalues
+        self.template = template
+
+    @classmethod
+    def from_minhashes(cls, minhashes: dict = None):
+        """
+        Function to create a MinHashDict from a dictionary of MinHash objects
+
+        :param minhashes: dictionary of MinHash objects with the same permutations
+
+        """
+        keys = list(minhashes.keys())
+        template = minhashes[keys[0]].copy()
+        template.clear()
+        hashvalues = np.array(
+            [minhashes[key].hashvalues for key in keys],
+            dtype=template.hashvalues.dtype,
+        ).reshape(len(keys), len(template))
+        return cls(keys, hashvalues, template)
+
+    def minhash(self, hashvalues: np.ndarray = None) -> MinHash:
+        """
+        Function to create a MinHash object from a row of hash values
+
+        :param hashvalues: the hash values of the MinHash
+
+        """
+        minhash = self.template.copy()
+        minhash.hashvalues = np.array(hashvalues, dtype=self.template.hashvalues.dtype)
+        return minhash
+
+    def rows(self, keys: list = None) -> list:
+        """
+        Function to get the rows in the hash value matrix of a list of keys
+
+        :param keys: the keys for which to return the rows
+
+        """
+        return [self.index[key] for key in keys]
+
+    def __getitem__(self, key) -> MinHash:
+        return self.minhash(self.hashvalues[self.index[key]])
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+class MinHashSearch(SearchBase):
     """
     The MinHashSearch is a search engine based on the hashes of phrases and/or context multisets
 
@@ -32,6 +385,15 @@ class MinHashSearch:
 
     :param num_perm: Number of random permutation functions.
 
+    :param workers: number of processes used to build the index (1 builds in the current process)
+
+    :param shard_size: number of base vectors or documents that are sent to a worker at once
+
+    :param weighted: if True then the minhashes respect the counts of the items in the base
+        vectors (weighted Jaccard index), otherwise only the items are hashed
+
+    :param cache: cache of the document vectors of queries (optional)
+
     """
 
     def __init__(
@@ -43,26 +405,25 @@ class MinHashSearch:
         num_part: int = 2**5,
         threshold: float = 0.5,
         topn: int = 15,
+        workers: int = 1,
+        shard_size: int = 2**10,
+        weighted: bool = False,
+        cache: ContentCache = None,
     ) -> None:
         """ """
+        self.set_cache(cache)
         self.num_perm = num_perm
         self.num_part = num_part
         self.threshold = threshold
         self.topn = topn
+        self.workers = workers
+        self.shard_size = shard_size
+        self.weighted = weighted
+        self.template = MinHash(num_perm=self.num_perm)
         self.set_base_vectors(base_vectors)
         self.set_minhash_dict(minhash_dict)
         self.set_minhash_documents(documents)
 
-    def set_base_vectors(self, base_vectors: dict = None) -> None:
-        """
-        Sets the base vectors
-
-        :param base_vectors: a dictionary of phrases and/or contexts and their multisets
-
-        """
-        if base_vectors is not None:
-            self.base_vectors = base_vectors
-
     def set_minhash_dict(self, minhash_dict: dict = None) -> None:
         """
         Sets the minhash of the base vectors
@@ -72,8 +433,10 @@ class MinHashSearch:
         """
         if minhash_dict is None:
             self.minhash_dict = self.setup_minhash_base_vectors()
-        else:
+        elif isinstance(minhash_dict, MinHashDict):
             self.minhash_dict = minhash_dict
+        else:
+            self.minhash_dict = MinHashDict.from_minhashes(minhash_dict)
 
     def set_minhash_documents(self, documents: dict = None) -> None:
         """
@@ -89,17 +452,40 @@ class MinHashSearch:
 
     def setup_minhash_base_vectors(
         self,
-    ) -> dict:
+    ) -> MinHashDict:
         """
         Function to create the minhash of the base vectors (topn of each multiset)
+
+        The base vectors are hashed in shards (in parallel if workers > 1) and the
+        results are stored in one hash value matrix. If weighted then each item counts
+        as count copies, so the minhashes estimate the weighted Jaccard index.
         """
-        mh_dict = dict()
-        for key, value in self.base_vectors.items():
-            mh_dict[key] = MinHash(num_perm=self.num_perm)
-            for item, count in value.most_common(self.topn):
-                v = str(item).encode("utf8")
-                mh_dict[key].update(v)
-        return mh_dict
+        keys = list(self.base_vectors.keys())
+        if self.weighted:
+            values = (
+                [
+                    (str(item).encode("utf8"), int(count))
+                    for item, count in self.base_vectors[key].most_common(self.topn)
+                    if count > 0
+                ]
+                for key in keys
+            )
+        else:
+            values = (
+                [
+                    str(item).encode("utf8")
+                    for item, count in self.base_vectors[key].most_common(self.topn)
+                ]
+                for key in keys
+            )
+        tasks = (
+            (self.template, shard, self.weighted)
+            for shard in _shards(values, self.shard_size)
+        )
+        hashvalues = list(
+            parallel_map(_minhash_hashvalues, tasks, workers=self.workers)
+        )
+        return MinHashDict(keys, self._stack(hashvalues), self.template)
 
     def create_lshensemble(self, documents: dict = None) -> MinHashLSHEnsemble:
         """
@@ -119,19 +505,51 @@ class MinHashSearch:
         )
         return lshensemble
 
-    def merge_minhash(self, documents: dict = None) -> dict:
+    def merge_minhash(self, documents: dict = None) -> MinHashDict:
         """
         Merge minhashes from the minhashes of the base vectors
 
+        The minhash of a document is the element-wise minimum of the rows of its
+        elements in the hash value matrix of the base vectors
+
         :param document: a document dictionary (id and text)
 
         """
-        mh = dict()
-        for key, elements in documents.items():
-            mh[key] = MinHash(num_perm=self.num_perm)
-            for element in elements.keys():
-                mh[key].merge(self.minhash_dict[element])
-        return mh
+        keys = list(documents.keys())
+        tasks = (
+            (
+                np.fromiter(
+                    accumulate((len(documents[key]) for key in shard), initial=0),
+                    dtype=np.int64,
+                ),
+                np.array(
+                    [
+                        row
+                        for key in shard
+                        for row in self.minhash_dict.rows(documents[key].keys())
+                    ],
+                    dtype=np.int64,
+                ),
+            )
+            for shard in _shards(keys, self.shard_size)
+        )
+        hashvalues = list(
+            parallel_map(
+                _merge_hashvalues,
+                tasks,
+                workers=self.workers,
+                shared={
+                    "hashvalues": self.minhash_dict.hashvalues,
+                    "empty": self.template.hashvalues,
+                },
+            )
+        )
+        return MinHashDict(keys, self._stack(hashvalues), self.template)
+
+    def _stack(self, hashvalues: list) -> np.ndarray:
+        if len(hashvalues) == 0:
+            return np.empty((0, self.num_perm), dtype=self.template.hashvalues.dtype)
+        return np.concatenate(hashvalues)
 
     def get_scores(
         self,
@@ -144,62 +562,461 @@ class MinHashSearch:
 
         """
         # create minhash of the query
-        v = document_vector({"query": query}, self.base_vectors)
-        minhash_query = MinHash(num_perm=self.num_perm)
-        for element in v.keys():
-            minhash_query.merge(self.minhash_dict[element])
+        v = self._document_vector(query)
+        rows = self.minhash_dict.rows(v.keys())
+        if rows:
+            hashvalues = self.minhash_dict.hashvalues[rows].min(axis=0)
+        else:
+            hashvalues = self.template.hashvalues
+        minhash_query = self.minhash_dict.minhash(hashvalues)
         # determine scores from the lshensemble
         scores = dict()
         for doc in self.lshensemble.query(minhash_query, len(v.keys())):
-            # for each doc calculate the containment score
-            c1 = merge_multiset(v).keys()
-            c2 = merge_multiset(self.documents[doc]).keys()
-            scores[doc] = 1 - containment_index(c1, c2)
+            # for each doc calculate the (weighted) containment score
+            c1 = merge_multiset(v)
+            c2 = merge_multiset(self.documents[doc])
+            if self.weighted:
+                scores[doc] = 1 - weighted_containment_index(c1, c2)
+            else:
+                scores[doc] = 1 - containment_index(c1.keys(), c2.keys())
         # sort the docs dictionary on the score of each doc
         scores = dict(sorted(scores.items(), key=lambda item: item[1]))
         return scores
 
-    def matches(
-        self, key1: str = None, key2: str = None, topn: int = 15
-    ) -> MatchResult:
+
+class InvertedIndexSearch(SearchBase):
+    """
+    The InvertedIndexSearch is an exact search engine based on posting lists of the phrases and/or contexts multisets
+
+    :param base_vectors: the base vectors from which to derive the query vectors
+
+    :param documents: set of documents (dictionary of documents and their document vectors)
+
+    :param scoring: the scoring function, "containment" (default) or "bm25"
+
+    :param k1: term frequency saturation parameter of the bm25 scoring
+
+    :param b: document length normalisation parameter of the bm25 scoring
+
+    :param cache: cache of the document vectors of queries (optional)
+
+    """
+
+    def __init__(
+        self,
+        base_vectors: dict,
+        documents: dict,
+        scoring: str = "containment",
+        k1: float = 1.2,
+        b: float = 0.75,
+        cache: ContentCache = None,
+    ) -> None:
+        """ """
+        self.set_cache(cache)
+        if scoring not in ["containment", "bm25"]:
+            raise ValueError("Unknown scoring function: " + repr(scoring))
+        self.scoring = scoring
+        self.k1 = k1
+        self.b = b
+        self.set_base_vectors(base_vectors)
+        self.set_documents(documents)
+
+    def set_documents(self, documents: dict = None) -> None:
         """
-        Function to find the exact and close matches of two docs
+        Sets the documents and creates the posting lists of the elements in the documents
 
-        :param key1: first doc string
+        :param documents: dictionary of documents
 
-        :param key2: second doc string
+        """
+        if documents is not None:
+            self.documents = documents
+            self.create_index(self.documents)
 
+    def create_index(self, documents: dict = None) -> None:
         """
-        # generate contexts of the text
-        v1 = document_vector({"query": key1}, self.base_vectors, topn=topn)
-        v2 = document_vector({"query": key2}, self.base_vectors, topn=topn)
-        # find the full phrase matches of the text and the sentence
-        full_matches = {
-            p1: [(p2, 0) for p2, c2 in v2.items() if 1 - containment_index(c2, c1) == 0]
-            for p1, c1 in v1.items()
-        }
-        full_matches = {
-            key: value for key, value in full_matches.items() if value != []
-        }
-        # find the close phrase matches of the text and the sentence
-        close_matches = {
-            p1: [
-                (p2, 1 - containment_index(c2, c1))
-                for p2, c2 in v2.items()
-                if 1 - containment_index(c2, c1) < 1
-                and p1 not in full_matches.keys()
-                and p2 not in [p[0] for p in full_matches.values()]
+        Function to create the posting lists from the elements of the documents to the documents
+
+        The posting lists contain the document ids in increasing order together with the impact
+        of the element on the score of the document. The maximum impact of each element is
+        stored for early termination.
+
+        :param documents: the documents for which to create the posting lists
+
+        """
+        self.doc_keys = list(documents.keys())
+        doc_lengths = list()
+        postings = defaultdict(lambda: ([], []))
+        for doc_id, key in enumerate(self.doc_keys):
+            counts = merge_multiset(documents[key])
+            doc_lengths.append(sum(counts.values()))
+            for element, count in counts.items():
+                doc_ids, doc_counts = postings[element]
+                doc_ids.append(doc_id)
+                doc_counts.append(count)
+
+        num_docs = len(self.doc_keys)
+        avg_length = sum(doc_lengths) / num_docs if num_docs > 0 else 0
+        self.postings = dict()
+        self.max_impacts = dict()
+        for element, (doc_ids, doc_counts) in postings.items():
+            if self.scoring == "bm25":
+                df = len(doc_ids)
+                idf = log(1 + (num_docs - df + 0.5) / (df + 0.5))
+                impacts = [
+                    idf
+                    * count
+                    * (self.k1 + 1)
+                    / (
+                        count
+                        + self.k1
+                        * (1 - self.b + self.b * doc_lengths[doc_id] / avg_length)
+                    )
+                    for doc_id, count in zip(doc_ids, doc_counts)
+                ]
+            else:
+                # each element contributes once to the intersection
+                impacts = [1] * len(doc_ids)
+            self.postings[element] = (doc_ids, impacts)
+            self.max_impacts[element] = max(impacts)
+
+    def get_scores(self, query: str = None, topn: int = None) -> dict:
+        """
+        Get document scores given a query and the posting lists
+
+        The scores are distances (lower is better) to be compatible with the `MinHashSearch`.
+        With containment scoring the score is one minus the containment of the query in the
+        document, with bm25 scoring the score is one minus the bm25 score divided by the
+        maximal attainable bm25 score of the query.
+
+        :param query: the query to use to score the documents
+
+        :param topn: restrict output to the topn documents (default = None, all documents that
+            contain at least one element of the query)
+
+        """
+        v = self._document_vector(query)
+        elements = merge_multiset(v).keys()
+        terms = [element for element in elements if element in self.postings]
+        if self.scoring == "bm25":
+            norm = sum(self.max_impacts[element] for element in terms)
+        else:
+            norm = len(elements)
+        if norm == 0:
+            return dict()
+        if topn is None:
+            doc_scores = self.score_documents(terms)
+        else:
+            doc_scores = self.top_documents(terms, topn)
+        if self.scoring == "bm25":
+            scores = {
+                self.doc_keys[doc_id]: 1 - score / norm
+                for doc_id, score in doc_scores.items()
+            }
+        else:
+            scores = {
+                self.doc_keys[doc_id]: 1 - Fraction(score, norm)
+                for doc_id, score in doc_scores.items()
+            }
+        # sort the docs dictionary on the score of each doc
+        scores = dict(sorted(scores.items(), key=lambda item: item[1]))
+        return scores
+
+    def score_documents(self, terms: list = None) -> dict:
+        """
+        Function to calculate the scores of all documents that contain one of the terms
+
+        :param terms: the elements of the query
+
+        """
+        scores = defaultdict(int)
+        for term in terms:
+            doc_ids, impacts = self.postings[term]
+            for doc_id, impact in zip(doc_ids, impacts):
+                scores[doc_id] += impact
+        return scores
+
+    def top_documents(self, terms: list = None, topn: int = 15) -> dict:
+        """
+        Function to calculate the scores of the topn documents with MaxScore early termination
+
+        The posting lists are ordered on their maximum impact. Lists of which the sum of
+        maximum impacts cannot exceed the current topn threshold are non-essential: documents
+        that occur only in these lists are skipped and the lists are only probed for the
+        documents that are found in the essential lists.
+
+        :param terms: the elements of the query
+
+        :param topn: the number of documents to return
+
+        """
+        if topn is None or topn <= 0:
+            return dict()
+        lists = sorted(
+            ((self.max_impacts[term],) + self.postings[term] for term in terms),
+            key=lambda item: item[0],
+        )
+        upper_bounds = list(accumulate(item[0] for item in lists))
+        pointers = [0] * len(lists)
+        heap = list()
+        threshold = 0
+        first_essential = 0
+        while True:
+            # the next candidate is the smallest document id in the essential lists
+            candidates = [
+                lists[i][1][pointers[i]]
+                for i in range(first_essential, len(lists))
+                if pointers[i] < len(lists[i][1])
             ]
-            for p1, c1 in v1.items()
-        }
-        close_matches = {
-            key: sorted(value, key=lambda item: item[1])
-            for key, value in close_matches.items()
-            if value != []
-        }
-        close_matches = dict(sorted(close_matches.items(), key=lambda item: item[1]))
-        # calculate the containment index
-        c1 = merge_multiset(v1)
-        c2 = merge_multiset(v2)
-        score = 1 - containment_index(c1, c2)
-        return MatchResult(score, full_matches, close_matches)
+            if candidates == []:
+                break
+            doc_id = min(candidates)
+            score = 0
+            for i in range(first_essential, len(lists)):
+                doc_ids, impacts = lists[i][1], lists[i][2]
+                if pointers[i] < len(doc_ids) and doc_ids[pointers[i]] == doc_id:
+                    score += impacts[pointers[i]]
+                    pointers[i] += 1
+            # probe non-essential lists while the document can still enter the topn
+            for i in range(first_essential - 1, -1, -1):
+                if score + upper_bounds[i] <= threshold:
+                    break
+                doc_ids, impacts = lists[i][1], lists[i][2]
+                pointers[i] = bisect_left(doc_ids, doc_id, pointers[i])
+                if pointers[i] < len(doc_ids) and doc_ids[pointers[i]] == doc_id:
+                    score += impacts[pointers[i]]
+            if len(heap) < topn:
+                heappush(heap, (score, doc_id))
+            elif score > heap[0][0]:
+                heapreplace(heap, (score, doc_id))
+            if len(heap) == topn:
+                threshold = heap[0][0]
+                while (
+                    first_essential < len(lists)
+                    and upper_bounds[first_essential] <= threshold
+                ):
+                    first_essential += 1
+        return {doc_id: score for score, doc_id in heap}
+
+
+def _sentence_elements(shared: dict = None, sentences: list = None) -> list:
+    """
+    Function to get the set of elements of the vector of each sentence in a shard
+
+    :param shared: dict with the base vectors and topn
+
+    :param sentences: list of tuples of the sentence uri and the sentence text
+
+    """
+    return [
+        set(
+            document_vector(
+                {uri: text},
+                shared["base_vectors"],
+                topn=shared["topn"],
+                merge_dict=True,
+            ).keys()
+        )
+        for uri, text in sentences
+    ]
+
+
+def _prefix_sizes(sizes: np.ndarray = None, overlap: float = None) -> np.ndarray:
+    """
+    Function to calculate the prefix sizes of signatures given the minimum overlap fraction
+    """
+    min_overlap = np.ceil(overlap * sizes - 1e-9).astype(np.int64)
+    return np.minimum(sizes - min_overlap + 1, sizes)
+
+
+def _sentence_signatures(elements: list = None, threshold: float = 0.5) -> dict:
+    """
+    Function to create the signatures of the sentences for the similarity join
+
+    The elements are replaced by their rank in the order of increasing frequency so the
+    prefix of each signature contains the rarest elements, and the sentences are sorted
+    by the size of their signature.
+
+    :param elements: list with the set of elements of each sentence
+
+    :param threshold: the minimum Jaccard index of the join
+
+    """
+    encoded = encode_multisets(elements)
+    num_rows, num_tokens = len(elements), len(encoded.vocabulary)
+    frequencies = np.bincount(encoded.indices, minlength=num_tokens)
+    rank = np.empty(num_tokens, dtype=np.int64)
+    rank[np.argsort(frequencies, kind="stable")] = np.arange(num_tokens)
+    sizes = np.diff(encoded.indptr)
+    order = np.argsort(sizes, kind="stable")
+    position = np.empty(num_rows, dtype=np.int64)
+    position[order] = np.arange(num_rows)
+    rows = position[np.repeat(np.arange(num_rows), sizes)]
+    tokens = rank[encoded.indices]
+    idx = np.lexsort((tokens, rows))
+    rows, tokens = rows[idx], tokens[idx]
+    sizes = sizes[order]
+    indptr = np.concatenate([[0], np.cumsum(sizes)])
+    # a pair with a Jaccard index of at least the threshold has a common element in
+    # the prefix of length size - ceil(threshold * size) + 1 of the larger sentence
+    # and the prefix of length size - ceil(2 * threshold / (1 + threshold) * size) + 1
+    # of the smaller sentence (the indexed prefix)
+    positions = np.arange(len(tokens)) - np.repeat(indptr[:-1], sizes)
+    probe_sizes = _prefix_sizes(sizes, threshold)
+    in_prefix = positions < np.repeat(probe_sizes, sizes)
+    probe_tokens = tokens[in_prefix]
+    in_index = positions < np.repeat(
+        _prefix_sizes(sizes, 2 * threshold / (1 + threshold)), sizes
+    )
+    index_rows, index_tokens = rows[in_index], tokens[in_index]
+    index_positions = positions[in_index]
+    inverted = np.argsort(index_tokens, kind="stable")
+    return {
+        "threshold": threshold,
+        "order": order,
+        "sizes": sizes,
+        "indptr": indptr,
+        "keys": rows * num_tokens + tokens,
+        "tokens": tokens,
+        "num_tokens": num_tokens,
+        "prefix_indptr": np.concatenate([[0], np.cumsum(probe_sizes)]),
+        "prefix_tokens": probe_tokens,
+        "inverted_tokens": index_tokens[inverted],
+        "inverted_rows": index_rows[inverted],
+        "inverted_positions": index_positions[inverted],
+    }
+
+
+def _join_rows(s: dict = None, args: tuple = None) -> tuple:
+    """
+    Function to find the similar sentences of a range of (size ordered) sentences
+
+    The candidates are the smaller sentences that share an element in their prefix, and
+    these are verified by looking up their elements in the signature of the sentence.
+
+    :param s: the signatures of the sentences (see _sentence_signatures)
+
+    :param args: tuple of the first and last (exclusive) row
+
+    """
+    start, stop = args
+    empty = np.zeros(0, dtype=np.int64)
+    # probe the inverted index of the prefixes with the prefixes of the rows
+    begin, end = s["prefix_indptr"][start], s["prefix_indptr"][stop]
+    probe_tokens = s["prefix_tokens"][begin:end]
+    probe_sizes = np.diff(s["prefix_indptr"][start : stop + 1])
+    probe_rows = np.repeat(np.arange(start, stop), probe_sizes)
+    probe_positions = np.arange(begin, end) - np.repeat(
+        s["prefix_indptr"][start:stop], probe_sizes
+    )
+    starts = np.searchsorted(s["inverted_tokens"], probe_tokens, side="left")
+    counts = np.searchsorted(s["inverted_tokens"], probe_tokens, side="right") - starts
+    total = counts.sum()
+    if total == 0:
+        return empty, empty, np.zeros(0)
+    offsets = np.cumsum(counts) - counts
+    positions = np.arange(total) - np.repeat(offsets - starts, counts)
+    rows1 = np.repeat(probe_rows, counts)
+    rows2 = s["inverted_rows"][positions]
+    # each pair once (rows2 is not larger than rows1) and length filter
+    sizes = s["sizes"]
+    keep = (rows2 < rows1) & (
+        sizes[rows2] >= np.ceil(s["threshold"] * sizes[rows1] - 1e-9)
+    )
+    num_rows = len(sizes)
+    pairs, first = np.unique(rows1[keep] * num_rows + rows2[keep], return_index=True)
+    rows1, rows2 = pairs // num_rows, pairs % num_rows
+    # positional filter: the first common element bounds the size of the intersection
+    positions1 = np.repeat(probe_positions, counts)[keep][first]
+    positions2 = s["inverted_positions"][positions][keep][first]
+    bound = 1 + np.minimum(sizes[rows1] - positions1 - 1, sizes[rows2] - positions2 - 1)
+    keep = bound >= np.ceil(
+        s["threshold"] / (1 + s["threshold"]) * (sizes[rows1] + sizes[rows2]) - 1e-9
+    )
+    pairs, rows1, rows2 = pairs[keep], rows1[keep], rows2[keep]
+    # verify the candidates: look up the elements of rows2 in the signatures of rows1
+    counts = sizes[rows2]
+    offsets = np.cumsum(counts) - counts
+    positions = np.arange(counts.sum()) - np.repeat(
+        offsets - s["indptr"][rows2], counts
+    )
+    queries = np.repeat(rows1, counts) * s["num_tokens"] + s["tokens"][positions]
+    found = np.searchsorted(s["keys"], queries).clip(max=len(s["keys"]) - 1)
+    intersections = np.bincount(
+        np.repeat(np.arange(len(pairs)), counts),
+        weights=s["keys"][found] == queries,
+        minlength=len(pairs),
+    )
+    scores = intersections / (sizes[rows1] + sizes[rows2] - intersections)
+    keep = scores >= s["threshold"]
+    return s["order"][rows1[keep]], s["order"][rows2[keep]], scores[keep]
+
+
+def sentence_similarity_join(
+    contexts: Union[NifGraph, list] = None,
+    base_vectors: dict = None,
+    threshold: float = 0.5,
+    topn: int = 15,
+    workers: int = 1,
+    shard_size: int = 2**10,
+):
+    """
+    Generator that yields all pairs of sentences of which the Jaccard index of their
+    vectors is at least the threshold
+
+    The vector of a sentence is the set of elements of its (merged) document vector.
+    Candidate pairs are found with prefix filtering on the signatures of the sentences
+    instead of comparing all pairs, and the candidates are verified with the exact
+    Jaccard index. The shards of sentences are processed in parallel if workers > 1.
+
+    :param contexts: a NifGraph or a list of NifContexts with the sentences
+
+    :param base_vectors: the base vectors from which the sentence vectors are derived
+
+    :param threshold: the minimum Jaccard index (larger than 0) of the pairs
+
+    :param topn: the number of elements of each phrase in the sentence vector
+
+    :param workers: the number of processes (1 processes in the current process)
+
+    :param shard_size: the number of sentences that are sent to a worker at once
+
+    Returns:
+        SimilarityPair: the uris of both sentences and the Jaccard index
+
+    """
+    if not 0 < threshold <= 1:
+        raise ValueError("Threshold should be in (0, 1]: " + repr(threshold))
+    if isinstance(contexts, NifGraph):
+        contexts = contexts.contexts
+    sentences = [
+        (sentence.uri, sentence.anchorOf)
+        for context in contexts
+        for sentence in context.sentences
+    ]
+    uris = [uri for uri, text in sentences]
+    elements = list(
+        chain.from_iterable(
+            parallel_map(
+                _sentence_elements,
+                _shards(sentences, shard_size),
+                workers=workers,
+                shared={"base_vectors": base_vectors, "topn": topn},
+            )
+        )
+    )
+    signatures = _sentence_signatures(elements, threshold)
+    del elements
+    logging.debug(".. similarity join of " + str(len(uris)) + " sentences")
+    for rows1, rows2, scores in parallel_map(
+        _join_rows,
+        (
+            (start, min(start + shard_size, len(uris)))
+            for start in range(0, len(uris), shard_size)
+        ),
+        workers=workers,
+        shared=signatures,
+    ):
+        for row1, row2, score in zip(rows1, rows2, scores):
+            if row1 > row2:
+                row1, row2 = row2, row1
+            yield SimilarityPair(uris[row1], uris[row2], float(score))
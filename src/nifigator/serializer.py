@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+
+import gzip
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Union
+
+from rdflib import Graph
+from rdflib.namespace import DCTERMS, RDF, XSD
+from rdflib.term import BNode, Literal, Node, URIRef
+
+from .const import NIF
+from .nifobjects import NifContext, NifContextCollection
+
+FORMATS = {
+    "nt": "nt",
+    "ntriples": "nt",
+    "nt11": "nt",
+    "nq": "nquads",
+    "nquads": "nquads",
+    "hext": "hext",
+}
+
+
+def _serialization_format(filename: str = None, format: str = None) -> str:
+    """
+    Function that returns the format (nt, nquads or hext) of a filename if the format
+    is not given
+    """
+    if format is None:
+        name = filename[:-3] if filename[-3:].lower() == ".gz" else filename
+        format = name.rsplit(".", 1)[-1].lower()
+    if format.lower() not in FORMATS.keys():
+        raise ValueError("unsupported format " + format + ", use nt, nquads or hext")
+    return FORMATS[format.lower()]
+
+
+def _chunk_filename(filename: str = None, index: int = 0) -> str:
+    """
+    Function that returns the filename of a chunk, the number of the chunk is added
+    to the name before the extensions, e.g. nif.nt.gz becomes nif_00003.nt.gz
+    """
+    directory, name = os.path.split(filename)
+    stem, dot, extensions = name.partition(".")
+    return os.path.join(directory, stem + "_" + str(index).zfill(5) + dot + extensions)
+
+
+def _quote_literal(literal: Literal = None) -> str:
+    """
+    Function that returns a literal in N-Triples syntax
+    """
+    s = (
+        '"'
+        + str(literal)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+        .replace("\r", "\\r")
+        + '"'
+    )
+    if literal.language is not None:
+        return s + "@" + str(literal.language)
+    elif literal.datatype is not None:
+        return s + "^^<" + str(literal.datatype) + ">"
+    return s
+
+
+def _nt_term(term: Node = None) -> str:
+    """
+    Function that returns a term in N-Triples syntax
+    """
+    if isinstance(term, Literal):
+        return _quote_literal(term)
+    elif isinstance(term, BNode):
+        return "_:" + str(term)
+    return "<" + str(term) + ">"
+
+
+def _hext_value(term: Node = None) -> tuple:
+    """
+    Function that returns the value, datatype and language columns of a term in
+    hext format
+    """
+    if isinstance(term, Literal):
+        if term.language is not None:
+            return str(term), str(RDF.langString), term.language
+        elif term.datatype is not None:
+            return str(term), str(term.datatype), ""
+        return str(term), str(XSD.string), ""
+    elif isinstance(term, BNode):
+        return "_:" + str(term), "localId", ""
+    return str(term), "globalId", ""
+
+
+class _LineEncoder:
+    """
+    Encoder of triples to lines in N-Triples, N-Quads or hext format
+
+    The N-Triples form of the subjects and predicates is cached, because the
+    triples of a NIF object share their subject.
+
+    :param format: the format (nt, nquads or hext)
+
+    :param graph: the identifier of the graph of the triples (in N-Quads and hext)
+
+    :param cache_size: the maximum number of cached terms
+
+    """
+
+    def __init__(self, format: str = "nt", graph: Node = None, cache_size: int = 2**16):
+        self.format = format
+        self.cache_size = cache_size
+        self._terms = dict()
+        if format == "nquads" and graph is not None:
+            self._end = " " + _nt_term(graph) + " .\n"
+        else:
+            self._end = " .\n"
+        self._graph = str(graph) if graph is not None else ""
+
+    def _term(self, term: Node = None) -> str:
+        s = self._terms.get(term)
+        if s is None:
+            s = _nt_term(term)
+            if len(self._terms) >= self.cache_size:
+                self._terms.clear()
+            self._terms[term] = s
+        return s
+
+    def lines(self, triples: Iterable[tuple] = None) -> List[str]:
+        """
+        Function that returns the lines of triples
+        """
+        if self.format == "hext":
+            return [
+                json.dumps(
+                    [_hext_value(s)[0], str(p), *_hext_value(o), self._graph],
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                )
+                + "\n"
+                for s, p, o in triples
+            ]
+        end = self._end
+        term = self._term
+        return [
+            term(s)
+            + " "
+            + term(p)
+            + " "
+            + (_quote_literal(o) if isinstance(o, Literal) else term(o))
+            + end
+            for s, p, o in triples
+        ]
+
+    def encode(self, triples: Iterable[tuple] = None, level: int = None) -> tuple:
+        """
+        Function that returns the encoded lines of triples (compressed as a gzip
+        member if level is not None) and the number of triples
+        """
+        lines = self.lines(triples)
+        data = "".join(lines).encode("utf-8")
+        if level is not None:
+            data = gzip.compress(data, compresslevel=level, mtime=0)
+        return data, len(lines)
+
+
+class _ChunkedFile:
+    """
+    File that is split in chunks of at least chunk_size triples
+
+    :param filename: the filename (or the pattern of the filenames of the chunks)
+
+    :param chunk_size: the number of triples of a chunk, None for a single file
+
+    :param level: the gzip compression level if the data is compressed by the file
+
+    """
+
+    def __init__(self, filename: str = None, chunk_size: int = None, level=None):
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.level = level
+        self.filenames = []
+        self._f = None
+        self._count = 0
+
+    @property
+    def remaining(self) -> Optional[int]:
+        """
+        The number of triples that fit in the current chunk
+        """
+        if self.chunk_size is None:
+            return None
+        return self.chunk_size - self._count
+
+    def write(self, data: bytes = None, count: int = 0) -> None:
+        if self._f is None:
+            if self.chunk_size is None:
+                filename = self.filename
+            else:
+                filename = _chunk_filename(self.filename, len(self.filenames))
+            logging.info(".. Writing file " + filename)
+            if self.level is not None:
+                self._f = gzip.open(filename, "wb", compresslevel=self.level)
+            else:
+                self._f = open(filename, "wb")
+            self.filenames.append(filename)
+            self._count = 0
+        self._f.write(data)
+        self._count += count
+        if self.chunk_size is not None and self._count >= self.chunk_size:
+            self.close()
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+            self._count = 0
+
+
+def write_triples(
+    triples: Union[Graph, Iterable[tuple]] = None,
+    filename: str = None,
+    format: str = None,
+    chunk_size: int = None,
+    graph: Node = None,
+    batch_size: int = 2**12,
+    level: int = 6,
+) -> List[str]:
+    """
+    Function to write triples in N-Triples, N-Quads or hext format
+
+    The triples are encoded and written in batches while they are generated, so
+    the output is never built as a whole in memory. A file with a filename ending
+    with ".gz" is compressed with gzip.
+
+    :param triples: a graph (e.g. a NifGraph) or an iterable of triples, e.g. the
+        triples() of a NifContextCollection
+
+    :param filename: the filename, the format is derived from the extension (.nt,
+        .nq or .hext) if it is not given
+
+    :param format: the format (nt, nquads or hext)
+
+    :param chunk_size: the number of triples per file, if not None then the output
+        is split in files of which the number is added to the filename (e.g.
+        nif_00000.nt.gz, nif_00001.nt.gz, ...)
+
+    :param graph: the identifier of the graph of the triples (in N-Quads and hext)
+
+    :param batch_size: the number of triples that is encoded at once
+
+    :param level: the gzip compression level
+
+    :return: the list of the filenames that are written
+
+    """
+    format = _serialization_format(filename, format)
+    encoder = _LineEncoder(format=format, graph=graph)
+    level = level if filename[-3:].lower() == ".gz" else None
+    f = _ChunkedFile(filename=filename, chunk_size=chunk_size, level=level)
+    try:
+        batch = []
+        size = batch_size if chunk_size is None else min(batch_size, chunk_size)
+        for triple in triples:
+            batch.append(triple)
+            if len(batch) == size:
+                f.write(*encoder.encode(batch))
+                batch = []
+                if chunk_size is not None:
+                    size = min(batch_size, f.remaining)
+        if batch or not f.filenames:
+            f.write(*encoder.encode(batch))
+    finally:
+        f.close()
+    return f.filenames
+
+
+def _context_triples(context: NifContext = None, collection: URIRef = None):
+    """
+    Generator of the triples of a context (and the nif:hasContext triple of its
+    collection) in the same order as NifContextCollection.triples()
+    """
+    if collection is not None:
+        yield (collection, NIF.hasContext, context.uri)
+    for triple in context.triples():
+        yield triple
+
+
+def write_contexts(
+    contexts: Union[NifContextCollection, Iterable[NifContext]] = None,
+    filename: str = None,
+    format: str = None,
+    chunk_size: int = None,
+    workers: int = 1,
+    graph: Node = None,
+    level: int = 6,
+) -> List[str]:
+    """
+    Function to write the triples of NIF contexts in N-Triples, N-Quads or hext
+    format without creating a graph
+
+    The contexts are encoded (and compressed if the filename ends with ".gz") by a
+    pool of threads, at most two contexts per thread are held in memory. The
+    encoded contexts are written in the order of the contexts, a compressed file
+    is a series of gzip members, one per context. The triples of a context are
+    never split over two chunks.
+
+    The threads only run the gzip compression in parallel, generating and
+    encoding the triples is Python code that holds the GIL. So workers > 1 only
+    speeds up writing compressed files. To encode in parallel, write subsets of
+    the contexts to separate files in separate processes.
+
+    :param contexts: a NifContextCollection or an iterable of NifContexts
+
+    :param filename: the filename, the format is derived from the extension (.nt,
+        .nq or .hext) if it is not given
+
+    :param format: the format (nt, nquads or hext)
+
+    :param chunk_size: the minimum number of triples per file, if not None then the
+        output is split in files of which the number is added to the filename (a
+        file is closed after the context with which the number is reached)
+
+    :param workers: the number of threads that encode and compress the contexts
+
+    :param graph: the identifier of the graph of the triples (in N-Quads and hext)
+
+    :param level: the gzip compression level
+
+    :return: the list of the filenames that are written
+
+    """
+    format = _serialization_format(filename, format)
+    encoder = _LineEncoder(format=format, graph=graph)
+    level = level if filename[-3:].lower() == ".gz" else None
+    f = _ChunkedFile(filename=filename, chunk_size=chunk_size)
+    collection = None
+    if isinstance(contexts, NifContextCollection):
+        collection = contexts.uri
+        header = []
+        if collection is not None:
+            header.append((collection, RDF.type, NIF.ContextCollection))
+            if contexts.conformsTo is not None:
+                header.append((collection, DCTERMS.conformsTo, contexts.conformsTo))
+        contexts = contexts.hasContext
+        if header:
+            f.write(*encoder.encode(header, level))
+
+    def encode(context: NifContext = None) -> tuple:
+        # the encoder is shared by the threads, its cache is a dict of which the
+        # lookups and updates are atomic
+        return encoder.encode(_context_triples(context, collection), level)
+
+    try:
+        if workers is None or workers <= 1:
+            for context in contexts:
+                f.write(*encode(context))
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = deque()
+                for context in contexts:
+                    if len(futures) >= 2 * workers:
+                        f.write(*futures.popleft().result())
+                    futures.append(executor.submit(encode, context))
+                while futures:
+                    f.write(*futures.popleft().result())
+        if not f.filenames:
+            f.write(*encoder.encode([], level))
+    finally:
+        f.close()
+    return f.filenames
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import mmap
+import zlib
+from array import array
+from bisect import bisect_right
+from typing import Optional
+
+import numpy as np
+from rdflib import Graph
+from rdflib.graph import ModificationException
+from rdflib.store import Store, VALID_STORE
+from rdflib.term import Node, URIRef
+
+from .utils import term_key, make_term
+
+MAGIC = b"NIFSNAP1"
+VERSION = 1
+
+# the order of the columns of the sorted triple arrays
+INDEXES = {"spo": (0, 1, 2), "pos": (1, 2, 0), "osp": (2, 0, 1)}
+
+
+def _pad(f=None, position: int = 0) -> int:
+    """
+    Function that writes zero bytes until the position is a multiple of eight
+    """
+    padding = -position % 8
+    f.write(b"\x00" * padding)
+    return position + padding
+
+
+def write_snapshot(
+    graph: Graph = None,
+    filename: str = None,
+    block_size: int = 2**6,
+    level: int = 6,
+) -> None:
+    """
+    Function to write a graph to a read-only snapshot file that is opened with
+    a SnapshotStore
+
+    The triples of the graph are read in one pass. The terms are sorted and
+    stored in blocks of block_size terms that are compressed with zlib. The
+    triples are stored as three sorted arrays of term ids (in SPO, POS and OSP
+    order) that are memory mapped when the snapshot is opened.
+
+    :param graph: the graph (e.g. a NifGraph or a NifVectorGraph)
+
+    :param filename: the filename of the snapshot
+
+    :param block_size: the number of terms in a compressed block
+
+    :param level: the zlib compression level
+
+    """
+    index = dict()
+    ids = array("q")
+    for triple in graph:
+        for term in triple:
+            ids.append(index.setdefault(term, len(index)))
+    keys = [term_key(term) for term in index.keys()]
+    num_terms = len(keys)
+    del index
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    ranks = np.empty(len(keys), dtype=np.int64)
+    ranks[order] = np.arange(len(keys))
+    dtype = np.dtype("<u4") if len(keys) < 2**32 else np.dtype("<u8")
+    triples = ranks[np.frombuffer(ids, dtype=np.int64)].reshape(-1, 3).astype(dtype)
+    del ids, ranks
+    logging.info(
+        ".. Writing snapshot with "
+        + str(len(keys))
+        + " terms and "
+        + str(len(triples))
+        + " triples"
+    )
+    with open(filename, "wb") as f:
+        f.write(MAGIC)
+        position = len(MAGIC)
+        offsets = [position]
+        for start in range(0, len(order), block_size):
+            block = [keys[i] for i in order[start : start + block_size]]
+            data = zlib.compress(json.dumps(block).encode("utf-8"), level)
+            f.write(data)
+            position += len(data)
+            offsets.append(position)
+        del keys, order
+        position = _pad(f, position)
+        footer = {
+            "version": VERSION,
+            "identifier": str(graph.identifier),
+            "namespaces": [[prefix, str(uri)] for prefix, uri in graph.namespaces()],
+            "num_terms": num_terms,
+            "block_size": block_size,
+            "dtype": dtype.str,
+            "blocks": [position, len(offsets)],
+        }
+        np.asarray(offsets, dtype="<u8").tofile(f)
+        position += 8 * len(offsets)
+        for name, columns in INDEXES.items():
+            rows = triples[:, columns]
+            rows = rows[np.lexsort(rows.T[::-1])]
+            if name == "spo":
+                # remove duplicate triples
+                unique = np.ones(len(rows), dtype=bool)
+                unique[1:] = np.any(rows[1:] != rows[:-1], axis=1)
+                triples = rows = rows[unique]
+                footer["num_triples"] = len(rows)
+            footer[name] = position
+            np.ascontiguousarray(rows).tofile(f)
+            position += rows.nbytes
+        data = json.dumps(footer).encode("utf-8")
+        f.write(data)
+        f.write(np.uint64(position).tobytes())
+        f.write(MAGIC)
+
+
+class SnapshotStore(Store):
+    """
+    A read-only rdflib Store of a snapshot file written with write_snapshot
+
+    The file is memory mapped, so opening a snapshot only reads its footer and
+    processes that open the same snapshot share its pages. Triple patterns are
+    looked up with binary search in the sorted triple arrays and only the
+    dictionary blocks of the terms that are used are decompressed.
+
+    The store is used with the store argument of a graph, for example
+    `NifGraph(store=SnapshotStore("nif.snapshot"))`.
+
+    :param configuration: the filename of the snapshot
+
+    :param identifier: the identifier of the store
+
+    :param cache_size: the maximum number of decompressed blocks and terms that
+        are cached
+
+    :param chunk_size: the number of triples that is decoded at once
+
+    """
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(
+        self,
+        configuration: str = None,
+        identifier: Optional[Node] = None,
+        cache_size: int = 2**12,
+        chunk_size: int = 2**12,
+    ):
+        super(SnapshotStore, self).__init__(configuration=None, identifier=identifier)
+        self.identifier = identifier
+        self.cache_size = cache_size
+        self.chunk_size = chunk_size
+        self._mmap = None
+        self._blocks = dict()
+        self._ids = dict()
+        if configuration is not None:
+            self.open(configuration)
+
+    def open(self, configuration: str = None, create: bool = False) -> int:
+        """
+        Open a snapshot file
+
+        :param configuration: the filename of the snapshot
+
+        :param create: not used, a snapshot is created with write_snapshot
+
+        :return: VALID_STORE
+
+        """
+        with open(configuration, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mmap
+        if mm[: len(MAGIC)] != MAGIC or mm[-len(MAGIC) :] != MAGIC:
+            raise ValueError(configuration + " is not a snapshot file")
+        end = len(mm) - len(MAGIC) - 8
+        start = int(np.frombuffer(mm, dtype="<u8", count=1, offset=end)[0])
+        footer = json.loads(mm[start:end].decode("utf-8"))
+        if footer["version"] != VERSION:
+            raise ValueError("unsupported snapshot version " + str(footer["version"]))
+        self.configuration = configuration
+        self.footer = footer
+        self._namespaces = {prefix: URIRef(uri) for prefix, uri in footer["namespaces"]}
+        self._offsets = np.frombuffer(
+            mm, dtype="<u8", count=footer["blocks"][1], offset=footer["blocks"][0]
+        )
+        self._triples = {
+            name: np.frombuffer(
+                mm,
+                dtype=footer["dtype"],
+                count=3 * footer["num_triples"],
+                offset=footer[name],
+            ).reshape(-1, 3)
+            for name in INDEXES.keys()
+        }
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction: bool = False) -> None:
+        self._triples = dict()
+        self._offsets = None
+        self._blocks.clear()
+        self._ids.clear()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # arrays of the snapshot are still used (for example by a triples
+                # generator), the file is unmapped when they are deleted
+                logging.warning(
+                    ".. Snapshot "
+                    + str(self.configuration)
+                    + " is closed while arrays of it are used"
+                )
+            self._mmap = None
+
+    def _block(self, block: int = None) -> list:
+        """
+        Function that returns the decompressed terms of a dictionary block
+        """
+        keys = self._blocks.get(block)
+        if keys is None:
+            start, end = int(self._offsets[block]), int(self._offsets[block + 1])
+            keys = [
+                tuple(key) for key in json.loads(zlib.decompress(self._mmap[start:end]))
+            ]
+            if len(self._blocks) >= self.cache_size:
+                self._blocks.clear()
+            self._blocks[block] = keys
+        return keys
+
+    def _term(self, term_id: int = None) -> Node:
+        block, position = divmod(term_id, self.footer["block_size"])
+        return make_term(*self._block(block)[position])
+
+    def _term_id(self, term: Node = None) -> Optional[int]:
+        """
+        Function that returns the id of a term (None if the term is not in the
+        snapshot) with binary search over the blocks
+        """
+        term_id = self._ids.get(term)
+        if term_id is None:
+            key = term_key(term)
+            if len(self._offsets) < 2:
+                return None
+            lo, hi = 0, len(self._offsets) - 2
+            # find the last block of which the first term is not larger than key
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if self._block(mid)[0] <= key:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            keys = self._block(lo)
+            position = bisect_right(keys, key) - 1
+            if position < 0 or keys[position] != key:
+                return None
+            term_id = lo * self.footer["block_size"] + position
+            if len(self._ids) >= self.cache_size:
+                self._ids.clear()
+            self._ids[term] = term_id
+        return term_id
+
+    def triples(self, triple_pattern: tuple = None, context=None):
+        ids = []
+        for term in triple_pattern:
+            term_id = None if term is None else self._term_id(term)
+            if term is not None and term_id is None:
+                return
+            ids.append(term_id)
+        s, p, o = ids
+        if s is not None:
+            name = "osp" if p is None and o is not None else "spo"
+        elif p is not None:
+            name = "pos"
+        elif o is not None:
+            name = "osp"
+        else:
+            name = "spo"
+        columns = INDEXES[name]
+        rows = self._triples[name]
+        lo, hi = 0, len(rows)
+        for column in columns:
+            if ids[column] is None:
+                break
+            values = rows[lo:hi, columns.index(column)]
+            lo, hi = (
+                lo + int(np.searchsorted(values, ids[column], side="left")),
+                lo + int(np.searchsorted(values, ids[column], side="right")),
+            )
+        contexts = (context,) if context is not None else ()
+        terms = dict()
+        for start in range(lo, hi, self.chunk_size):
+            for row in rows[start : min(start + self.chunk_size, hi)].tolist():
+                triple = [None, None, None]
+                for column, term_id in zip(columns, row):
+                    term = terms.get(term_id)
+                    if term is None:
+                        term = triple_pattern[column]
+                        if term is None:
+                            term = self._term(term_id)
+                        if len(terms) < self.cache_size:
+                            terms[term_id] = term
+                    triple[column] = term
+                yield tuple(triple), iter(contexts)
+
+    def __len__(self, context=None) -> int:
+        return self.footer["num_triples"] if self._mmap is not None else 0
+
+    def contexts(self, triple: tuple = None):
+        return iter(())
+
+    def add(self, triple: tuple = None, context=None, quoted: bool = False) -> None:
+        raise ModificationException()
+
+    def addN(self, quads=None) -> None:
+        raise ModificationException()
+
+    def remove(self, triple_pattern: tuple = None, context=None) -> None:
+        raise ModificationException()
+
+    def bind(self, prefix: str = None, namespace: URIRef = None, override: bool = True):
+        # the namespaces of the snapshot are only changed in this process
+        if override or (
+            prefix not in self._namespaces
+            and namespace not in self._namespaces.values()
+        ):
+            for bound_prefix, bound_namespace in list(self._namespaces.items()):
+                if bound_namespace == namespace:
+                    del self._namespaces[bound_prefix]
+            self._namespaces[prefix] = URIRef(namespace)
+
+    def namespace(self, prefix: str = None) -> Optional[URIRef]:
+        return self._namespaces.get(prefix)
+
+    def prefix(self, namespace: URIRef = None) -> Optional[str]:
+        for prefix, bound_namespace in self._namespaces.items():
+            if bound_namespace == namespace:
+                return prefix
+        return None
+
+    def namespaces(self):
+        for prefix, namespace in list(self._namespaces.items()):
+            yield prefix, namespace
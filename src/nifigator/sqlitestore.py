@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import sqlite3
+from typing import Optional
+
+from rdflib import Graph
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+from rdflib.store import Store, VALID_STORE, NO_STORE
+from rdflib.term import Node, URIRef
+
+from .utils import term_key, make_term
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    datatype TEXT NOT NULL,
+    lang TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS terms_key ON terms (value, type, datatype, lang);
+CREATE TABLE IF NOT EXISTS quads (
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    c INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o, c)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS quads_pos ON quads (p, o, s);
+CREATE INDEX IF NOT EXISTS quads_osp ON quads (o, s, p);
+CREATE INDEX IF NOT EXISTS quads_c ON quads (c);
+CREATE TABLE IF NOT EXISTS graphs (c INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    uri TEXT NOT NULL UNIQUE
+);
+"""
+
+COLUMNS = ("s", "p", "o")
+
+
+class SQLiteStore(Store):
+    """
+    A persistent rdflib Store in an SQLite database file
+
+    Terms are stored once in a terms table and the quads are stored as term ids
+    with SPO, POS and OSP indexes, so a graph that is reopened does not have to
+    be parsed again and results are read from disk instead of kept in memory.
+
+    The store is used with the store argument of a graph, for example
+    `NifGraph(store=SQLiteStore("nif.db"), identifier="https://mangosaurus.eu/rdf-data/")`.
+    The same identifier is needed to reopen the graph, because the triples of
+    a graph are stored in the context of its identifier. The triples that are
+    added with add are committed in batches, the last batch is committed by
+    commit() or close().
+
+    :param configuration: the filename of the SQLite database (created if it does
+        not exist)
+
+    :param identifier: the identifier of the store
+
+    :param batch_size: the number of quads that is written at once by addN, the
+        triples added with add are committed in batches of this size
+
+    :param cache_size: the maximum number of terms of which the id is cached
+
+    """
+
+    context_aware = True
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = True
+
+    def __init__(
+        self,
+        configuration: str = None,
+        identifier: Optional[Node] = None,
+        batch_size: int = 2**14,
+        cache_size: int = 2**16,
+    ):
+        super(SQLiteStore, self).__init__(configuration=None, identifier=identifier)
+        self.identifier = identifier
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._db = None
+        self._pending = 0
+        self._ids = dict()
+        self._terms = dict()
+        if configuration is not None:
+            self.open(configuration, create=True)
+
+    def open(self, configuration: str = None, create: bool = False) -> int:
+        """
+        Open the SQLite database
+
+        :param configuration: the filename of the SQLite database
+
+        :param create: create the database if it does not exist
+
+        :return: VALID_STORE if the database is opened, otherwise NO_STORE
+
+        """
+        if (
+            not create
+            and configuration != ":memory:"
+            and not os.path.exists(configuration)
+        ):
+            return NO_STORE
+        self._db = sqlite3.connect(configuration)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self.configuration = configuration
+        logging.info(".. Opened SQLite store " + str(configuration))
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction: bool = False) -> None:
+        if self._db is not None:
+            # the store is not transaction aware, so the pending triples are kept
+            self.commit()
+            self._db.close()
+            self._db = None
+        self._ids.clear()
+        self._terms.clear()
+
+    def destroy(self, configuration: str = None) -> None:
+        configuration = configuration or self.configuration
+        self.close()
+        for suffix in ["", "-wal", "-shm"]:
+            if os.path.exists(configuration + suffix):
+                os.remove(configuration + suffix)
+
+    def commit(self) -> None:
+        self._db.commit()
+        self._pending = 0
+
+    def rollback(self) -> None:
+        self._db.rollback()
+        self._pending = 0
+
+    def _term_id(self, term: Node = None, create: bool = False) -> Optional[int]:
+        """
+        Function that returns the id of a term (None if the term is not stored)
+
+        :param term: the term
+
+        :param create: add the term to the terms table if it is not stored
+
+        """
+        key = term_key(term)
+        term_id = self._ids.get(key)
+        if term_id is None:
+            if create:
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO terms (value, type, datatype, lang) "
+                    "VALUES (?, ?, ?, ?)",
+                    key,
+                )
+                if cursor.rowcount == 1:
+                    term_id = cursor.lastrowid
+            if term_id is None:
+                row = self._db.execute(
+                    "SELECT id FROM terms "
+                    "WHERE value = ? AND type = ? AND datatype = ? AND lang = ?",
+                    key,
+                ).fetchone()
+                if row is None:
+                    return None
+                term_id = row[0]
+            if len(self._ids) >= self.cache_size:
+                self._ids.clear()
+            self._ids[key] = term_id
+        return term_id
+
+    def _term(self, term_id: int = None, row: tuple = None) -> Node:
+        """
+        Function that returns the term of an id (with the row of the term if known)
+        """
+        term = self._terms.get(term_id)
+        if term is None:
+            if row is None:
+                row = self._db.execute(
+                    "SELECT value, type, datatype, lang FROM terms WHERE id = ?",
+                    (term_id,),
+                ).fetchone()
+            term = make_term(*row)
+            if len(self._terms) >= self.cache_size:
+                self._terms.clear()
+            self._terms[term_id] = term
+        return term
+
+    def _context_id(self, context=None, create: bool = False) -> Optional[int]:
+        identifier = getattr(context, "identifier", context)
+        if identifier is None:
+            identifier = DATASET_DEFAULT_GRAPH_ID
+        return self._term_id(identifier, create=create)
+
+    def _context(self, context_id: int = None) -> Graph:
+        return Graph(store=self, identifier=self._term(context_id))
+
+    def _conditions(self, triple_pattern: tuple = None, context=None):
+        """
+        Function that returns the where clause and the parameters of a triple
+        pattern in a context, or None if a term of the pattern is not stored
+        """
+        conditions, params = [], []
+        for column, term in zip(COLUMNS, triple_pattern):
+            if term is not None:
+                term_id = self._term_id(term)
+                if term_id is None:
+                    return None
+                conditions.append("q." + column + " = ?")
+                params.append(term_id)
+        if context is not None:
+            context_id = self._context_id(context)
+            if context_id is None:
+                return None
+            conditions.append("q.c = ?")
+            params.append(context_id)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return where, params
+
+    def add(self, triple: tuple = None, context=None, quoted: bool = False) -> None:
+        Store.add(self, triple, context, quoted)
+        self._insert([(*triple, context)])
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.commit()
+
+    def addN(self, quads=None) -> None:
+        self._insert(quads)
+        self.commit()
+
+    def _insert(self, quads=None) -> None:
+        """
+        Function that writes quads to the database without committing them
+        """
+        batch, contexts = [], set()
+        for s, p, o, c in quads:
+            context_id = self._context_id(c, create=True)
+            contexts.add(context_id)
+            batch.append(
+                (
+                    self._term_id(s, create=True),
+                    self._term_id(p, create=True),
+                    self._term_id(o, create=True),
+                    context_id,
+                )
+            )
+            if len(batch) == self.batch_size:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO quads VALUES (?, ?, ?, ?)", batch
+                )
+                batch = []
+        if batch:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO quads VALUES (?, ?, ?, ?)", batch
+            )
+        self._db.executemany(
+            "INSERT OR IGNORE INTO graphs VALUES (?)", ((c,) for c in contexts)
+        )
+
+    def remove(self, triple_pattern: tuple = None, context=None) -> None:
+        conditions = self._conditions(triple_pattern, context)
+        if conditions is not None:
+            where, params = conditions
+            self._db.execute("DELETE FROM quads AS q" + where, params)
+            self.commit()
+
+    def triples(self, triple_pattern: tuple = None, context=None):
+        conditions = self._conditions(triple_pattern, context)
+        if conditions is None:
+            return
+        where, params = conditions
+        # the rows of the terms that are not in the pattern are joined
+        unbound = [i for i, term in enumerate(triple_pattern) if term is None]
+        terms = "".join(
+            ", t{0}.value, t{0}.type, t{0}.datatype, t{0}.lang".format(i)
+            for i in unbound
+        )
+        joins = "".join(
+            " JOIN terms AS t{0} ON t{0}.id = q.{1}".format(i, COLUMNS[i])
+            for i in unbound
+        )
+        if context is None:
+            # the contexts of a triple are read in the same query
+            sql = (
+                "SELECT q.s, q.p, q.o, GROUP_CONCAT(q.c)"
+                + terms
+                + " FROM quads AS q"
+                + joins
+                + where
+                + " GROUP BY q.s, q.p, q.o"
+            )
+        else:
+            sql = (
+                "SELECT q.s, q.p, q.o, q.c" + terms + " FROM quads AS q" + joins + where
+            )
+        for row in self._db.execute(sql, params):
+            triple = list(triple_pattern)
+            for j, i in enumerate(unbound):
+                triple[i] = self._term(row[i], row[4 + 4 * j : 8 + 4 * j])
+            if context is None:
+                yield tuple(triple), self._triple_contexts(row[3])
+            else:
+                yield tuple(triple), iter((context,))
+
+    def _triple_contexts(self, context_ids: str = None):
+        """
+        Generator of the contexts of the comma separated ids of GROUP_CONCAT
+        """
+        for context_id in context_ids.split(","):
+            yield self._context(int(context_id))
+
+    def __len__(self, context=None) -> int:
+        if context is None:
+            sql, params = (
+                "SELECT COUNT(*) FROM (SELECT DISTINCT s, p, o FROM quads)",
+                [],
+            )
+        else:
+            context_id = self._context_id(context)
+            if context_id is None:
+                return 0
+            sql, params = "SELECT COUNT(*) FROM quads WHERE c = ?", [context_id]
+        return self._db.execute(sql, params).fetchone()[0]
+
+    def contexts(self, triple: tuple = None):
+        if triple is None:
+            rows = self._db.execute("SELECT c FROM graphs").fetchall()
+        else:
+            conditions = self._conditions(triple)
+            if conditions is None:
+                return
+            where, params = conditions
+            rows = self._db.execute(
+                "SELECT DISTINCT q.c FROM quads AS q" + where, params
+            ).fetchall()
+        for (context_id,) in rows:
+            yield self._context(context_id)
+
+    def add_graph(self, graph: Graph = None) -> None:
+        self._db.execute(
+            "INSERT OR IGNORE INTO graphs VALUES (?)",
+            (self._context_id(graph, create=True),),
+        )
+        self.commit()
+
+    def remove_graph(self, graph: Graph = None) -> None:
+        context_id = self._context_id(graph)
+        if context_id is not None:
+            self._db.execute("DELETE FROM quads WHERE c = ?", (context_id,))
+            self._db.execute("DELETE FROM graphs WHERE c = ?", (context_id,))
+            self.commit()
+
+    def bind(self, prefix: str = None, namespace: URIRef = None, override: bool = True):
+        if override:
+            self._db.execute(
+                "DELETE FROM namespaces WHERE prefix = ? OR uri = ?",
+                (prefix, str(namespace)),
+            )
+        self._db.execute(
+            "INSERT OR IGNORE INTO namespaces VALUES (?, ?)", (prefix, str(namespace))
+        )
+        self.commit()
+
+    def namespace(self, prefix: str = None) -> Optional[URIRef]:
+        row = self._db.execute(
+            "SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)
+        ).fetchone()
+        return URIRef(row[0]) if row is not None else None
+
+    def prefix(self, namespace: URIRef = None) -> Optional[str]:
+        row = self._db.execute(
+            "SELECT prefix FROM namespaces WHERE uri = ?", (str(namespace),)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def namespaces(self):
+        for prefix, uri in self._db.execute(
+            "SELECT prefix, uri FROM namespaces"
+        ).fetchall():
+            yield prefix, URIRef(uri)
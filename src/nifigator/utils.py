@@ -1,18 +1,55 @@
 # -*- coding: utf-8 -*-
 
 import datetime
+import hashlib
 import logging
+import multiprocessing
+import os
+import pickle
 import re
+import tempfile
 import uuid
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from io import StringIO
+from queue import Empty
 
 import unidecode
 from lxml import etree
 from rdflib.namespace import XSD
-from rdflib.term import Literal
+from rdflib.term import BNode, Literal, Node, URIRef
 import syntok.segmenter as segmenter
 
 
+def term_key(term: Node = None) -> tuple:
+    """
+    Function that returns the key (value, type, datatype, lang) of a term with
+    which the term is stored by the SQLiteStore and the SnapshotStore
+    """
+    if isinstance(term, Literal):
+        return str(term), "L", str(term.datatype or ""), term.language or ""
+    elif isinstance(term, BNode):
+        return str(term), "B", "", ""
+    elif isinstance(term, URIRef):
+        return str(term), "U", "", ""
+    raise ValueError("cannot store term " + repr(term))
+
+
+def make_term(
+    value: str = None, type: str = None, datatype: str = None, lang: str = None
+) -> Node:
+    """
+    Function that creates a term from its key (see term_key)
+    """
+    if type == "U":
+        return URIRef(value)
+    elif type == "B":
+        return BNode(value)
+    return Literal(value, lang=lang or None, datatype=datatype or None)
+
+
 def to_iri(s: str = ""):
     return (
         s.replace('"', "%22")
@@ -27,25 +64,459 @@ def to_iri(s: str = ""):
 
 def tokenize_text(text: list = None, forced_sentence_split_characters: list = []):
     """ """
-    tokenized_text = tokenizer(text)
-    tokenized_new = []
-    for sentence in tokenized_text:
-        tok_sent = []
-        for token in sentence:
-            if token["text"] in forced_sentence_split_characters:
-                if tok_sent != []:
-                    tokenized_new.append(tok_sent)
-                tok_sent = []
-            tok_sent.append(token)
-        tokenized_new.append(tok_sent)
-    tokenized_text = tokenized_new
+    return [
+        [
+            {"text": text[start:end], "start_char": start, "end_char": end}
+            for start, end in zip(sentence.starts, sentence.ends)
+        ]
+        for sentence in tokenize_offsets(text, forced_sentence_split_characters)
+    ]
+
+
+class TokenizedSentence:
+    """
+    A tokenized sentence that stores the start and end offsets of its tokens in arrays,
+    the text of the tokens is only taken from the source text when it is needed
+
+    :param text: the source text of the sentence
+
+    :param starts: array with the start offset of each token
+
+    :param ends: array with the end offset of each token
+
+    """
+
+    __slots__ = ("text", "starts", "ends")
+
+    def __init__(self, text: str = None, starts: array = None, ends: array = None):
+        """ """
+        self.text = text
+        self.starts = starts if starts is not None else array("q")
+        self.ends = ends if ends is not None else array("q")
+
+    @property
+    def start_char(self) -> int:
+        """
+        The start offset of the sentence
+        """
+        return self.starts[0]
+
+    @property
+    def end_char(self) -> int:
+        """
+        The end offset of the sentence
+        """
+        return self.ends[-1]
+
+    def token(self, idx: int = None) -> str:
+        """
+        Function to get the text of a token
+
+        :param idx: the index of the token
+
+        """
+        return self.text[self.starts[idx] : self.ends[idx]]
+
+    def tokens(self) -> list:
+        """
+        Function to get the texts of all tokens
+        """
+        text = self.text
+        return [text[start:end] for start, end in zip(self.starts, self.ends)]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, idx: int = None) -> dict:
+        return {
+            "text": self.token(idx),
+            "start_char": self.starts[idx],
+            "end_char": self.ends[idx],
+        }
+
+    def __iter__(self):
+        for idx in range(len(self.starts)):
+            yield self[idx]
+
+    def __repr__(self) -> str:
+        return "TokenizedSentence(" + repr(self.tokens()) + ")"
+
+
+def _syntok_offsets(text: str = None):
+    """
+    Generator of the start and end offsets of the tokens of each sentence by syntok
+    """
+    for paragraph in segmenter.analyze(text):
+        for sentence in paragraph:
+            starts, ends = array("q"), array("q")
+            for token in sentence:
+                if not text.startswith(token.value, token.offset):
+                    logging.error("Error: incorrect offsets in syntok.segmenter.")
+                else:
+                    starts.append(token.offset)
+                    ends.append(token.offset + len(token.value))
+            yield starts, ends
+
+
+def tokenize_offsets(text: str = None, forced_sentence_split_characters: list = []):
+    """
+    Function to tokenize a text into sentences with the offsets of their tokens
+
+    The sentences are the same as those of tokenize_text but they only store the
+    offsets of the tokens (see TokenizedSentence).
+
+    :param text: the text to be tokenized
+
+    :param forced_sentence_split_characters: tokens at which a new sentence is started
+
+    """
+    split_characters = set(forced_sentence_split_characters)
+    sentences = []
+    for starts, ends in _syntok_offsets(text):
+        if split_characters:
+            begin = 0
+            for idx in range(len(starts)):
+                if idx > begin and text[starts[idx] : ends[idx]] in split_characters:
+                    sentences.append(
+                        TokenizedSentence(text, starts[begin:idx], ends[begin:idx])
+                    )
+                    begin = idx
+            starts, ends = starts[begin:], ends[begin:]
+        sentences.append(TokenizedSentence(text, starts, ends))
     # delete empty tokens
-    if tokenized_text != []:
-        tokenized_text = [
-            sentence if sentence[-1]["text"] != "" else sentence[:-1]
-            for sentence in tokenized_text
+    for sentence in sentences:
+        if len(sentence) > 0 and sentence.starts[-1] == sentence.ends[-1]:
+            del sentence.starts[-1]
+            del sentence.ends[-1]
+    return sentences
+
+
+# the shared argument of the function of parallel_map in a worker process (set by
+# the pool initializer, so it is never set in the process that calls parallel_map)
+_worker_shared = None
+
+
+def _set_worker_shared(shared=None, initializer=None, initargs: tuple = ()) -> None:
+    global _worker_shared
+    _worker_shared = shared
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _call_shared(function=None, item=None):
+    return function(_worker_shared, item)
+
+
+def parallel_map(
+    function=None,
+    iterable=None,
+    workers: int = None,
+    chunksize: int = 1,
+    initializer=None,
+    initargs: tuple = (),
+    shared=None,
+):
+    """
+    Generator that applies a function to the items of an iterable in a pool of worker
+    processes and yields the results in the order of the items
+
+    :param function: the function to apply (must be picklable, i.e. defined at module level)
+
+    :param iterable: the items to which the function is applied
+
+    :param workers: the number of worker processes, if None or 1 then the function is
+        applied in the current process
+
+    :param chunksize: the number of items that are sent to a worker at once
+
+    :param initializer: function that is called at the start of each worker process
+
+    :param initargs: the arguments of the initializer
+
+    :param shared: if not None then the function is called with shared and the item,
+        shared is sent once to each worker process instead of with every item
+
+    """
+    if shared is not None:
+        if workers is None or workers <= 1:
+            function = partial(function, shared)
+        else:
+            function = partial(_call_shared, function)
+            initializer, initargs = _set_worker_shared, (shared, initializer, initargs)
+    if workers is None or workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in iterable:
+            yield function(item)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=initializer, initargs=initargs
+        ) as executor:
+            for result in executor.map(function, iterable, chunksize=chunksize):
+                yield result
+
+
+# the queue to which the worker processes of parallel_batches send their batches
+_batch_queue = None
+
+
+def _set_batch_queue(queue=None) -> None:
+    global _batch_queue
+    _batch_queue = queue
+
+
+def _put_batches(function=None, item=None) -> None:
+    try:
+        for batch in function(item):
+            _batch_queue.put(batch)
+    finally:
+        # None signals that all batches of the item are sent
+        _batch_queue.put(None)
+
+
+def parallel_batches(
+    function=None,
+    iterable=None,
+    workers: int = None,
+    maxsize: int = 2**4,
+):
+    """
+    Generator that yields the batches that a generator function produces for the items
+    of an iterable, where the items are processed in a pool of worker processes that
+    send their batches through a bounded queue (so the batches of different items
+    may be interleaved)
+
+    :param function: generator function that yields the batches of an item (must be
+        picklable, i.e. defined at module level)
+
+    :param iterable: the items to which the function is applied
+
+    :param workers: the number of worker processes, if None or 1 then the function is
+        applied in the current process
+
+    :param maxsize: the maximum number of batches in the queue
+
+    """
+    if workers is None or workers <= 1:
+        for item in iterable:
+            for batch in function(item):
+                yield batch
+    else:
+        queue = multiprocessing.Queue(maxsize=maxsize)
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_set_batch_queue, initargs=(queue,)
+        ) as executor:
+            futures = [
+                executor.submit(_put_batches, function, item) for item in iterable
+            ]
+            try:
+                done = 0
+                while done < len(futures):
+                    try:
+                        batch = queue.get(timeout=1)
+                    except Empty:
+                        # a worker process that is terminated does not signal
+                        for future in futures:
+                            if future.done() and future.exception() is not None:
+                                raise future.exception()
+                        continue
+                    if batch is None:
+                        done += 1
+                    else:
+                        yield batch
+                for future in futures:
+                    future.result()
+            finally:
+                # unblock the workers if the batches are not all consumed
+                for future in futures:
+                    future.cancel()
+                while not all(future.done() for future in futures):
+                    try:
+                        queue.get(timeout=0.1)
+                    except Empty:
+                        pass
+
+
+class ContentCache:
+    """
+    A bounded least recently used cache with keys derived from a hash of the content
+
+    The files of the cache on disk have the prefix FILE_PREFIX, only these files are
+    read and deleted by the cache. A file is written to a temporary file first and
+    then renamed, so an interrupted write does not leave a truncated item. If there
+    are more than maxfiles files then the least recently used files are deleted.
+
+    :param maxsize: the maximum number of items that are kept in memory
+
+    :param path: the directory in which all items are stored (optional), items that are
+        evicted from memory are read again from this directory
+
+    :param maxfiles: the maximum number of items that are kept on disk
+
+    """
+
+    FILE_PREFIX = "nifigator-cache-"
+
+    def __init__(
+        self, maxsize: int = 2**12, path: str = None, maxfiles: int = 2**16
+    ) -> None:
+        """ """
+        self.maxsize = maxsize
+        self.path = path
+        self.maxfiles = maxfiles
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._num_files = 0
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+            self._num_files = len(self._files())
+
+    @staticmethod
+    def key(*content) -> str:
+        """
+        Function to derive the key of the content (strings, numbers, lists and dicts)
+
+        :param content: the content from which the key is derived
+
+        """
+        return hashlib.blake2b(
+            _content_repr(content).encode("utf-8"), digest_size=16
+        ).hexdigest()
+
+    def _filename(self, key: str = None) -> str:
+        return os.path.join(self.path, self.FILE_PREFIX + key + ".pickle")
+
+    def _files(self, suffix: str = ".pickle") -> list:
+        """
+        Function that returns the files of the cache on disk
+        """
+        return [
+            os.path.join(self.path, filename)
+            for filename in os.listdir(self.path)
+            if filename.startswith(self.FILE_PREFIX) and filename.endswith(suffix)
         ]
-    return tokenized_text
+
+    def get(self, key: str = None, default=None):
+        """
+        Function to get the item of a key, returns default if the key is not in the cache
+
+        :param key: the key of the item
+
+        :param default: the value that is returned if the key is not in the cache
+
+        """
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+        if self.path is not None:
+            filename = self._filename(key)
+            try:
+                with open(filename, "rb") as f:
+                    value = pickle.load(f)
+                # the modification time is the time of the last use
+                os.utime(filename)
+            except FileNotFoundError:
+                pass
+            except (EOFError, pickle.UnpicklingError) as e:
+                logging.warning(".. Cache file " + filename + " is not read: " + str(e))
+            else:
+                self._store(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    def put(self, key: str = None, value=None) -> None:
+        """
+        Function to add an item to the cache
+
+        :param key: the key of the item
+
+        :param value: the item (must be picklable if the cache has a path)
+
+        """
+        self._store(key, value)
+        if self.path is not None:
+            filename = self._filename(key)
+            exists = os.path.exists(filename)
+            fd, temporary = tempfile.mkstemp(
+                dir=self.path, prefix=self.FILE_PREFIX, suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(value, f)
+                os.replace(temporary, filename)
+            except BaseException:
+                os.remove(temporary)
+                raise
+            if not exists:
+                self._num_files += 1
+                if self._num_files > self.maxfiles:
+                    self._evict_files()
+
+    def _evict_files(self) -> None:
+        """
+        Function to delete the least recently used quarter of the files on disk
+        """
+        files = []
+        for filename in self._files():
+            try:
+                files.append((os.path.getmtime(filename), filename))
+            except FileNotFoundError:
+                pass
+        files.sort()
+        keep = self.maxfiles - self.maxfiles // 4
+        for _, filename in files[: max(len(files) - keep, 0)]:
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+        self._num_files = min(len(files), keep)
+
+    def _store(self, key: str = None, value=None) -> None:
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Function to delete all items from the cache (in memory and the files of the
+        cache on disk)
+        """
+        self._items.clear()
+        if self.path is not None:
+            for filename in self._files() + self._files(".tmp"):
+                try:
+                    os.remove(filename)
+                except FileNotFoundError:
+                    pass
+            self._num_files = 0
+
+    def __contains__(self, key: str = None) -> bool:
+        if key in self._items:
+            return True
+        return self.path is not None and os.path.exists(self._filename(key))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def _content_repr(content=None) -> str:
+    """
+    Function that returns a representation of the content that does not depend on the
+    order of the keys of dicts and the elements of sets
+    """
+    if isinstance(content, dict):
+        items = sorted((_content_repr(k), _content_repr(v)) for k, v in content.items())
+        return "{" + ",".join(k + ":" + v for k, v in items) + "}"
+    if isinstance(content, (set, frozenset)):
+        return "{" + ",".join(sorted(_content_repr(item) for item in content)) + "}"
+    if isinstance(content, (list, tuple)):
+        return "[" + ",".join(_content_repr(item) for item in content) + "]"
+    return repr(content)
 
 
 def replace_escape_characters(text: str = None):
@@ -78,24 +549,13 @@ def tokenizer(text: str = None):
     :param text: the text to be tokenized
 
     """
-    sentences = list()
-    for paragraph in segmenter.analyze(text):
-        for sentence in paragraph:
-            words = list()
-            for token in sentence:
-                value = text[token.offset : token.offset + len(token.value)]
-                if value != token.value:
-                    logging.error("Error: incorrect offsets in syntok.segmenter.")
-                else:
-                    words.append(
-                        {
-                            "text": token.value,
-                            "start_char": token.offset,
-                            "end_char": token.offset + len(token.value),
-                        }
-                    )
-            sentences.append(words)
-    return sentences
+    return [
+        [
+            {"text": text[start:end], "start_char": start, "end_char": end}
+            for start, end in zip(starts, ends)
+        ]
+        for starts, ends in _syntok_offsets(text)
+    ]
 
 
 def align_stanza_dict_offsets(stanza_dict: list = None, sentences: list = None):
@@ -104,7 +564,7 @@ def align_stanza_dict_offsets(stanza_dict: list = None, sentences: list = None):
 
     :param stanza_dict: the output dict from the Stanza pipeline
 
-    :param sentences: the output of the tokenizer
+    :param sentences: the output of the tokenizer or tokenize_offsets
 
     """
     # check alignment of stanza_dict and tokenized_document
@@ -113,10 +573,15 @@ def align_stanza_dict_offsets(stanza_dict: list = None, sentences: list = None):
         assert len(stanza_dict[sent_idx]) == len(sentences[sent_idx])
 
     # correct stanza_dict start_char and end_char
-    for sent_idx, sent in enumerate(stanza_dict):
-        for word_idx, word in enumerate(sent):
-            word["start_char"] = sentences[sent_idx][word_idx]["start_char"]
-            word["end_char"] = sentences[sent_idx][word_idx]["end_char"]
+    for sent, sentence in zip(stanza_dict, sentences):
+        if isinstance(sentence, TokenizedSentence):
+            for word, start, end in zip(sent, sentence.starts, sentence.ends):
+                word["start_char"] = start
+                word["end_char"] = end
+        else:
+            for word, token in zip(sent, sentence):
+                word["start_char"] = token["start_char"]
+                word["end_char"] = token["end_char"]
 
     return stanza_dict
 
@@ -0,0 +1,52 @@
+from collections import Counter
+from fractions import Fraction
+
+import nifigator
+
+
+def test_indices():
+    c1 = Counter({"a": 2, "b": 1, "c": 1})
+    c2 = Counter({"b": 3, "c": 1, "d": 1})
+    assert nifigator.jaccard_index(c1, c2) == Fraction(2, 4)
+    assert nifigator.jaccard_index(c1, c2, as_float=True) == 0.5
+    assert nifigator.containment_index(c1, c2) == Fraction(2, 3)
+    assert nifigator.weighted_jaccard_index(c1, c2) == Fraction(2, 7)
+    assert nifigator.weighted_containment_index(c1, c2) == Fraction(2, 4)
+    assert nifigator.merge_multiset({1: c1, 2: c2}) == c1 + c2
+
+
+def test_similarity_matrix():
+    A = [
+        Counter({"a": 2, "b": 1, "c": 1}),
+        Counter({"e": 1}),
+        Counter(),
+    ]
+    B = [
+        Counter({"b": 3, "c": 1, "d": 1}),
+        Counter({"a": 1, "e": 2}),
+    ]
+    metrics = {
+        "jaccard": nifigator.jaccard_index,
+        "containment": nifigator.containment_index,
+        "weighted_jaccard": nifigator.weighted_jaccard_index,
+        "weighted_containment": nifigator.weighted_containment_index,
+    }
+    for metric, function in metrics.items():
+        result = nifigator.similarity_matrix(A, B, metric=metric)
+        assert result.shape == (3, 2)
+        for i, a in enumerate(A):
+            for j, b in enumerate(B):
+                assert abs(result[i, j] - float(function(a, b))) < 1e-12
+
+        # the arguments are encoded separately
+        encoded = nifigator.encode_multisets(A)
+        assert (nifigator.similarity_matrix(encoded, B, metric=metric) == result).all()
+        assert (
+            nifigator.similarity_matrix(A, nifigator.encode_multisets(B), metric=metric)
+            == result
+        ).all()
+        rows, cols, values = nifigator.similarity_matrix(
+            A, B, metric=metric, sparse=True
+        )
+        assert (result[rows, cols] == values).all()
+        assert (values > 0).all() and len(values) == (result > 0).sum()
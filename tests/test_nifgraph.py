@@ -0,0 +1,307 @@
+from rdflib import Dataset, Literal, URIRef
+from rdflib.plugins.stores.sparqlstore import SPARQLUpdateStore
+
+import nifigator
+
+NAF = """<?xml version="1.0" encoding="utf-8"?>
+<NAF version="v3.1" xml:lang="en">
+  <nafHeader>
+    <fileDesc creationtime="2023-01-01" filename="{name}.pdf"/>
+    <public xmlns:dc="http://purl.org/dc/elements/1.1/" dc:uri="{name}.pdf"/>
+  </nafHeader>
+  <raw>The cat sat.</raw>
+  <text>
+    <wf id="w1" sent="1" para="1" page="1" offset="0" length="3">The</wf>
+    <wf id="w2" sent="1" para="1" page="1" offset="4" length="3">cat</wf>
+    <wf id="w3" sent="1" para="1" page="1" offset="8" length="3">sat</wf>
+    <wf id="w4" sent="1" para="1" page="1" offset="11" length="1">.</wf>
+  </text>
+  <terms>
+    <term id="t1" lemma="the" pos="DET"><span><target id="w1"/></span></term>
+    <term id="t2" lemma="cat" pos="NOUN"><span><target id="w2"/></span></term>
+  </terms>
+</NAF>
+"""
+
+
+def test_open_files(tmp_path):
+    files = []
+    for idx in range(3):
+        filename = str(tmp_path / ("doc_" + str(idx) + ".naf.xml"))
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(NAF.format(name="doc_" + str(idx)))
+        files.append(filename)
+    context = nifigator.NifContext(
+        uri="https://mangosaurus.eu/rdf-data/doc_3",
+        URIScheme=nifigator.OffsetBasedString,
+        isString="The dog sat.",
+    )
+    graph = nifigator.NifGraph()
+    for triple in context.triples():
+        graph.add(triple)
+    files.append(str(tmp_path / "doc_3.nt"))
+    graph.serialize(files[-1], format="nt", encoding="utf-8")
+
+    expected = set()
+    for filename in files:
+        expected |= set(
+            nifigator.NifGraph(file=filename, URIScheme=nifigator.OffsetBasedString)
+        )
+    for workers in [1, 2]:
+        g = nifigator.NifGraph(
+            files=files, URIScheme=nifigator.OffsetBasedString, workers=workers
+        )
+        assert set(g) == expected
+    g = nifigator.NifGraph(
+        files=str(tmp_path / "doc_*"), URIScheme=nifigator.OffsetBasedString
+    )
+    assert set(g) == expected
+
+
+class RemoteView(nifigator.NifView):
+    # the view fetches its pages with SPARQL queries as for a SPARQL store
+    remote = True
+
+
+def test_contexts_view():
+    graph = nifigator.NifGraph()
+    collection = nifigator.NifContextCollection(uri="https://mangosaurus.eu/rdf-data")
+    for idx in range(5):
+        collection.add_context(
+            nifigator.NifContext(
+                uri="https://mangosaurus.eu/rdf-data/doc_" + str(idx),
+                URIScheme=nifigator.OffsetBasedString,
+                isString="The cat sat.",
+            )
+        )
+    for triple in collection.triples():
+        graph.add(triple)
+    uris = sorted(c.uri for c in collection.hasContext)
+
+    contexts = graph.contexts
+    assert len(contexts) == 5
+    assert sorted(c.uri for c in contexts) == uris
+    assert [c.uri for c in contexts[1:3]] == [c.uri for c in list(contexts)[1:3]]
+    assert contexts[-1].uri == list(contexts)[-1].uri
+    assert contexts[0].isString == "The cat sat."
+    assert len(graph.collections) == 1
+    assert sorted(c.uri for c in graph.collections[0].hasContext) == uris
+
+    view = RemoteView(
+        graph, (None, nifigator.RDF.type, nifigator.NIF.Context), nifigator.NifContext
+    )
+    view.page_size = 2
+    assert len(view) == 5
+    assert [c.uri for c in view] == uris
+    assert [c.uri for c in view[1:4]] == uris[1:4]
+
+
+def test_contexts_view_pages():
+    graph = nifigator.NifGraph()
+    collection = nifigator.NifContextCollection(uri="https://mangosaurus.eu/rdf-data")
+    for idx in range(7):
+        collection.add_context(
+            nifigator.NifContext(
+                uri="https://mangosaurus.eu/rdf-data/doc_" + str(idx),
+                URIScheme=nifigator.OffsetBasedString,
+                isString="The cat sat.",
+            )
+        )
+    for triple in collection.triples():
+        graph.add(triple)
+    view = graph.contexts
+    view.page_size = 2
+    uris = [c.uri for c in view]
+    calls = []
+    local_uris = view._local_uris
+
+    def counted_local_uris():
+        calls.append(1)
+        return local_uris()
+
+    view._local_uris = counted_local_uris
+    # the pages are read in order from one iterator
+    assert [view[i].uri for i in range(len(uris))] == uris
+    assert len(calls) == 1
+    view._pages.clear()
+    assert view[0].uri == uris[0]
+    assert len(calls) == 2
+
+    # a context of the view is created once, so changes to it are kept
+    collection = graph.collections[0]
+    context = collection.contexts[3]
+    assert collection.contexts[3] is context
+    assert next(c for c in collection.hasContext if c.uri == context.uri) is context
+    context.set_Sentences(
+        [
+            nifigator.NifSentence(
+                beginIndex=0,
+                endIndex=12,
+                referenceContext=context,
+                URIScheme=nifigator.OffsetBasedString,
+                base_uri=context.uri,
+            )
+        ]
+    )
+    assert collection.contexts[3].sentences[0].anchorOf == "The cat sat."
+
+    # the contexts in the graph are kept when a context is added
+    collection.add_context(
+        nifigator.NifContext(
+            uri="https://mangosaurus.eu/rdf-data/doc_7",
+            URIScheme=nifigator.OffsetBasedString,
+            isString="The dog sat.",
+        )
+    )
+    assert len(collection.hasContext) == 8
+    collection.load_contexts()
+    assert len(collection.hasContext) == 8
+    assert any(c is context for c in collection.hasContext)
+
+
+def test_catalog():
+    graph = nifigator.NifGraph()
+    collection = nifigator.NifContextCollection(uri="https://mangosaurus.eu/rdf-data")
+    for idx in range(3):
+        context = nifigator.NifContext(
+            uri="https://mangosaurus.eu/rdf-data/doc_" + str(idx),
+            URIScheme=nifigator.OffsetBasedString,
+            isString="The cat sat.",
+        )
+        context.set_metadata({nifigator.DC.language: Literal("en")})
+        collection.add_context(context)
+    for triple in collection.triples():
+        graph.add(triple)
+    catalog = graph.catalog
+    assert sorted(catalog.index) == sorted(c.uri for c in collection.hasContext)
+    assert list(catalog.columns) == [
+        "dc:language",
+        nifigator.NIF.ContextCollection,
+        nifigator.DCT.conformsTo,
+    ]
+    assert set(catalog[nifigator.NIF.ContextCollection]) == {collection.uri}
+    assert set(catalog["dc:language"]) == {"en"}
+
+    # the catalog is cached until the graph is changed
+    assert graph.catalog.equals(catalog)
+    graph.add((catalog.index[0], nifigator.DCT.created, Literal("2023-01-01")))
+    assert graph.catalog.loc[catalog.index[0], "dcterms:created"] == "2023-01-01"
+
+    # changes by another graph on the same store are read with refresh
+    other = nifigator.NifGraph(store=graph.store, identifier=graph.identifier)
+    other.add((catalog.index[1], nifigator.DCT.created, Literal("2023-01-02")))
+    assert graph.catalog.loc[catalog.index[1], "dcterms:created"] != "2023-01-02"
+    catalog = graph.get_catalog(refresh=True)
+    assert catalog.loc[catalog.index[1], "dcterms:created"] == "2023-01-02"
+
+
+def test_context_graphs():
+    graph = nifigator.NifGraph()
+    uris = []
+    for idx in range(5):
+        context = nifigator.NifContext(
+            uri="https://mangosaurus.eu/rdf-data/doc_" + str(idx),
+            URIScheme=nifigator.OffsetBasedString,
+            isString="The cat sat.",
+        )
+        for triple in context.triples():
+            graph.add(triple)
+        uris.append(context.uri)
+    graphs = dict(graph.context_graphs(uris, batch_size=2))
+    assert list(graphs.keys()) == uris
+    for uri, context_graph in graphs.items():
+        assert len(context_graph) > 0
+        assert set(context_graph) == set(
+            (s, p, o)
+            for s in graph.subjects(nifigator.NIF.referenceContext, uri)
+            for p, o in graph.predicate_objects(s)
+        )
+    assert set(graph.context_graph(uris[0])) == set(graphs[uris[0]])
+
+
+def test_lexicon():
+    graph = nifigator.NifGraph()
+    context = URIRef("https://mangosaurus.eu/rdf-data/doc_1")
+    graph.add((context, nifigator.RDF.type, nifigator.NIF.Context))
+    words = [("cats", "cat", "Noun"), ("cat", "cat", "Noun"), ("sat", "sit", "Verb")]
+    for idx, (anchor, lemma, pos) in enumerate(words * 2):
+        word = URIRef(str(context) + "#offset_" + str(idx))
+        graph.add((word, nifigator.RDF.type, nifigator.NIF.Word))
+        graph.add((word, nifigator.NIF.referenceContext, context))
+        graph.add((word, nifigator.NIF.anchorOf, Literal(anchor)))
+        graph.add((word, nifigator.NIF.lemma, Literal(lemma)))
+        graph.add((word, nifigator.NIF.pos, nifigator.OLIA[pos]))
+    lexica = graph.lexicon
+    assert list(lexica.keys()) == ["en"]
+    entries = {str(entry.uri).split("/")[-1]: entry for entry in lexica["en"].entries}
+    assert sorted(entries.keys()) == ["cat", "sit"]
+    assert entries["cat"].canonicalForm.writtenReps == [Literal("cat")]
+    assert entries["cat"].otherForms[0].writtenReps == [Literal("cats")]
+    assert entries["sit"].otherForms[0].writtenReps == [Literal("sat")]
+    assert entries["sit"].partOfSpeechs == [nifigator.OLIA["Verb"]]
+
+
+def test_get_many():
+    graph = nifigator.NifGraph()
+    context = nifigator.NifContext(
+        uri="https://mangosaurus.eu/rdf-data/doc_1",
+        URIScheme=nifigator.OffsetBasedString,
+        isString="The cat sat.",
+    )
+    sentence = nifigator.NifSentence(
+        beginIndex=0,
+        endIndex=12,
+        referenceContext=context,
+        URIScheme=nifigator.OffsetBasedString,
+        base_uri=context.uri,
+    )
+    context.add_sentence(sentence)
+    for triple in context.triples():
+        graph.add(triple)
+    uris = [sentence.uri, URIRef("https://mangosaurus.eu/none"), context.uri]
+    objects = graph.get_many(uris)
+    assert [type(obj) for obj in objects] == [
+        nifigator.NifSentence,
+        type(None),
+        nifigator.NifContext,
+    ]
+    assert objects[0].uri == sentence.uri
+    assert objects[0].referenceContext is objects[2]
+    assert objects[0].anchorOf == "The cat sat."
+    assert isinstance(graph.get(sentence.uri), nifigator.NifSentence)
+
+
+class RecordingStore(SPARQLUpdateStore):
+    # the updates are recorded instead of sent to an endpoint
+    def __init__(self):
+        super(RecordingStore, self).__init__(update_endpoint="http://localhost/update")
+        self.updates = []
+
+    def _update(self, update):
+        self.updates.append(update)
+
+
+def test_parse_collection():
+    collection = nifigator.NifContextCollection(uri="https://mangosaurus.eu/rdf-data")
+    for idx in range(3):
+        collection.add_context(
+            nifigator.NifContext(
+                uri="https://mangosaurus.eu/rdf-data/doc_" + str(idx),
+                URIScheme=nifigator.OffsetBasedString,
+                isString="The cat sat.",
+            )
+        )
+    expected = set(collection.triples())
+    graph = nifigator.NifGraph(collection=collection)
+    assert set(graph) == expected
+
+    uri = URIRef("https://mangosaurus.eu/rdf-data/graph")
+    store = RecordingStore()
+    graph = nifigator.NifGraph(store=store, identifier=uri)
+    graph._NifGraph__parse_collection(collection, batch_size=2**10, max_bytes=2**10)
+    assert len(store.updates) > 1
+    assert all(len(update.encode("utf-8")) < 2**11 for update in store.updates)
+    dataset = Dataset()
+    for update in store.updates:
+        dataset.update(update)
+    assert set(dataset.graph(uri)) == expected
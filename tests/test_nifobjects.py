@@ -1,8 +1,12 @@
+import copy
+
 import pytest
 
 import nifigator
 
-from rdflib.term import URIRef
+from rdflib.plugins.stores.sparqlstore import SPARQLUpdateStore
+from rdflib.namespace import XSD
+from rdflib.term import Literal, URIRef
 import stanza
 
 def test_nif_context_1():
@@ -100,3 +104,287 @@ def test_nif_graph():
     assert word.morphofeats == [URIRef('http://purl.org/olia/olia.owl#Singular')]
     assert word.dependency[0].uri == URIRef('https://mangosaurus.eu/rdf-data/doc_1&nif=word_38_42')
     assert word.dependencyRelationType == 'nsubj'
+
+STANZA_DICT = [
+    [
+        {"id": 1, "text": "The", "lemma": "the", "upos": "DET", "feats": "Definite=Def|PronType=Art", "head": 2, "deprel": "det", "start_char": 0, "end_char": 3},
+        {"id": 2, "text": "cat", "lemma": "cat", "upos": "NOUN", "feats": "Number=Sing", "head": 3, "deprel": "nsubj", "start_char": 4, "end_char": 7},
+        {"id": 3, "text": "sat", "lemma": "sit", "upos": "VERB", "feats": "Tense=Past", "head": 0, "deprel": "root", "start_char": 8, "end_char": 11},
+        {"id": 4, "text": ".", "lemma": ".", "upos": "PUNCT", "head": 3, "deprel": "punct", "start_char": 11, "end_char": 12},
+    ],
+    [
+        {"id": 1, "text": "Felix", "lemma": "Felix", "upos": "PROPN", "feats": "Number=Sing", "head": 2, "deprel": "nsubj", "start_char": 13, "end_char": 18},
+        {"id": 2, "text": "slept", "lemma": "sleep", "upos": "VERB", "feats": "Tense=Past", "head": 0, "deprel": "root", "start_char": 19, "end_char": 24},
+        {"id": 3, "text": ".", "lemma": ".", "upos": "PUNCT", "head": 2, "deprel": "punct", "start_char": 24, "end_char": 25},
+    ],
+]
+
+
+class LocalQueryStore(SPARQLUpdateStore):
+    # the queries are recorded and evaluated on a local graph instead of an endpoint,
+    # the CONSTRUCT query of the strings of a context is answered with their triples
+    def __init__(self, graph):
+        super(LocalQueryStore, self).__init__(
+            query_endpoint="http://localhost/sparql",
+            update_endpoint="http://localhost/update",
+        )
+        self.graph = graph
+        self.queries = []
+
+    def query(self, query, *args, **kwargs):
+        self.queries.append(query)
+        if query.startswith("CONSTRUCT"):
+            return [
+                (s, p, o)
+                for s in self.graph.subjects(nifigator.NIF.referenceContext, None)
+                for p, o in self.graph.predicate_objects(s)
+            ]
+        return self.graph.query(query)
+
+
+def test_load_sentences():
+    context = nifigator.NifContext(
+        uri="https://mangosaurus.eu/rdf-data/doc_1",
+        URIScheme=nifigator.OffsetBasedString,
+        isString="The cat sat. Felix slept.",
+    )
+    context.load_from_dict(copy.deepcopy(STANZA_DICT))
+    g = nifigator.NifGraph()
+    for triple in context.triples():
+        g.add(triple)
+
+    remote = nifigator.NifGraph(store=LocalQueryStore(g))
+    for graph in [g, remote]:
+        loaded = nifigator.NifContext(
+            uri=context.uri,
+            URIScheme=nifigator.OffsetBasedString,
+            isString=context.isString,
+            graph=graph,
+        )
+        assert [s.uri for s in loaded.sentences] == [s.uri for s in context.sentences]
+        assert loaded.sentences[1].anchorOf == "Felix slept."
+        assert loaded.sentences[0].nextSentence is loaded.sentences[1]
+        words = loaded.sentences[0].words
+        assert [w.uri for w in words] == [w.uri for w in context.sentences[0].words]
+        assert [w.anchorOf for w in words] == ["The", "cat", "sat", "."]
+        word = words[1]
+        assert word.lemma == "cat"
+        assert word.pos == [URIRef("http://purl.org/olia/olia.owl#CommonNoun")]
+        assert word.morphofeats == [URIRef("http://purl.org/olia/olia.owl#Singular")]
+        assert word.dependency == [words[2]]
+        assert word.dependencyRelationType == "nsubj"
+        assert word.previousWord is words[0] and word.nextWord is words[2]
+
+    # the strings of the context are read with one CONSTRUCT query from the endpoint
+    constructs = [q for q in remote.store.queries if q.startswith("CONSTRUCT")]
+    assert len(constructs) == 1
+    assert "SERVICE <http://localhost/sparql>" in constructs[0]
+    assert nifigator.NIF.referenceContext.n3() + " " + context.uri.n3() in constructs[0]
+    assert "VALUES ?t { " + nifigator.NIF.Sentence.n3() + " " + nifigator.NIF.Word.n3() + " }" in constructs[0]
+
+
+def test_nif_index():
+    context = nifigator.NifContext(
+        uri="https://mangosaurus.eu/rdf-data/doc_1",
+        URIScheme=nifigator.OffsetBasedString,
+        isString="The cat sat. Felix slept.",
+    )
+    context.set_Pages(
+        [
+            nifigator.NifPage(
+                base_uri=context.uri,
+                beginIndex=begin,
+                endIndex=end,
+                referenceContext=context,
+                URIScheme=nifigator.OffsetBasedString,
+                pageNumber=idx + 1,
+            )
+            for idx, (begin, end) in enumerate([(0, 13), (13, 25)])
+        ]
+    )
+    context.load_from_dict(copy.deepcopy(STANZA_DICT))
+    index = context.index
+    assert len(index) == 2 + 2 + 7
+
+    sentences = context.sentences
+    assert [page.pageNumber for page in sentences[0].pages] == [1]
+    assert [page.pageNumber for page in sentences[1].pages] == [2]
+    assert [w.anchorOf for w in index.at(5, [nifigator.NifWord])] == ["cat"]
+    assert index.at(5, [nifigator.NifSentence]) == [sentences[0]]
+    assert [w.anchorOf for w in index.overlapping(6, 20, [nifigator.NifWord])] == [
+        "cat",
+        "sat",
+        ".",
+        "Felix",
+        "slept",
+    ]
+    assert index.containing(14, 17, [nifigator.NifSentence]) == [sentences[1]]
+    assert index.containing(10, 15, [nifigator.NifSentence]) == []
+    # a type selects the strings of its subclasses
+    for types in [[nifigator.NifString], [nifigator.NifStructure]]:
+        assert len(index.at(5)) == 3
+        assert [id(s) for s in index.at(5, types)] == [id(s) for s in index.at(5)]
+
+    class Token(nifigator.NifWord):
+        pass
+
+    token = Token(
+        base_uri=context.uri,
+        beginIndex=4,
+        endIndex=7,
+        referenceContext=context,
+        URIScheme=nifigator.OffsetBasedString,
+    )
+    index.add(token)
+    assert any(w is token for w in index.at(5, [nifigator.NifWord]))
+    assert index.at(5, [Token]) == [token]
+
+    sentence = nifigator.NifSentence(
+        base_uri=context.uri,
+        beginIndex=0,
+        endIndex=25,
+        referenceContext=context,
+        URIScheme=nifigator.OffsetBasedString,
+    )
+    # the index is kept up to date by add_sentence
+    context.add_sentence(sentence)
+    assert context.index is index
+    assert index.containing(10, 15, [nifigator.NifSentence]) == [sentence]
+
+
+def test_compact_nif_objects():
+    context = nifigator.NifContext(
+        uri="https://mangosaurus.eu/rdf-data/doc_1",
+        URIScheme=nifigator.OffsetBasedString,
+        isString="The cat sat. Felix slept.",
+    )
+    context.load_from_dict(copy.deepcopy(STANZA_DICT))
+    word = context.sentences[0].words[1]
+    assert not hasattr(word, "__dict__")
+    assert word.beginIndex == 4 and type(word._beginIndex) == int
+    assert word.lemma == "cat" and word.dependencyRelationType == "nsubj"
+    # the shared strings are converted to Literals in the triples
+    triples = set(word.triples())
+    assert (word.uri, nifigator.NIF.beginIndex, Literal(4, datatype=XSD.nonNegativeInteger)) in triples
+    assert (word.uri, nifigator.NIF.lemma, Literal("cat", datatype=XSD.string)) in triples
+    assert word.morphofeats[0] is context.sentences[1].words[0].morphofeats[0]
+
+
+def test_word_table():
+    context = nifigator.NifContext(
+        uri="https://mangosaurus.eu/rdf-data/doc_1",
+        URIScheme=nifigator.OffsetBasedString,
+        isString="The cat sat. Felix slept.",
+    )
+    context.load_from_dict(copy.deepcopy(STANZA_DICT))
+    # the words are only in the table until they are used
+    assert context._sentences is None
+    table = context.word_table
+    assert len(table) == 7
+    assert table.beginIndex.tolist() == [0, 4, 8, 11, 13, 19, 24]
+    assert table.sentence.tolist() == [0, 0, 0, 0, 1, 1, 1]
+    assert table.head.tolist() == [1, 2, -1, 2, 5, -1, 5]
+    assert [table.lemmas[i] for i in table.lemma_ids] == ["the", "cat", "sit", ".", "Felix", "sleep", "."]
+
+    df = table.to_dataframe(context.isString)
+    assert list(df["anchorOf"]) == ["The", "cat", "sat", ".", "Felix", "slept", "."]
+    assert list(df["lemma"]) == ["the", "cat", "sit", ".", "Felix", "sleep", "."]
+    assert df["pos"][1] == nifigator.OLIA.CommonNoun
+    assert df["dependencyRelationType"][2] == "root"
+    assert df["morphofeats"][1] == [nifigator.OLIA.Singular]
+
+    sentences = context.sentences
+    assert context.word_table is table
+    words = sentences[0].words
+    assert [w.anchorOf for w in words] == ["The", "cat", "sat", "."]
+    assert words[0].dependency == [words[1]] and not words[2].dependency
+    assert words[1].pos == [nifigator.OLIA.CommonNoun]
+    assert words[1].nextWord is words[2] and sentences[0].nextSentence is sentences[1]
+
+    # the table of the objects is the same as the table of the dict
+    expected = df.astype(str)
+    context.set_Sentences(sentences)
+    assert context._word_table is None
+    assert context.word_table.to_dataframe(context.isString).astype(str).equals(expected)
+
+
+def test_load_from_dict_twice():
+    def new_context():
+        return nifigator.NifContext(
+            uri="https://mangosaurus.eu/rdf-data/doc_1",
+            URIScheme=nifigator.OffsetBasedString,
+            isString="The cat sat. Felix slept.",
+        )
+    context = new_context()
+    context.load_from_dict(copy.deepcopy(STANZA_DICT))
+    expected = context.word_table.to_dataframe(context.isString).astype(str)
+
+    # the second call adds to the table and to the sentences that are already created
+    for created in [False, True]:
+        context = new_context()
+        context.load_from_dict(copy.deepcopy(STANZA_DICT[0:1]))
+        if created:
+            assert len(context.sentences) == 1
+        context.load_from_dict(copy.deepcopy(STANZA_DICT[1:]))
+        assert [s.anchorOf for s in context.sentences] == ["The cat sat.", "Felix slept."]
+        assert context.sentences[0].nextSentence is context.sentences[1]
+        assert context.sentences[1].previousSentence is context.sentences[0]
+        words = context.sentences[1].words
+        assert words[0].dependency == [words[1]]
+        assert context.word_table.to_dataframe(context.isString).astype(str).equals(expected)
+
+
+def test_bulk_triples():
+    collection = nifigator.NifContextCollection(uri="https://mangosaurus.eu/rdf-data")
+    for idx, lexicon in enumerate([None, URIRef("https://mangosaurus.eu/rdf-data/lexicon/en/")]):
+        context = nifigator.NifContext(
+            uri="https://mangosaurus.eu/rdf-data/doc_" + str(idx),
+            URIScheme=nifigator.OffsetBasedString,
+            isString="The cat sat. Felix slept.",
+            lexicon=lexicon,
+        )
+        context.set_Pages(
+            [
+                nifigator.NifPage(
+                    base_uri=context.uri,
+                    beginIndex=0,
+                    endIndex=25,
+                    referenceContext=context,
+                    URIScheme=nifigator.OffsetBasedString,
+                    pageNumber=1,
+                )
+            ]
+        )
+        context.load_from_dict(copy.deepcopy(STANZA_DICT))
+        collection.add_context(context)
+
+    # the triples are the same as the triples of the objects, in the same order
+    for objects in [None, [nifigator.NifWord], [nifigator.NifContext, nifigator.NifPage]]:
+        expected = []
+        if objects is None:
+            expected.append((collection.uri, nifigator.RDF.type, nifigator.NIF.ContextCollection))
+            expected.append((collection.uri, nifigator.DCT.conformsTo, collection.conformsTo))
+        for context in collection.contexts:
+            expected.append((collection.uri, nifigator.NIF.hasContext, context.uri))
+            if objects is None or nifigator.NifContext in objects:
+                expected.extend(
+                    [
+                        (context.uri, nifigator.RDF.type, nifigator.NIF.Context),
+                        (context.uri, nifigator.NIF.isString, context._isString),
+                        (context.uri, nifigator.NIF.firstSentence, context.firstSentence.uri),
+                        (context.uri, nifigator.NIF.lastSentence, context.lastSentence.uri),
+                    ]
+                )
+                expected.extend(nifigator.NifString.triples(context))
+            for sentence in context.sentences:
+                expected.extend(sentence.triples(objects=objects))
+            for page in context.pages:
+                expected.extend(page.triples(objects=objects))
+        triples = list(collection.triples(objects=objects))
+        assert triples == expected
+        assert len(set(triples)) == len(triples)
+
+    # the Literals and uris are shared by the triples
+    lemmas = [o for s, p, o in collection.triples() if p == nifigator.NIF.lemma]
+    assert lemmas[3] is lemmas[6]
+    assert URIRef("https://mangosaurus.eu/rdf-data/lexicon/en/cat") in lemmas
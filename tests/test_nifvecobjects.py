@@ -0,0 +1,39 @@
+import nifigator
+
+
+def setup_graph():
+    graph = nifigator.NifGraph()
+    texts = [
+        "The cat sat on the mat. The dog sat on the mat.",
+        "The cat was on the mat. The dog was on the mat.",
+        "The big cat sat on the mat. The big dog was on the mat.",
+    ]
+    for idx, text in enumerate(texts):
+        context = nifigator.NifContext(
+            uri="https://mangosaurus.eu/rdf-data/doc_" + str(idx),
+            URIScheme=nifigator.OffsetBasedString,
+            isString=text,
+        )
+        for triple in context.triples():
+            graph.add(triple)
+    return graph
+
+
+def test_generate_documents():
+    graph = setup_graph()
+    vec_graph = nifigator.NifVectorGraph(params={})
+    documents = dict(vec_graph.generate_documents(graph))
+    assert len(documents) == 3
+    for context in graph.contexts:
+        assert documents[context.uri] == nifigator.preprocess(context.isString, {})
+    assert list(vec_graph.generate_documents(graph, workers=2)) == list(
+        documents.items()
+    )
+
+
+def test_nif_vector_graph_workers():
+    graph = setup_graph()
+    v1 = nifigator.NifVectorGraph(nif_graph=graph, params={})
+    v2 = nifigator.NifVectorGraph(nif_graph=graph, params={}, workers=2)
+    assert len(v1) > 0
+    assert set(v1) == set(v2)
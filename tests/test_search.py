@@ -0,0 +1,248 @@
+import random
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from datasketch import MinHash
+import numpy as np
+
+import nifigator
+
+
+def setup_vectors():
+    random.seed(1)
+    words = ["w" + str(i) for i in range(50)]
+    contexts = [("l" + str(i), "r" + str(i)) for i in range(150)]
+    base_vectors = {
+        word: Counter({c: random.randint(1, 5) for c in random.sample(contexts, 15)})
+        for word in words
+    }
+    documents = dict()
+    for _ in range(200):
+        text = " ".join(random.sample(words, random.randint(2, 8)))
+        documents[text] = nifigator.document_vector({text: text}, base_vectors)
+    return words, base_vectors, documents
+
+
+def test_inverted_index_containment():
+    words, base_vectors, documents = setup_vectors()
+    search = nifigator.InvertedIndexSearch(base_vectors, documents)
+    query = "w1 w2 w3"
+    scores = search.get_scores(query)
+    q = nifigator.merge_multiset(
+        nifigator.document_vector({"query": query}, base_vectors)
+    ).keys()
+    for key, value in scores.items():
+        d = nifigator.merge_multiset(documents[key]).keys()
+        assert value == 1 - nifigator.containment_index(q, d)
+
+
+def test_inverted_index_topn():
+    words, base_vectors, documents = setup_vectors()
+    for scoring in ["containment", "bm25"]:
+        search = nifigator.InvertedIndexSearch(base_vectors, documents, scoring=scoring)
+        for query in ["w4 w8 w15", "w20 w21", "w33 w2 w9 w11"]:
+            scores = sorted(search.get_scores(query).values())
+            top_scores = sorted(search.get_scores(query, topn=5).values())
+            assert len(top_scores) == 5
+            assert search.get_scores(query, topn=0) == {}
+            for s1, s2 in zip(top_scores, scores[0:5]):
+                assert abs(s1 - s2) < 1e-9
+
+
+def test_matches():
+    words, base_vectors, documents = setup_vectors()
+    search = nifigator.InvertedIndexSearch(base_vectors, documents)
+    key1 = "w1 w2 w3 w4 w5 w6"
+    key2 = "w4 w5 w6 w7 w8 w9"
+    result = search.matches(key1, key2)
+    v1 = nifigator.document_vector({"query": key1}, base_vectors)
+    v2 = nifigator.document_vector({"query": key2}, base_vectors)
+    for p1, values in result.full_matches.items():
+        for p2, score in values:
+            assert nifigator.containment_index(v2[p2], v1[p1]) == 1
+    for p1, values in result.close_matches.items():
+        assert p1 not in result.full_matches.keys()
+        for p2, score in values:
+            assert score == 1 - nifigator.containment_index(v2[p2], v1[p1])
+            assert 0 < score < 1
+    assert "w4" in result.full_matches.keys()
+
+
+def test_minhash_parallel():
+    words, base_vectors, documents = setup_vectors()
+    serial = nifigator.MinHashSearch(base_vectors, documents, shard_size=16)
+    parallel = nifigator.MinHashSearch(
+        base_vectors, documents, workers=2, shard_size=16
+    )
+    assert (serial.minhash_dict.hashvalues == parallel.minhash_dict.hashvalues).all()
+    assert (
+        serial.minhash_documents.hashvalues == parallel.minhash_documents.hashvalues
+    ).all()
+    for key, value in base_vectors.items():
+        minhash = MinHash(num_perm=serial.num_perm)
+        for item, count in value.most_common(serial.topn):
+            minhash.update(str(item).encode("utf8"))
+        assert minhash == serial.minhash_dict[key]
+    for key, elements in documents.items():
+        minhash = MinHash(num_perm=serial.num_perm)
+        for element in elements.keys():
+            minhash.merge(serial.minhash_dict[element])
+        assert minhash == serial.minhash_documents[key]
+    query = "w1 w2 w3"
+    assert serial.get_scores(query) == parallel.get_scores(query)
+
+
+def test_minhash_merge_threads():
+    words, base_vectors, documents = setup_vectors()
+    searches = [
+        nifigator.MinHashSearch(base_vectors, None, num_perm=num_perm, shard_size=4)
+        for num_perm in [2**6, 2**7]
+    ]
+    expected = [search.merge_minhash(documents).hashvalues for search in searches]
+    # the merges of different instances at the same time do not interfere
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(search.merge_minhash, documents)
+            for _ in range(4)
+            for search in searches
+        ]
+        for idx, future in enumerate(futures):
+            assert (future.result().hashvalues == expected[idx % 2]).all()
+
+
+def test_sentence_similarity_join():
+    words, base_vectors, documents = setup_vectors()
+    texts = list(documents.keys())
+    texts += [" ".join(text.split(" ")[1:]) for text in texts[0:50]]
+    contexts = [
+        SimpleNamespace(
+            sentences=[
+                SimpleNamespace(uri="s" + str(idx), anchorOf=text)
+                for idx, text in enumerate(texts)
+                if idx % 4 == c
+            ]
+        )
+        for c in range(4)
+    ]
+    vectors = {
+        "s"
+        + str(idx): nifigator.document_vector(
+            {idx: text}, base_vectors, merge_dict=True
+        )
+        for idx, text in enumerate(texts)
+    }
+    expected = dict()
+    for uri1, v1 in vectors.items():
+        for uri2, v2 in vectors.items():
+            score = nifigator.jaccard_index(v1, v2, as_float=True)
+            if uri1 < uri2 and score >= 0.4:
+                expected[(uri1, uri2)] = score
+    assert len(expected) > 50
+    for workers in [1, 2]:
+        pairs = nifigator.sentence_similarity_join(
+            contexts, base_vectors, threshold=0.4, workers=workers, shard_size=32
+        )
+        result = {tuple(sorted([pair.uri1, pair.uri2])): pair.score for pair in pairs}
+        assert result.keys() == expected.keys()
+        for key, value in expected.items():
+            assert abs(result[key] - value) < 1e-9
+
+    # joins that are consumed alternately and other searches do not interfere
+    search = nifigator.MinHashSearch(base_vectors, documents)
+    joins = [
+        nifigator.sentence_similarity_join(
+            contexts, base_vectors, threshold=threshold, shard_size=32
+        )
+        for threshold in [0.4, 0.6]
+    ]
+    results = [[next(join)] for join in joins]
+    search.merge_minhash(documents)
+    running = list(zip(joins, results))
+    while running:
+        for join, result in list(running):
+            pair = next(join, None)
+            if pair is None:
+                running.remove((join, result))
+            else:
+                result.append(pair)
+    assert {tuple(sorted([p.uri1, p.uri2])) for p in results[0]} == expected.keys()
+    assert {tuple(sorted([p.uri1, p.uri2])) for p in results[1]} == {
+        key for key, value in expected.items() if value >= 0.6
+    }
+
+
+def test_minhash_weighted():
+    words, base_vectors, documents = setup_vectors()
+    weighted = nifigator.MinHashSearch(base_vectors, documents, weighted=True)
+    parallel = nifigator.MinHashSearch(
+        base_vectors, documents, weighted=True, workers=2, shard_size=16
+    )
+    assert (
+        weighted.minhash_documents.hashvalues == parallel.minhash_documents.hashvalues
+    ).all()
+    # the minhash of a document is the minhash of the union of its (weighted) elements
+    errors = []
+    for w1, w2 in zip(words[0:-1], words[1:]):
+        union = weighted.merge_minhash({"doc": {w1: None, w2: None}})["doc"]
+        expected = nifigator.weighted_jaccard_index(
+            base_vectors[w1] | base_vectors[w2], base_vectors[w2], as_float=True
+        )
+        errors.append(abs(union.jaccard(weighted.minhash_dict[w2]) - expected))
+    assert sum(errors) / len(errors) < 0.05
+
+
+def test_minhash_weighted_large_counts():
+    words, base_vectors, documents = setup_vectors()
+    large = {
+        key: Counter({item: count * 10**12 for item, count in value.items()})
+        for key, value in base_vectors.items()
+    }
+    weighted = nifigator.MinHashSearch(large, None, weighted=True)
+    errors = []
+    for w1, w2 in zip(words[0:-1], words[1:]):
+        expected = nifigator.weighted_jaccard_index(
+            base_vectors[w1], base_vectors[w2], as_float=True
+        )
+        estimate = weighted.minhash_dict[w1].jaccard(weighted.minhash_dict[w2])
+        errors.append(abs(estimate - expected))
+    assert sum(errors) / len(errors) < 0.05
+    # the minhash of the union is the minimum of the minhashes
+    w1, w2 = words[0], words[1]
+    union = nifigator.MinHashSearch(
+        {"u": large[w1] | large[w2]}, None, topn=30, weighted=True
+    )
+    assert (
+        union.minhash_dict["u"].hashvalues
+        == np.minimum(
+            weighted.minhash_dict[w1].hashvalues, weighted.minhash_dict[w2].hashvalues
+        )
+    ).all()
+
+
+def test_cache(tmp_path):
+    words, base_vectors, documents = setup_vectors()
+    cache = nifigator.ContentCache(maxsize=2, path=str(tmp_path))
+    search = nifigator.InvertedIndexSearch(base_vectors, documents, cache=cache)
+    queries = ["w1 w2 w3", "w4 w5", "w6 w7 w8"]
+    scores = [search.get_scores(query) for query in queries]
+    assert cache.misses == 3 and len(cache) == 2
+    # the first query is evicted from memory and read from disk
+    assert [search.get_scores(query) for query in queries] == scores
+    assert cache.hits == 3
+    cache = nifigator.ContentCache(path=str(tmp_path))
+    search.set_cache(cache)
+    assert search.get_scores(queries[0]) == scores[0]
+    assert cache.hits == 1 and cache.misses == 0
+
+    # searches with other base vectors do not share the cached document vectors
+    other_vectors = {key: Counter(value.keys()) for key, value in base_vectors.items()}
+    other = nifigator.InvertedIndexSearch(other_vectors, documents, cache=cache)
+    expected = nifigator.InvertedIndexSearch(other_vectors, documents)
+    assert other.get_scores(queries[0]) == expected.get_scores(queries[0])
+    assert cache.misses == 1
+    other_vectors["w1"] = Counter({("l0", "r0"): 1})
+    other.set_base_vectors(other_vectors)
+    expected.set_base_vectors(other_vectors)
+    assert other.get_scores(queries[0]) == expected.get_scores(queries[0])
+    assert cache.misses == 2
@@ -0,0 +1,72 @@
+import gzip
+
+from rdflib import Dataset, Graph, Literal, URIRef
+
+import nifigator
+
+
+def setup_collection():
+    collection = nifigator.NifContextCollection(uri="https://mangosaurus.eu/rdf-data")
+    for idx in range(4):
+        context = nifigator.NifContext(
+            uri="https://mangosaurus.eu/rdf-data/doc_" + str(idx),
+            URIScheme=nifigator.OffsetBasedString,
+            isString='The "cat"\nsat.',
+        )
+        context.set_metadata({nifigator.DC.language: Literal("en", lang="en")})
+        collection.add_context(context)
+    return collection
+
+
+def test_write_triples(tmp_path):
+    collection = setup_collection()
+    graph = nifigator.NifGraph()
+    for triple in collection.triples():
+        graph.add(triple)
+    for format in ["nt", "hext"]:
+        filename = str(tmp_path / ("nif." + format))
+        assert nifigator.write_triples(graph, filename) == [filename]
+        with open(filename, encoding="utf-8") as f:
+            lines = sorted(f.read().splitlines())
+        expected = graph.serialize(format=format, encoding="utf-8").decode("utf-8")
+        assert lines == sorted(line for line in expected.splitlines() if line)
+
+    filenames = nifigator.write_triples(
+        collection.triples(), str(tmp_path / "nif.nt.gz"), chunk_size=5
+    )
+    assert filenames[1] == str(tmp_path / "nif_00001.nt.gz")
+    result = Graph()
+    for filename in filenames:
+        with gzip.open(filename, "rt", encoding="utf-8") as f:
+            lines = f.read()
+            if filename != filenames[-1]:
+                assert len(lines.splitlines()) == 5
+            result.parse(data=lines, format="nt")
+    assert set(result) == set(graph)
+
+
+def test_write_contexts(tmp_path):
+    collection = setup_collection()
+    expected = nifigator.write_triples(collection.triples(), str(tmp_path / "nif.nt"))
+    with open(expected[0], encoding="utf-8") as f:
+        expected = f.read()
+    for workers in [1, 2]:
+        filenames = nifigator.write_contexts(
+            collection, str(tmp_path / "nif.nt.gz"), chunk_size=10, workers=workers
+        )
+        assert len(filenames) > 1
+        lines = ""
+        for filename in filenames:
+            with gzip.open(filename, "rt", encoding="utf-8") as f:
+                lines += f.read()
+        assert lines == expected
+
+    uri = URIRef("https://mangosaurus.eu/rdf-data/graph")
+    filenames = nifigator.write_contexts(
+        collection.hasContext, str(tmp_path / "nif.nq"), graph=uri
+    )
+    dataset = Dataset()
+    dataset.parse(filenames[0], format="nquads")
+    assert set(dataset.graph(uri)) == set(
+        triple for context in collection.hasContext for triple in context.triples()
+    )
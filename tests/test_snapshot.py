@@ -0,0 +1,39 @@
+import itertools
+
+import pytest
+from rdflib import Literal, URIRef
+from rdflib.graph import ModificationException
+
+import nifigator
+
+from .test_sqlitestore import URI, setup_graph
+
+
+def test_snapshot(tmp_path):
+    filename = str(tmp_path / "nif.snapshot")
+    expected = setup_graph(nifigator.NifGraph(identifier=URI))
+    nifigator.write_snapshot(expected, filename, block_size=4)
+
+    graph = nifigator.NifGraph(store=nifigator.SnapshotStore(filename), identifier=URI)
+    assert len(graph) == len(expected)
+    assert set(graph) == set(expected)
+    for triple in expected:
+        for mask in itertools.product([False, True], repeat=3):
+            pattern = tuple(t if m else None for t, m in zip(triple, mask))
+            assert set(graph.triples(pattern)) == set(expected.triples(pattern))
+    for pattern in [
+        (URIRef(URI + "b"), None, None),
+        (None, None, Literal("dog")),
+    ]:
+        assert list(graph.triples(pattern)) == []
+    assert graph.store.namespace("nif") == URIRef(nifigator.NIF)
+    with pytest.raises(ModificationException):
+        graph.add((URIRef(URI + "b"), URIRef(URI + "p"), Literal("dog")))
+    graph.close()
+
+    # the snapshot can be closed while a triples generator is not finished
+    graph = nifigator.NifGraph(store=nifigator.SnapshotStore(filename), identifier=URI)
+    triples = graph.triples((None, None, None))
+    next(triples)
+    graph.close()
+    assert len(graph) == 0
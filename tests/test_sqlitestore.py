@@ -0,0 +1,85 @@
+import sqlite3
+
+from rdflib import Literal, URIRef
+from rdflib.namespace import XSD
+
+import nifigator
+
+URI = "https://mangosaurus.eu/rdf-data/"
+
+
+def setup_graph(graph):
+    texts = [
+        "The cat sat on the mat. The dog sat on the mat.",
+        "The cat was on the mat. The dog was on the mat.",
+    ]
+    for idx, text in enumerate(texts):
+        context = nifigator.NifContext(
+            uri=URI + "doc_" + str(idx),
+            URIScheme=nifigator.OffsetBasedString,
+            isString=text,
+        )
+        graph.addN((s, p, o, graph) for s, p, o in context.triples())
+    graph.add((URIRef(URI + "a"), URIRef(URI + "p"), Literal("cat", lang="en")))
+    graph.add((URIRef(URI + "a"), URIRef(URI + "p"), Literal("cat")))
+    graph.add((URIRef(URI + "a"), URIRef(URI + "p"), Literal(1)))
+    graph.add((URIRef(URI + "a"), URIRef(URI + "p"), Literal("1", datatype=XSD.string)))
+    return graph
+
+
+def test_sqlite_store(tmp_path):
+    filename = str(tmp_path / "nif.db")
+    expected = setup_graph(nifigator.NifGraph(identifier=URI))
+    graph = setup_graph(
+        nifigator.NifGraph(store=nifigator.SQLiteStore(filename), identifier=URI)
+    )
+    assert set(graph) == set(expected)
+    graph.close()
+
+    graph = nifigator.NifGraph(store=nifigator.SQLiteStore(filename), identifier=URI)
+    assert len(graph) == len(expected)
+    assert set(graph) == set(expected)
+    for pattern in [
+        (URIRef(URI + "a"), None, None),
+        (None, URIRef(URI + "p"), None),
+        (None, None, Literal("cat", lang="en")),
+        (URIRef(URI + "b"), None, None),
+    ]:
+        assert set(graph.triples(pattern)) == set(expected.triples(pattern))
+    assert graph.store.namespace("nif") == URIRef(nifigator.NIF)
+    assert [c.uri for c in graph.contexts] == [c.uri for c in expected.contexts]
+
+    graph.remove((URIRef(URI + "a"), None, None))
+    expected.remove((URIRef(URI + "a"), None, None))
+    assert set(graph) == set(expected)
+
+    other = nifigator.NifGraph(
+        store=nifigator.SQLiteStore(filename), identifier=URI + "other"
+    )
+    assert len(other) == 0
+
+
+def test_sqlite_store_commits(tmp_path):
+    filename = str(tmp_path / "nif.db")
+    store = nifigator.SQLiteStore(filename)
+    graph = nifigator.NifGraph(store=store, identifier=URI)
+    other = nifigator.NifGraph(store=store, identifier=URI + "other")
+    triple = (URIRef(URI + "a"), URIRef(URI + "p"), Literal("cat"))
+    graph.add(triple)
+    other.add(triple)
+    other.add((URIRef(URI + "b"), URIRef(URI + "p"), Literal("dog")))
+
+    # the added triples are committed by commit()
+    connection = sqlite3.connect(filename)
+    assert connection.execute("SELECT COUNT(*) FROM quads").fetchone()[0] == 0
+    graph.commit()
+    assert connection.execute("SELECT COUNT(*) FROM quads").fetchone()[0] == 3
+    connection.close()
+
+    # the contexts of a triple are read with the triple
+    contexts = {
+        t: sorted(c.identifier for c in cs)
+        for t, cs in store.triples((None, None, None))
+    }
+    assert contexts[triple] == [URIRef(URI), URIRef(URI + "other")]
+    assert len(contexts) == 2
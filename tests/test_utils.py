@@ -0,0 +1,85 @@
+import os
+
+import nifigator
+
+
+def test_tokenize_offsets():
+    text = "The cat sat on the mat. Felix was his name.\n\n• one • two"
+    first = [
+        ("The", 0, 3),
+        ("cat", 4, 7),
+        ("sat", 8, 11),
+        ("on", 12, 14),
+        ("the", 15, 18),
+        ("mat", 19, 22),
+        (".", 22, 23),
+    ]
+    second = [("Felix", 24, 29), ("was", 30, 33), ("his", 34, 37)]
+    second += [("name", 38, 42), (".", 42, 43)]
+    bullets = [("•", 45, 46), ("one", 47, 50), ("•", 51, 52), ("two", 53, 56)]
+    for split_characters, expected in [
+        ([], [first, second, bullets]),
+        (["•"], [first, second, bullets[:2], bullets[2:]]),
+    ]:
+        sentences = nifigator.tokenize_offsets(text, split_characters)
+        assert [
+            list(zip(sentence.tokens(), sentence.starts, sentence.ends))
+            for sentence in sentences
+        ] == expected
+        assert [(s.start_char, s.end_char) for s in sentences] == [
+            (words[0][1], words[-1][2]) for words in expected
+        ]
+        dicts = [
+            [
+                {"text": word, "start_char": start, "end_char": end}
+                for word, start, end in words
+            ]
+            for words in expected
+        ]
+        assert [list(sentence) for sentence in sentences] == dicts
+        assert nifigator.tokenize_text(text, split_characters) == dicts
+
+
+def test_align_stanza_dict_offsets():
+    text = "The  cat sat."
+    stanza_dict = [
+        [
+            {"text": "The", "start_char": 0, "end_char": 3},
+            {"text": "cat", "start_char": 4, "end_char": 7},
+            {"text": "sat", "start_char": 8, "end_char": 11},
+            {"text": ".", "start_char": 11, "end_char": 12},
+        ]
+    ]
+    stanza_dict = nifigator.align_stanza_dict_offsets(
+        stanza_dict, nifigator.tokenize_offsets(text)
+    )
+    assert [text[w["start_char"] : w["end_char"]] for w in stanza_dict[0]] == [
+        "The",
+        "cat",
+        "sat",
+        ".",
+    ]
+
+
+def test_content_cache_files(tmp_path):
+    other = tmp_path / "other.pickle"
+    other.write_bytes(b"not written by the cache")
+    cache = nifigator.ContentCache(maxsize=1, path=str(tmp_path), maxfiles=8)
+    for idx in range(20):
+        cache.put(cache.key(idx), idx)
+    files = [f for f in os.listdir(tmp_path) if f.startswith(cache.FILE_PREFIX)]
+    assert 0 < len(files) <= 8
+    assert not any(f.endswith(".tmp") for f in os.listdir(tmp_path))
+    # the most recent items are kept on disk
+    cache = nifigator.ContentCache(path=str(tmp_path), maxfiles=8)
+    assert cache.get(cache.key(19)) == 19
+
+    # a truncated file is a miss
+    with open(cache._filename(cache.key(19)), "r+b") as f:
+        f.truncate(3)
+    cache = nifigator.ContentCache(path=str(tmp_path))
+    assert cache.get(cache.key(19), "missing") == "missing"
+
+    # only the files of the cache are deleted
+    cache.clear()
+    assert os.listdir(tmp_path) == ["other.pickle"]